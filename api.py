@@ -1,25 +1,246 @@
-from fastapi import FastAPI
-from core.db_manager import DBManager
+import json
+import datetime
+from fastapi import FastAPI, Header, HTTPException, Query, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from core.db_manager import DBManager, PAYLOAD_FIELDS
+from core.jobs import JobStore, JobRunner
+from core.tracing import TraceStore
+from core.buffer import ProductionBuffer
+from core.render_farm import RenderQueue
+from core.feed_health import FeedHealth
+from core.image_providers import ProviderBreakers
+from core.upload_queue import UploadWorker
 from bson import ObjectId
+from bson.errors import InvalidId
 
 app = FastAPI()
 db = DBManager()
+jobs = JobStore(db)
+runner = JobRunner(jobs)
+traces = TraceStore(db)
+buffer = ProductionBuffer(db)
+render_queue = RenderQueue(db)
+feed_health = FeedHealth(db)
+image_breakers = ProviderBreakers(db)
+upload_worker = UploadWorker(db=db)
 
+SLOTS = ("morning", "noon", "evening", "night")
 
-@app.get("/tasks")
-def get_all_tasks():
-    # Fetch all tasks and convert ObjectId to string for JSON compatibility
-    tasks = list(db.collection.find().sort("_id", -1))
-    for t in tasks:
-        t["_id"] = str(t["_id"])
+# Big per-task payloads nobody needs in a listing; ask for them explicitly
+HEAVY_FIELDS = ("content", "script_data")
+PAGE_BATCH = 500
+
+
+@app.on_event("startup")
+def prepare_indexes():
+    db.ensure_indexes()
+    jobs.ensure_indexes()
+
+
+def to_json(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+def parse_object_id(value, what="id"):
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=400, detail=f"Invalid {what}")
+
+
+def json_response(data, headers=None):
+    return Response(
+        content=json.dumps(data, default=to_json),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+def build_task_query(status, cursor):
+    query = {}
+    if status:
+        statuses = [s.strip() for s in status.split(",") if s.strip()]
+        query["status"] = statuses[0] if len(statuses) == 1 else {"$in": statuses}
+    if cursor:
+        query["_id"] = {"$lt": parse_object_id(cursor, "cursor")}
+    return query
+
+
+def build_projection(fields):
+    if fields == "*":
+        return None
+    if fields:
+        return {f.strip(): 1 for f in fields.split(",") if f.strip()}
+    return {f: 0 for f in HEAVY_FIELDS}
+
+
+def payload_fields(fields):
+    """The fields to join from task_payloads (they are no longer on the task document)."""
+    if fields == "*":
+        return list(PAYLOAD_FIELDS)
+    if fields:
+        wanted = {f.strip() for f in fields.split(",")}
+        return [f for f in PAYLOAD_FIELDS if f in wanted]
+    return [f for f in PAYLOAD_FIELDS if f not in HEAVY_FIELDS]
+
+
+def attach_payloads(tasks, fields):
+    """Adds `fields` to a page of tasks with one query on task_payloads."""
+    if not tasks or not fields:
+        return tasks
+    by_id = {
+        p["_id"]: p
+        for p in db.payloads.find(
+            {"_id": {"$in": [t["_id"] for t in tasks]}}, dict.fromkeys(fields, 1)
+        )
+    }
+    for task in tasks:
+        payload = by_id.get(task["_id"], {})
+        for field in fields:
+            if field in payload and field not in task:
+                task[field] = payload[field]
     return tasks
 
 
+# Plain `def` endpoints run in FastAPI's threadpool, so the blocking pymongo
+# calls never sit on the event loop.
+@app.get("/tasks")
+def get_all_tasks(
+    fields: str = Query(None, description="Comma list of fields, or * for everything"),
+    status: str = Query(None, description="Comma list of statuses"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str = Query(None, description="Return tasks older than this _id"),
+    format: str = Query("json", description="json (paged) or ndjson (streamed)"),
+):
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be json or ndjson")
+    query = build_task_query(status, cursor)
+    projection = build_projection(fields)
+    joined = payload_fields(fields)
+
+    if format == "ndjson":
+        # Stream the whole (filtered) result one task per line, without a
+        # page limit and without holding it all in memory
+        def stream():
+            cursor = db.collection.find(query, projection).sort("_id", -1).batch_size(PAGE_BATCH)
+            batch = []
+            for task in cursor:
+                batch.append(task)
+                if len(batch) == PAGE_BATCH:
+                    for t in attach_payloads(batch, joined):
+                        yield json.dumps(t, default=to_json) + "\n"
+                    batch = []
+            for t in attach_payloads(batch, joined):
+                yield json.dumps(t, default=to_json) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    tasks = list(db.collection.find(query, projection).sort("_id", -1).limit(limit))
+    attach_payloads(tasks, joined)
+    headers = {}
+    if len(tasks) == limit:
+        # Newest-first by _id: the next page starts below the last one we sent
+        headers["X-Next-Cursor"] = str(tasks[-1]["_id"])
+
+    return json_response(tasks, headers)
+
+
 @app.post("/run-pipeline")
-async def trigger_pipeline():
-    # This will trigger the main logic we've built
-    import subprocess
+def trigger_pipeline(slot: str = Query("noon")):
+    if slot not in SLOTS:
+        raise HTTPException(status_code=400, detail=f"slot must be one of {', '.join(SLOTS)}")
+    # main.py still runs as its own process so the API stays responsive, but
+    # now as a tracked job whose progress can be followed at /jobs/{id}/events
+    job = runner.start(slot)
+    return {"message": "Pipeline started!", "job_id": str(job["_id"])}
+
+
+@app.get("/jobs")
+def list_jobs(limit: int = Query(20, ge=1, le=200)):
+    return json_response(jobs.recent(limit))
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = jobs.get(parse_object_id(job_id))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return json_response(job)
+
+
+@app.get("/jobs/{job_id}/events")
+def job_events(
+    job_id: str,
+    after: int = Query(0, ge=0, description="Only events after this seq"),
+    last_event_id: str = Header(None),
+):
+    """Server-sent events: stage changes and percents, live, until the job ends."""
+    oid = parse_object_id(job_id)
+    if not jobs.get(oid):
+        raise HTTPException(status_code=404, detail="Job not found")
+    # A reconnecting EventSource resumes from the last id it received
+    if last_event_id and last_event_id.isdigit():
+        after = max(after, int(last_event_id))
+
+    def stream():
+        yield "retry: 3000\n\n"
+        for event in jobs.stream(oid, after):
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            data = json.dumps(event, default=to_json)
+            yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Pipeline stage timings and external call counters for Prometheus."""
+    return PlainTextResponse(
+        traces.prometheus_text(), media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.get("/buffer")
+def buffer_status(last: int = Query(50, ge=1, le=500)):
+    """Buffered videos per slot/niche and the publish delay after slot time."""
+    return json_response(buffer.report(last=last))
+
+
+@app.get("/render-farm")
+def render_farm_status(hours: float = Query(24, gt=0, le=24 * 30)):
+    """Render job queue and per-node throughput."""
+    return json_response(render_queue.report(hours=hours))
+
+
+@app.get("/feeds")
+def feed_status(niche: str = None):
+    """RSS feed health and new-unique-story yield per niche."""
+    return json_response(feed_health.report(niche))
+
+
+@app.get("/image-providers")
+def image_provider_status():
+    """Image provider circuit breakers and hit rates."""
+    return json_response(image_breakers.report())
+
+
+@app.get("/uploads")
+def upload_status():
+    """Upload queue depth, uploads in flight, failures, quota and throughput."""
+    return json_response(upload_worker.metrics())
+
 
-    # We run the main.py as a separate process so the UI doesn't freeze
-    subprocess.Popen(["python", "main.py"])
-    return {"message": "Pipeline started!"}
+@app.post("/uploads/retry-failed")
+def retry_failed_uploads():
+    """Puts every `failed_upload` task back on the upload queue."""
+    return {"requeued": upload_worker.retry_failed()}
@@ -0,0 +1,128 @@
+"""
+Latency and response size of GET /tasks at N tasks.
+
+Seeds a separate database (DB_NAME defaults to yt_automation_bench) with
+realistic tasks (full article content + 8-scene script_data), then times the
+old "return everything" query against the paged, projected and streamed
+variants of the endpoint.
+
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bench_api_tasks --tasks 10000
+"""
+import os
+import json
+import time
+import random
+import argparse
+import datetime
+
+os.environ.setdefault("DB_NAME", "yt_automation_bench")
+
+from fastapi.testclient import TestClient  # noqa: E402
+import api  # noqa: E402
+
+STATUSES = ["pending", "scripted", "voiced", "ready_to_assemble", "completed_packaged", "uploaded"]
+
+
+def seed(n):
+    api.db.collection.delete_many({})
+    now = datetime.datetime.now(datetime.timezone.utc)
+    batch = []
+    for i in range(n):
+        batch.append(
+            {
+                "title": f"Benchmark story number {i} about something amazing",
+                "content": "Lorem ipsum dolor sit amet. " * 110,  # ~3KB article
+                "source": "SPACE",
+                "status": random.choice(STATUSES),
+                "source_url": f"https://example.com/story/{i}",
+                "niche": "space",
+                "slot": "noon",
+                "folder_path": f"data/generated_videos_folder/bench/{i}",
+                "created_at": now - datetime.timedelta(minutes=i),
+                "script_data": [
+                    {
+                        "text": "Scientists have made a discovery that changes everything.",
+                        "keywords": ["Scientist", "Lab"],
+                        "image_count": 2,
+                        "audio_path": f"data/bench/{i}/voice_{s}.mp3",
+                        "duration": 5.2,
+                        "image_paths": [f"data/bench/{i}/scene_{s}_img_{j}.jpg" for j in range(2)],
+                    }
+                    for s in range(8)
+                ],
+            }
+        )
+        if len(batch) == 1000:
+            api.db.collection.insert_many(batch)
+            batch = []
+    if batch:
+        api.db.collection.insert_many(batch)
+    api.db.ensure_indexes()
+
+
+def legacy_get_all():
+    # What GET /tasks did before: every task, every field
+    tasks = list(api.db.collection.find().sort("_id", -1))
+    for t in tasks:
+        t["_id"] = str(t["_id"])
+    return json.dumps(tasks, default=str).encode()
+
+
+def measure(label, fn, runs):
+    times, size = [], 0
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        size = len(fn())
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    p50 = times[len(times) // 2]
+    p99 = times[min(len(times) - 1, int(len(times) * 0.99))]
+    print(f"   {label:<38} p50 {p50:8.1f}ms   p99 {p99:8.1f}ms   {size / 1024:10.1f}KB")
+    return {"label": label, "p50_ms": round(p50, 2), "p99_ms": round(p99, 2), "bytes": size}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--no-seed", action="store_true")
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    if not args.no_seed:
+        print(f"🌱 Seeding {args.tasks} tasks into {api.db.db_name}...")
+        seed(args.tasks)
+
+    client = TestClient(api.app)
+    print(f"\n📊 GET /tasks at {api.db.collection.estimated_document_count()} tasks")
+    results = [
+        measure("legacy: all tasks, all fields", legacy_get_all, args.runs),
+        measure(
+            "page of 100, default projection",
+            lambda: client.get("/tasks").content,
+            args.runs,
+        ),
+        measure(
+            "page of 200, dashboard fields",
+            lambda: client.get("/tasks", params={"fields": "title,status,source", "limit": 200}).content,
+            args.runs,
+        ),
+        measure(
+            "status filter, page of 100",
+            lambda: client.get("/tasks", params={"status": "uploaded"}).content,
+            args.runs,
+        ),
+        measure(
+            "ndjson stream, dashboard fields",
+            lambda: client.get("/tasks", params={"fields": "title,status,source", "format": "ndjson"}).content,
+            max(1, args.runs // 4),
+        ),
+    ]
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Slot scrape latency with the candidate pool (core/candidate_pool.py) cold
+versus warm, with no network.
+
+Feeds and articles come from benchmarks/fakes.py (--latency-ms per request;
+real RSS feeds typically answer in 0.3-2s). The database is seeded with
+--history tasks from the last 7 days, so the duplicate check scans what a
+live database would. The judge is the local pre-ranker (VIRAL_JUDGE=local)
+so Groq latency doesn't blur the numbers.
+
+- cold: CANDIDATE_POOL off, every scrape fetches every feed and checks
+        every entry against the last 7 days of tasks (the old behaviour);
+- warm: the pool is primed by one scrape, then every scrape picks from it
+        and only refreshes the feeds when it is thin (< POOL_MIN_CANDIDATES).
+
+Each mode starts with empty article and LLM caches in a temp working
+directory, so the cold runs don't fetch the warm runs' articles for them.
+Each scrape adds its winner as a task, like a real run. Feed stats are
+cleared before every scrape: the fixture feeds never change, so
+core/feed_health.py would otherwise start resting them.
+
+    python -m benchmarks.bench_candidate_pool
+    python -m benchmarks.bench_candidate_pool --runs 8 --latency-ms 800 --out pool.json
+"""
+import os
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.bench_imports import git_commit
+from benchmarks.bench_pipeline import REPO_ROOT, start_fakes, configure_env, use_mongomock
+from benchmarks.fakes import route_requests
+
+WORDS = ["Ancient", "Galaxy", "Ocean", "Empire", "Habit", "Comet", "Forest", "Signal", "Mission", "Volcano"]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round((len(values) - 1) * pct)))]
+
+
+def seed_history(db, n, seed_value=7):
+    """n tasks spread over the last 7 days, with titles unlike the fixture feeds."""
+    rng = random.Random(seed_value)
+    now = datetime.now(timezone.utc)
+    db.client.drop_database(db.db_name)
+    db.collection.insert_many([
+        {
+            "title": f"{' '.join(rng.sample(WORDS, 4))} story number {i} explained",
+            "status": "uploaded",
+            "source_url": f"https://example.com/history/{i}",
+            "niche": "space",
+            "created_at": now - timedelta(minutes=rng.uniform(10, 7 * 24 * 60)),
+        }
+        for i in range(n)
+    ])
+    db.ensure_indexes()
+
+
+def measure(scraper, slot):
+    """One scrape: total and candidate-gathering seconds, feed requests, dedup checks."""
+    timings = {}
+    counts = {"fetches": 0, "checks": 0}
+    gather, task_exists, fetch_feed = scraper.gather_candidates, scraper.db.task_exists, scraper.fetch_feed
+
+    def timed_gather(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return gather(*args, **kwargs)
+        finally:
+            timings["gather"] = time.perf_counter() - start
+
+    def counted(name, fn):
+        def wrapper(*args, **kwargs):
+            counts[name] += 1
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    scraper.gather_candidates = timed_gather
+    scraper.db.task_exists = counted("checks", task_exists)
+    scraper.fetch_feed = counted("fetches", fetch_feed)
+    # The fixture feeds never change, so feed_health would soon rest them all
+    scraper.feeds.collection.delete_many({})
+    start = time.perf_counter()
+    try:
+        task_id = scraper.scrape_targeted_niche(slot)
+    finally:
+        scraper.gather_candidates, scraper.db.task_exists = gather, task_exists
+        scraper.fetch_feed = fetch_feed
+    total = time.perf_counter() - start
+    return {
+        "scrape_ms": round(total * 1000, 1),
+        "gather_ms": round(timings.get("gather", 0) * 1000, 1),
+        "feed_requests": counts["fetches"],
+        # Includes add_task's own check of the winner
+        "dedup_checks": counts["checks"],
+        "task": bool(task_id),
+    }
+
+
+def fresh_caches(mode):
+    """Empty article and LLM caches per mode, so cold doesn't warm them for warm."""
+    import core.llm_client as llm_client
+
+    os.environ["ARTICLE_CACHE_DIR"] = os.path.abspath(os.path.join("caches", mode, "article_cache"))
+    os.environ["LLM_CACHE_DIR"] = os.path.abspath(os.path.join("caches", mode, "llm_cache"))
+    # The shared client read LLM_CACHE_DIR when it was built
+    llm_client._shared = None
+
+
+def run_mode(mode, args):
+    from core.db_manager import DBManager
+    from core.scraper import NewsScraper
+
+    fresh_caches(mode)
+
+    seed_history(DBManager(), args.history)
+    scraper = NewsScraper()
+    if mode == "cold":
+        scraper.pool = None
+    primed = None
+    if mode == "warm":
+        print("   priming the pool...")
+        primed = measure(scraper, args.slot)
+
+    runs = []
+    for i in range(args.runs):
+        refreshed_at = None
+        if scraper.pool:
+            refreshed_at = scraper.pool.refreshes.find_one({"_id": args.niche}, {"refreshed_at": 1})
+        run = measure(scraper, args.slot)
+        if scraper.pool:
+            after = scraper.pool.refreshes.find_one({"_id": args.niche}, {"refreshed_at": 1})
+            run["refreshed"] = after != refreshed_at
+        runs.append(run)
+        print(f"   {mode} {i + 1}: {run['scrape_ms']:.0f}ms ({run['gather_ms']:.0f}ms gathering, "
+              f"{run['feed_requests']} feed requests, {run['dedup_checks']} dedup checks)")
+
+    summary = {
+        key: {
+            "p50": round(percentile([r[key] for r in runs], 0.5), 1),
+            "p95": round(percentile([r[key] for r in runs], 0.95), 1),
+        }
+        for key in ("scrape_ms", "gather_ms", "feed_requests", "dedup_checks")
+    }
+    summary["refreshes"] = sum(1 for r in runs if r.get("refreshed"))
+    summary["tasks"] = sum(1 for r in runs if r["task"])
+    return {"runs": runs, "primed": primed, "summary": summary}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Slot scrape latency: candidate pool cold vs warm")
+    parser.add_argument("--slot", default="noon")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--history", type=int, default=300, help="Tasks in the last 7 days")
+    parser.add_argument("--latency-ms", type=float, default=400, help="Per feed/article request")
+    parser.add_argument("--groq-latency-ms", type=float, default=300)
+    parser.add_argument("--mongo", action="store_true", help="Use MONGO_URI instead of mongomock")
+    parser.add_argument("--db-name", default="yt_automation_bench")
+    parser.add_argument("--out", help="Write results JSON here")
+    args = parser.parse_args()
+
+    if not args.db_name.endswith("_bench"):
+        parser.error("--db-name must end in _bench (it is dropped)")
+
+    out_path = os.path.abspath(args.out) if args.out else None
+    work_dir = tempfile.mkdtemp(prefix="bench_candidate_pool_")
+    fakes, base_url = start_fakes(args)
+    try:
+        configure_env(args, base_url)
+        # Caches and video folders land here, not in the repo
+        os.chdir(work_dir)
+        os.environ["VIRAL_JUDGE"] = "local"
+        if not args.mongo:
+            use_mongomock()
+        route_requests(base_url)
+
+        import requests
+        from core.scraper import NewsScraper
+
+        scraper = NewsScraper()
+        args.niche = scraper.niche_map[args.slot]["niche"]
+        feeds = {}
+        for config in scraper.niche_map.values():
+            for i, url in enumerate(config["sources"]):
+                feeds[url] = [config["niche"], i]
+        requests.post(f"{base_url}/_config", json={"feeds": feeds}, timeout=5)
+
+        results = {}
+        for mode in ("cold", "warm"):
+            print(f"⏱️ {mode}: {args.runs} scrape(s) of {args.slot}")
+            results[mode] = run_mode(mode, args)
+    finally:
+        fakes.terminate()
+        fakes.wait()
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\n🗃️ Slot scrape, {args.latency_ms:.0f}ms per feed request, {args.history} tasks in 7 days")
+    print(f"{'mode':<6} {'scrape p50/p95 ms':>19} {'gather p50/p95 ms':>19} {'feeds p50':>10} "
+          f"{'dedup p50':>10} {'refreshes':>10}")
+    for mode, r in results.items():
+        s = r["summary"]
+        print(f"{mode:<6} {s['scrape_ms']['p50']:>9.0f} / {s['scrape_ms']['p95']:<7.0f} "
+              f"{s['gather_ms']['p50']:>9.0f} / {s['gather_ms']['p95']:<7.0f} "
+              f"{s['feed_requests']['p50']:>10.0f} {s['dedup_checks']['p50']:>10.0f} "
+              f"{s['refreshes'] if mode == 'warm' else '-':>10}")
+
+    if out_path:
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "commit": git_commit(),
+                    "date": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "slot": args.slot,
+                    "history": args.history,
+                    "latency_ms": args.latency_ms,
+                    "mongo": args.mongo,
+                },
+                "results": results,
+            }, f, indent=2)
+        print(f"\n💾 Results: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Bytes downloaded and time per image, per provider, with the providers'
+default renditions (before) versus provider-side resizing and fit-on-arrival
+(after, core/image_providers.py), with no network.
+
+Providers and images come from benchmarks/fakes.py, which honours the
+resizing parameters the way imgix (Unsplash) and Pexels do: `fit=crop&w&h`
+returns exactly that size and `orientation=portrait` turns the results.
+
+- before: Unsplash `urls.regular`, Pexels `src.large2x` and Google's
+          original, written to disk as downloaded (IMAGE_PROVIDER_RESIZE=0);
+- after:  portrait results at exactly 1080x1920 from Unsplash and Pexels,
+          and anything bigger (Google) cropped and shrunk before writing.
+
+Each provider is measured on its own, so the numbers are per provider and
+not blurred by the hedged race.
+
+    python -m benchmarks.bench_image_bytes
+    python -m benchmarks.bench_image_bytes --images 30 --latency-ms 200 --out image_bytes.json
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+from datetime import datetime, timezone
+
+from benchmarks.bench_imports import git_commit
+from benchmarks.bench_pipeline import start_fakes, configure_env, use_mongomock, fake_stats
+from benchmarks.fakes import route_requests
+
+KEYWORDS = ["Galaxy", "Ocean", "Volcano", "Forest", "Comet", "Glacier", "Desert", "Aurora", "Reef", "Canyon"]
+PROVIDERS = ("unsplash", "pexels", "google")
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round((len(values) - 1) * pct)))]
+
+
+def run_mode(mode, provider, images, base_url, folder):
+    from core.visuals import VisualScout
+
+    scout = VisualScout()
+    resize = mode == "after"
+    for p in scout.fetcher.providers.values():
+        p.resize = resize
+    scout.fit_on_arrival = resize
+
+    times, disk = [], 0
+    before = fake_stats(base_url)
+    for i in range(images):
+        path = os.path.join(folder, f"{mode}_{provider}_{i}.jpg")
+        kw = KEYWORDS[i % len(KEYWORDS)] + str(i)
+        start = time.perf_counter()
+        ok = scout.find_image([(provider, kw)], path)
+        times.append((time.perf_counter() - start) * 1000)
+        if ok:
+            disk += os.path.getsize(path)
+    after = fake_stats(base_url)
+    # Search API responses included: that is what a real run downloads too
+    downloaded = after["bytes_out"] - before["bytes_out"]
+    return {
+        "images": images,
+        "kb_per_image": round(downloaded / images / 1024, 1),
+        "disk_kb_per_image": round(disk / images / 1024, 1),
+        "ms_p50": round(percentile(times, 0.5), 1),
+        "ms_p95": round(percentile(times, 0.95), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Image bytes and time per image: default vs resized renditions")
+    parser.add_argument("--images", type=int, default=20, help="Per provider and mode")
+    parser.add_argument("--latency-ms", type=float, default=100, help="Per request")
+    parser.add_argument("--groq-latency-ms", type=float, default=300)
+    parser.add_argument("--mongo", action="store_true", help="Use MONGO_URI instead of mongomock")
+    parser.add_argument("--db-name", default="yt_automation_bench")
+    parser.add_argument("--out", help="Write results JSON here")
+    args = parser.parse_args()
+
+    if not args.db_name.endswith("_bench"):
+        parser.error("--db-name must end in _bench (it is dropped)")
+
+    fakes, base_url = start_fakes(args)
+    folder = tempfile.mkdtemp(prefix="bench_image_bytes_")
+    try:
+        configure_env(args, base_url)
+        if not args.mongo:
+            use_mongomock()
+        route_requests(base_url)
+
+        results = {}
+        for provider in PROVIDERS:
+            for mode in ("before", "after"):
+                print(f"⏱️ {provider} {mode}: {args.images} image(s)")
+                results.setdefault(provider, {})[mode] = run_mode(mode, provider, args.images, base_url, folder)
+    finally:
+        fakes.terminate()
+        fakes.wait()
+        shutil.rmtree(folder, ignore_errors=True)
+
+    print(f"\n🖼️ Per image, {args.latency_ms:.0f}ms per request")
+    print(f"{'provider':<10} {'mode':<7} {'KB down':>8} {'KB disk':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for provider, modes in results.items():
+        for mode, r in modes.items():
+            print(f"{provider:<10} {mode:<7} {r['kb_per_image']:>8.0f} {r['disk_kb_per_image']:>8.0f} "
+                  f"{r['ms_p50']:>8.0f} {r['ms_p95']:>8.0f}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "commit": git_commit(),
+                    "date": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "latency_ms": args.latency_ms,
+                    "mongo": args.mongo,
+                },
+                "results": results,
+            }, f, indent=2)
+        print(f"\n💾 Results: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
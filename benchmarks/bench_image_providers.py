@@ -0,0 +1,171 @@
+"""
+Per-image acquisition latency in VisualScout: providers one after another
+(the old order) versus hedged races with circuit breakers
+(core/image_providers.py), with no network.
+
+Google, Unsplash and Pexels are stand-ins served by benchmarks/fakes.py, each
+with its own latency and failure rate (the defaults: a slow Google, an
+Unsplash that fails most requests, a healthy Pexels). The images requested
+are what a typical 8-scene script asks for: a hero image, then stock images
+with one or two keywords per scene.
+
+- sequential: one attempt at a time, Google (hero only), Unsplash, Pexels,
+              then the fallback keywords; every provider tried every time;
+- hedged:     the next attempt starts IMAGE_HEDGE_DELAY after the previous
+              one unless it has come back, first valid image wins, and a
+              provider that keeps failing is skipped by its breaker.
+
+    python -m benchmarks.bench_image_providers
+    python -m benchmarks.bench_image_providers --images 60 --unsplash-fail 1 --out images.json
+"""
+import os
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+from datetime import datetime, timezone
+
+from benchmarks.bench_imports import git_commit
+from benchmarks.bench_pipeline import start_fakes, configure_env, use_mongomock
+from benchmarks.fakes import route_requests
+
+KEYWORDS = ["Galaxy", "Ocean", "Volcano", "Forest", "Comet", "Glacier", "Desert", "Aurora", "Reef", "Canyon"]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round((len(values) - 1) * pct)))]
+
+
+def image_plan(n, seed_value=7):
+    """(keywords, keyword, hero) per image, shaped like 8-scene scripts."""
+    rng = random.Random(seed_value)
+    plan = []
+    while len(plan) < n:
+        for scene in range(8):
+            keywords = rng.sample(KEYWORDS, 2)
+            for j in range(rng.choice([1, 2])):
+                plan.append((keywords, keywords[j % 2], scene == 0 and j == 0))
+    return plan[:n]
+
+
+def run_mode(mode, plan, folder):
+    from core.visuals import VisualScout
+    from core.image_providers import HedgedImageFetch
+
+    scout = VisualScout()
+    scout.breakers.collection.delete_many({})
+    scout.breakers.load()
+    if mode == "sequential":
+        scout.fetcher = HedgedImageFetch(validate=scout.is_valid_image, max_inflight=1)
+
+    runs = []
+    for i, (keywords, kw, hero) in enumerate(plan):
+        path = os.path.join(folder, f"{mode}_{i}.jpg")
+        attempts = scout.image_attempts(keywords, kw, hero=hero)
+        start = time.perf_counter()
+        content, provider, _ = scout.fetcher.fetch(attempts)
+        runs.append({"ms": round((time.perf_counter() - start) * 1000, 1), "provider": provider, "hero": hero})
+        if content:
+            scout.save_image(path, content)
+
+    latencies = [r["ms"] for r in runs]
+    wins = {}
+    for r in runs:
+        wins[r["provider"] or "placeholder"] = wins.get(r["provider"] or "placeholder", 0) + 1
+    return {
+        "runs": runs,
+        "summary": {
+            "p50": round(percentile(latencies, 0.5), 1),
+            "p95": round(percentile(latencies, 0.95), 1),
+            "total_s": round(sum(latencies) / 1000, 2),
+            "wins": wins,
+        },
+        "breakers": scout.breakers.report() if mode == "hedged" else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Image acquisition latency: sequential vs hedged providers")
+    parser.add_argument("--images", type=int, default=40)
+    parser.add_argument("--google-ms", type=float, default=2500)
+    parser.add_argument("--google-fail", type=float, default=0.2)
+    parser.add_argument("--unsplash-ms", type=float, default=1500)
+    parser.add_argument("--unsplash-fail", type=float, default=0.8)
+    parser.add_argument("--pexels-ms", type=float, default=300)
+    parser.add_argument("--pexels-fail", type=float, default=0.0)
+    parser.add_argument("--image-ms", type=float, default=150, help="Per image download")
+    parser.add_argument("--hedge-delay", type=float, default=0.8)
+    parser.add_argument("--latency-ms", type=float, default=30, help="Everything else")
+    parser.add_argument("--groq-latency-ms", type=float, default=300)
+    parser.add_argument("--mongo", action="store_true", help="Use MONGO_URI instead of mongomock")
+    parser.add_argument("--db-name", default="yt_automation_bench")
+    parser.add_argument("--out", help="Write results JSON here")
+    args = parser.parse_args()
+
+    if not args.db_name.endswith("_bench"):
+        parser.error("--db-name must end in _bench (it is dropped)")
+
+    fakes, base_url = start_fakes(args)
+    folder = tempfile.mkdtemp(prefix="bench_images_")
+    try:
+        configure_env(args, base_url)
+        # Read when core.image_providers is imported
+        os.environ["IMAGE_HEDGE_DELAY"] = str(args.hedge_delay)
+        if not args.mongo:
+            use_mongomock()
+        route_requests(base_url)
+
+        import requests
+
+        hosts = {
+            "www.google.com": {"latency_ms": args.google_ms, "fail_rate": args.google_fail},
+            "api.unsplash.com": {"latency_ms": args.unsplash_ms, "fail_rate": args.unsplash_fail},
+            "api.pexels.com": {"latency_ms": args.pexels_ms, "fail_rate": args.pexels_fail},
+        }
+        for host in ("images.fixture.test", "images.unsplash.com", "images.pexels.com"):
+            hosts[host] = {"latency_ms": args.image_ms}
+        requests.post(f"{base_url}/_config", json={"hosts": hosts}, timeout=5)
+
+        plan = image_plan(args.images)
+        results = {}
+        for mode in ("sequential", "hedged"):
+            print(f"⏱️ {mode}: {len(plan)} image(s)")
+            results[mode] = run_mode(mode, plan, folder)
+    finally:
+        fakes.terminate()
+        fakes.wait()
+        shutil.rmtree(folder, ignore_errors=True)
+
+    print(f"\n🖼️ Per-image acquisition, google {args.google_ms:.0f}ms/{args.google_fail:.0%} fail, "
+          f"unsplash {args.unsplash_ms:.0f}ms/{args.unsplash_fail:.0%}, pexels {args.pexels_ms:.0f}ms/{args.pexels_fail:.0%}")
+    print(f"{'mode':<11} {'p50 ms':>8} {'p95 ms':>8} {'total s':>8}  wins")
+    for mode, r in results.items():
+        s = r["summary"]
+        wins = ", ".join(f"{k} {v}" for k, v in sorted(s["wins"].items()))
+        print(f"{mode:<11} {s['p50']:>8.0f} {s['p95']:>8.0f} {s['total_s']:>8.1f}  {wins}")
+    for row in results["hedged"]["breakers"]:
+        print(f"   breaker {row['provider']:<9} {row['state']} ({row['trips']} trip(s), {row['calls']} call(s))")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "commit": git_commit(),
+                    "date": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "hosts": hosts,
+                    "hedge_delay": args.hedge_delay,
+                    "mongo": args.mongo,
+                },
+                "results": results,
+            }, f, indent=2, default=str)
+        print(f"\n💾 Results: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
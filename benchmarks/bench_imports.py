@@ -0,0 +1,214 @@
+"""
+Cold-start check for the pipeline entry points, based on `python -X importtime`.
+
+Each scenario imports what one kind of run needs (the CLI, a scrape-only run,
+an upload-only run, ...) in a fresh interpreter, the way scheduler.py and the
+API start main.py. The check fails (exit 1) when:
+
+- a scenario loads one of the HEAVY packages at import time. Stage modules
+  import those on first use, so a run that only scrapes or only uploads
+  never loads torch or moviepy;
+- with --compare, a scenario's import time grew by more than --tolerance
+  (and at least --min-ms) against an earlier --out file.
+
+    python -m benchmarks.bench_imports
+    python -m benchmarks.bench_imports --out imports.json
+    python -m benchmarks.bench_imports --compare imports.json --top 20
+"""
+import os
+import sys
+import json
+import argparse
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "cli": "import main",
+    "scrape": "import main; from core.scraper import NewsScraper",
+    "script": "import main; from core.brain import ScriptGenerator",
+    "voice": "import main; from core.voice import VoiceEngine",
+    "visuals": "import main; from core.visuals import VisualScout",
+    "render": "import main; from core.assembler import VideoAssembler",
+    "upload": "import main; from core.upload_queue import UploadWorker; "
+              "from core.uploader import YouTubeUploader",
+    "api": "import api",
+}
+
+# Packages that may only be imported inside the stage that uses them
+HEAVY = ["torch", "whisper", "moviepy", "groq", "edge_tts", "googleapiclient",
+         "cv2", "skimage", "PIL"]
+
+PROJECT = ("main", "api", "core")
+
+
+def run_importtime(code):
+    """One fresh interpreter. Returns [(module, self_us, cumulative_us)] or raises."""
+    # api.py builds its DBManager at import; MongoClient doesn't connect until used
+    env = dict(os.environ)
+    env.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, timeout=300,
+    )
+    rows = []
+    errors = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            errors.append(line)
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # the header line
+        rows.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+    if proc.returncode != 0:
+        raise RuntimeError((errors or ["exit code %d" % proc.returncode])[-1])
+    return rows
+
+
+def top_package(module):
+    return module.split(".", 1)[0]
+
+
+def measure(code, repeat):
+    """Median total import time over `repeat` cold starts, plus the breakdown of the median run."""
+    run_importtime(code)  # first run may write .pyc files; don't count it
+    samples = []
+    for _ in range(repeat):
+        rows = run_importtime(code)
+        samples.append((sum(r[1] for r in rows) / 1000, rows))
+    samples.sort(key=lambda s: s[0])
+    total_ms, rows = samples[len(samples) // 2]
+
+    packages = {}
+    for module, self_us, _ in rows:
+        name = top_package(module)
+        packages[name] = packages.get(name, 0) + self_us / 1000
+    project = {m: round(cum / 1000, 2) for m, _, cum in rows if top_package(m) in PROJECT}
+    loaded = {top_package(m) for m, _, _ in rows}
+    return {
+        "total_ms": round(total_ms, 2),
+        "spread_ms": round(samples[-1][0] - samples[0][0], 2),
+        "modules": len(rows),
+        "packages": {k: round(v, 2) for k, v in sorted(packages.items(), key=lambda kv: -kv[1])},
+        "project": project,
+        "heavy_loaded": [p for p in HEAVY if p in loaded],
+    }
+
+
+def print_report(results, top):
+    print(f"\n📦 Import time per scenario (median of cold starts)")
+    print(f"{'scenario':<10} {'total ms':>9} {'spread':>8} {'modules':>8}  heavy loaded")
+    for name, r in results.items():
+        if "error" in r:
+            print(f"{name:<10} {'-':>9} {'-':>8} {'-':>8}  ❌ {r['error']}")
+            continue
+        heavy = ", ".join(r["heavy_loaded"]) or "-"
+        print(f"{name:<10} {r['total_ms']:>9.1f} {r['spread_ms']:>8.1f} {r['modules']:>8}  {heavy}")
+
+    for name, r in results.items():
+        if "error" in r:
+            continue
+        print(f"\n🔎 {name}: top {top} packages by self time")
+        for package, ms in list(r["packages"].items())[:top]:
+            print(f"   {package:<28} {ms:>8.1f} ms")
+        if r["project"]:
+            print("   project modules (cumulative):")
+            for module, ms in sorted(r["project"].items(), key=lambda kv: -kv[1])[:top]:
+                print(f"   {module:<28} {ms:>8.1f} ms")
+
+
+def compare(results, baseline, tolerance, min_ms):
+    """Prints the change per scenario; returns the scenarios that regressed."""
+    base = baseline["results"]
+    print(f"\n🆚 vs {baseline['meta'].get('commit') or 'baseline'}")
+    print(f"{'scenario':<10} {'base ms':>9} {'new ms':>9} {'change':>8}")
+    regressed = []
+    for name, r in results.items():
+        old = base.get(name, {}).get("total_ms")
+        new = r.get("total_ms")
+        if old is None or new is None:
+            print(f"{name:<10} {'-':>9} {new if new is not None else '-':>9}")
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        flag = ""
+        if new > old * (1 + tolerance) and new - old >= min_ms:
+            regressed.append(name)
+            flag = "  ❌"
+        print(f"{name:<10} {old:>9.1f} {new:>9.1f} {change:>+7.1f}%{flag}")
+    return regressed
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start import time check")
+    parser.add_argument("scenarios", nargs="*", help=f"Default: all of {', '.join(SCENARIOS)}")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Packages listed per scenario")
+    parser.add_argument("--out", help="Write results JSON here")
+    parser.add_argument("--compare", help="Earlier results JSON; fail on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed growth (0.25 = 25%%)")
+    parser.add_argument("--min-ms", type=float, default=20.0, help="Ignore growth below this")
+    args = parser.parse_args()
+
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    for name in names:
+        print(f"⏱️ {name}: {SCENARIOS[name]}")
+        try:
+            results[name] = measure(SCENARIOS[name], args.repeat)
+        except (RuntimeError, subprocess.SubprocessError) as e:
+            results[name] = {"error": str(e)[:200]}
+
+    print_report(results, args.top)
+
+    failures = [f"{n} loads {', '.join(r['heavy_loaded'])}"
+                for n, r in results.items() if r.get("heavy_loaded")]
+    failures += [f"{n} failed to import" for n, r in results.items() if "error" in r]
+    if baseline:
+        failures += [f"{n} import time regressed"
+                     for n in compare(results, baseline, args.tolerance, args.min_ms)]
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "commit": git_commit(),
+                    "date": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "repeat": args.repeat,
+                },
+                "results": results,
+            }, f, indent=2)
+        print(f"\n💾 Results: {args.out}")
+
+    if failures:
+        print("\n❌ Cold start check failed:")
+        for failure in failures:
+            print(f"   - {failure}")
+        sys.exit(1)
+    print("\n✅ Cold start check passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Per-frame cost of the Ken Burns zoom: the old moviepy effect chain against
+core.kenburns.
+
+The old chain (ImageClip -> resized(height=1920) -> vfx.Resize(1 + 0.04t) ->
+cropped 1080x1920) resamples the whole 1920-high image on every frame.
+KenBurns does the crop and cover-fit once, then one 1080x1920 warpAffine per
+frame. Both are timed over the frames a real render asks for (24 fps over one
+image's duration), on synthetic photos of the sizes the providers return.
+
+    python -m benchmarks.bench_kenburns
+    python -m benchmarks.bench_kenburns --duration 4 --out kenburns.json
+    python -m benchmarks.bench_kenburns --compare kenburns.json
+"""
+import sys
+import json
+import time
+import argparse
+import platform
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.bench_imports import git_commit
+from core.kenburns import KenBurns, OUTPUT_SIZE
+
+# (width, height) of typical downloads
+SIZES = {
+    "unsplash_regular": (1080, 720),
+    "pexels_large2x": (1880, 1253),
+    "portrait": (1280, 1920),
+    "original_12mp": (4000, 3000),
+}
+FPS = 24
+
+
+def synthetic_photo(width, height, seed=0):
+    """Smooth gradients plus noise: compresses and resamples like a photo, not a flat fill."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    img = np.stack([
+        127 + 100 * np.sin(x / 97.0 + y / 211.0),
+        127 + 100 * np.cos(y / 53.0),
+        127 + 100 * np.sin((x + y) / 151.0),
+    ], axis=-1)
+    img += rng.normal(0, 12, img.shape)
+    return np.clip(img, 0, 255).astype(np.uint8)
+
+
+def old_chain(image, duration):
+    """The effect chain VideoAssembler.assemble used before core.kenburns."""
+    import moviepy.video.fx as vfx
+    from moviepy import ImageClip
+
+    clip = (
+        ImageClip(image)
+        .with_duration(duration)
+        .resized(height=1920)
+        .with_effects([vfx.Resize(lambda t: 1 + 0.04 * t)])
+    )
+    if clip.w < 1080:
+        clip = clip.resized(width=1080)
+    clip = clip.cropped(
+        x_center=clip.w / 2, y_center=clip.h / 2, width=1080, height=1920
+    )
+    return clip.get_frame
+
+
+def new_effect(image, duration):
+    return KenBurns(image, duration).frame
+
+
+def time_frames(frame_function, times):
+    per_frame = []
+    for t in times:
+        start = time.perf_counter()
+        frame = frame_function(t)
+        per_frame.append((time.perf_counter() - start) * 1000)
+    return per_frame, frame
+
+
+def measure(name, build, image, duration):
+    start = time.perf_counter()
+    frame_function = build(image, duration)
+    setup_ms = (time.perf_counter() - start) * 1000
+
+    times = [i / FPS for i in range(int(duration * FPS))]
+    frame_function(0)  # warm-up (allocations, lazy moviepy state)
+    per_frame, last = time_frames(frame_function, times)
+    shape = tuple(last.shape)
+    if shape[:2] != OUTPUT_SIZE[::-1]:
+        raise RuntimeError(f"{name} produced {shape}, expected {OUTPUT_SIZE[::-1]}")
+
+    per_frame.sort()
+    return {
+        "setup_ms": round(setup_ms, 2),
+        "frames": len(per_frame),
+        "frame_p50_ms": round(per_frame[len(per_frame) // 2], 3),
+        "frame_p95_ms": round(per_frame[int((len(per_frame) - 1) * 0.95)], 3),
+        "frame_mean_ms": round(sum(per_frame) / len(per_frame), 3),
+        "total_ms": round(setup_ms + sum(per_frame), 1),
+    }
+
+
+def first_frame_diff(image, duration):
+    """Mean absolute difference at t=0, where both should show the same cover crop."""
+    old = old_chain(image, duration)(0).astype(np.int16)
+    new = new_effect(image, duration)(0).astype(np.int16)
+    return round(float(np.abs(old - new).mean()), 2)
+
+
+def print_report(results):
+    print(f"\n🎞️ Ken Burns per frame ({OUTPUT_SIZE[0]}x{OUTPUT_SIZE[1]} @ {FPS} fps)")
+    print(f"{'image':<18} {'effect':<7} {'setup ms':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'mean ms':>8} {'speedup':>8}")
+    for name, r in results.items():
+        for effect in ("old", "new"):
+            e = r.get(effect)
+            if not e:
+                print(f"{name:<18} {effect:<7} {'-':>9}  {r.get(effect + '_error', '')}")
+                continue
+            speedup = ""
+            if effect == "new" and r.get("old"):
+                speedup = f"{r['old']['frame_mean_ms'] / e['frame_mean_ms']:.1f}x"
+            print(f"{name:<18} {effect:<7} {e['setup_ms']:>9.1f} {e['frame_p50_ms']:>8.2f} "
+                  f"{e['frame_p95_ms']:>8.2f} {e['frame_mean_ms']:>8.2f} {speedup:>8}")
+        if r.get("t0_mean_abs_diff") is not None:
+            print(f"{'':<18} t=0 mean |old - new| = {r['t0_mean_abs_diff']} (0-255)")
+
+
+def compare(results, baseline, tolerance):
+    """Prints the new effect's change per image; returns the images that regressed."""
+    base = baseline["results"]
+    print(f"\n🆚 vs {baseline['meta'].get('commit') or 'baseline'}")
+    regressed = []
+    for name, r in results.items():
+        old = base.get(name, {}).get("new", {}).get("frame_mean_ms")
+        new = r.get("new", {}).get("frame_mean_ms")
+        if old is None or new is None:
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        flag = ""
+        if new > old * (1 + tolerance):
+            regressed.append(name)
+            flag = "  ❌"
+        print(f"{name:<18} {old:>8.2f} -> {new:>8.2f} ms {change:>+7.1f}%{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ken Burns per-frame benchmark")
+    parser.add_argument("images", nargs="*", help=f"Default: all of {', '.join(SIZES)}")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per image")
+    parser.add_argument("--new-only", action="store_true", help="Skip the (slow) moviepy chain")
+    parser.add_argument("--out", help="Write results JSON here")
+    parser.add_argument("--compare", help="Earlier results JSON; fail if the new effect regressed")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed growth (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    names = args.images or list(SIZES)
+    unknown = [n for n in names if n not in SIZES]
+    if unknown:
+        parser.error(f"unknown image size(s): {', '.join(unknown)}")
+
+    results = {}
+    for name in names:
+        width, height = SIZES[name]
+        print(f"⏱️ {name}: {width}x{height}")
+        image = synthetic_photo(width, height)
+        r = results[name] = {"size": [width, height]}
+        r["new"] = measure("new", new_effect, image, args.duration)
+        if not args.new_only:
+            try:
+                r["old"] = measure("old", old_chain, image, args.duration)
+                r["t0_mean_abs_diff"] = first_frame_diff(image, args.duration)
+            except ImportError as e:
+                r["old_error"] = f"moviepy not available: {e}"
+
+    print_report(results)
+
+    failures = []
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            failures = compare(results, json.load(f), args.tolerance)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "commit": git_commit(),
+                    "date": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "duration": args.duration,
+                    "fps": FPS,
+                },
+                "results": results,
+            }, f, indent=2)
+        print(f"\n💾 Results: {args.out}")
+
+    if failures:
+        print(f"\n❌ Per-frame cost regressed: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Voice + visuals stage time with the two stages back to back versus
+overlapped (OVERLAP_VISUALS, main.py), with no network.
+
+The voice stage speaks each scene through the edge-tts stand-in of
+benchmarks/bench_pipeline.py (--tts-latency-ms per scene, a silent MP3 as long
+as the text takes to read). Image providers are benchmarks/fakes.py
+(--latency-ms per request). Each run is one scripted task of 6-8 scenes built
+from the fixture stories, like a typical script.
+
+- sequential: voice, then visuals sized from the real MP3 durations;
+- overlapped: visuals start with the voice stage from estimated durations
+              (voice.estimate_duration), and the visuals stage only
+              reconciles (an extra image or one dropped per scene).
+
+    python -m benchmarks.bench_media_overlap
+    python -m benchmarks.bench_media_overlap --runs 5 --tts-latency-ms 1200 --out overlap.json
+"""
+import os
+import re
+import json
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+from datetime import datetime, timezone
+
+from benchmarks.bench_imports import git_commit
+from benchmarks.bench_pipeline import (
+    REPO_ROOT, StubCommunicate, start_fakes, configure_env, use_mongomock, install_stubs,
+)
+from benchmarks.fakes import FIXTURES, route_requests
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round((len(values) - 1) * pct)))]
+
+
+def fixture_sentences():
+    sentences = []
+    for name in sorted(os.listdir(os.path.join(FIXTURES, "rss"))):
+        with open(os.path.join(FIXTURES, "rss", name), "r", encoding="utf-8") as f:
+            for text in re.findall(r"<description>(.*?)</description>", f.read())[1:]:
+                sentences += [s.strip() for s in re.split(r"(?<=[.!?])\s+", text) if len(s.strip()) > 30]
+    return sentences
+
+
+def make_script(rng, sentences):
+    """A hook, 4-6 story scenes and an outro: 6-8 scenes."""
+    scenes = [{"text": "Stop scrolling, you need to see this.", "keywords": ["Mystery", "Discovery"]}]
+    for text in rng.sample(sentences, rng.randint(4, 6)):
+        words = re.findall(r"[A-Za-z]{5,}", text) or ["Nature"]
+        scenes.append({"text": text, "keywords": rng.sample(words, min(2, len(words)))})
+    scenes.append({"text": "Follow us for more stories and daily discoveries!",
+                   "keywords": ["Subscribe Button", "Social Media"]})
+    for scene in scenes:
+        scene["image_count"] = 1
+    return scenes
+
+
+def seed_task(db, scenes, folder):
+    os.makedirs(folder, exist_ok=True)
+    return db.collection.insert_one({
+        "title": f"Overlap bench {os.path.basename(folder)}",
+        "status": "scripted",
+        "niche": "space",
+        "folder_path": folder,
+        "script_data": scenes,
+        "created_at": datetime.now(timezone.utc),
+    }).inserted_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Voice + visuals stage time: sequential vs overlapped")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--tts-latency-ms", type=float, default=800, help="Per scene")
+    parser.add_argument("--latency-ms", type=float, default=300, help="Per image provider request")
+    parser.add_argument("--groq-latency-ms", type=float, default=300)
+    parser.add_argument("--mongo", action="store_true", help="Use MONGO_URI instead of mongomock")
+    parser.add_argument("--db-name", default="yt_automation_bench")
+    parser.add_argument("--out", help="Write results JSON here")
+    args = parser.parse_args()
+
+    if not args.db_name.endswith("_bench"):
+        parser.error("--db-name must end in _bench (it is dropped)")
+
+    out_path = os.path.abspath(args.out) if args.out else None
+    work_dir = tempfile.mkdtemp(prefix="bench_overlap_")
+    fakes, base_url = start_fakes(args)
+    try:
+        configure_env(args, base_url)
+        os.chdir(work_dir)
+        if not args.mongo:
+            use_mongomock()
+        route_requests(base_url)
+
+        import main as pipeline
+        from core.db_manager import DBManager
+        from core.voice import estimate_duration, images_for
+
+        StubCommunicate.latency = args.tts_latency_ms / 1000
+        install_stubs()
+        db = DBManager()
+        db.client.drop_database(db.db_name)
+
+        rng = random.Random(7)
+        sentences = fixture_sentences()
+        scripts = [make_script(rng, sentences) for _ in range(args.runs)]
+
+        results = {}
+        for mode in ("sequential", "overlapped"):
+            pipeline.OVERLAP_VISUALS = mode == "overlapped"
+            runs = []
+            for i, scenes in enumerate(scripts):
+                task_id = seed_task(db, [dict(s) for s in scenes], os.path.join(work_dir, mode, str(i)))
+                print(f"\n⏱️ {mode} {i + 1}/{len(scripts)}: {len(scenes)} scenes")
+                run = pipeline.run_creation_pipeline("noon", first="voice", last="visuals", task_id=task_id)
+                walls = {s["stage"]: s["wall"] for s in run["stages"]}
+                task = db.collection.find_one({"_id": task_id})
+                estimated = [images_for(estimate_duration(s["text"])) for s in scenes]
+                actual = [s["image_count"] for s in task["script_data"]]
+                runs.append({
+                    "scenes": len(scenes),
+                    "voice_s": walls.get("voice"),
+                    "visuals_s": walls.get("visuals"),
+                    "total_s": round(walls.get("voice", 0) + walls.get("visuals", 0), 3),
+                    "images": sum(actual),
+                    "scenes_misestimated": sum(1 for e, a in zip(estimated, actual) if e != a),
+                    "status": task["status"],
+                })
+            totals = [r["total_s"] for r in runs]
+            results[mode] = {
+                "runs": runs,
+                "summary": {
+                    "p50_s": round(percentile(totals, 0.5), 2),
+                    "p95_s": round(percentile(totals, 0.95), 2),
+                    "misestimated": sum(r["scenes_misestimated"] for r in runs),
+                    "scenes": sum(r["scenes"] for r in runs),
+                },
+            }
+    finally:
+        fakes.terminate()
+        fakes.wait()
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\n🎙️🖼️ Voice + visuals, {args.tts_latency_ms:.0f}ms TTS per scene, "
+          f"{args.latency_ms:.0f}ms per image request")
+    print(f"{'mode':<11} {'p50 s':>7} {'p95 s':>7}  scenes with a wrong image estimate")
+    for mode, r in results.items():
+        s = r["summary"]
+        wrong = f"{s['misestimated']}/{s['scenes']}" if mode == "overlapped" else "-"
+        print(f"{mode:<11} {s['p50_s']:>7.1f} {s['p95_s']:>7.1f}  {wrong}")
+    saving = results["sequential"]["summary"]["p50_s"] - results["overlapped"]["summary"]["p50_s"]
+    print(f"   saving at p50: {saving:.1f}s per task")
+
+    if out_path:
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "commit": git_commit(),
+                    "date": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "tts_latency_ms": args.tts_latency_ms,
+                    "latency_ms": args.latency_ms,
+                    "mongo": args.mongo,
+                },
+                "results": results,
+            }, f, indent=2)
+        print(f"\n💾 Results: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
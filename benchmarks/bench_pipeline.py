@@ -0,0 +1,381 @@
+"""
+End-to-end benchmark of run_creation_pipeline with no network.
+
+Starts benchmarks/fakes.py in its own process and points Groq, YouTube and
+every `requests` call (feeds, articles, image providers) at it. edge-tts and
+Whisper are swapped for deterministic stand-ins: a silent MP3 sized to the
+text and evenly spaced word timestamps. Mongo is mongomock by default, or a
+local server with --mongo. The render (moviepy + libx264) is the real one.
+
+Reports per-stage latency, throughput and peak memory, and writes JSON that
+can be compared across commits:
+
+    python -m benchmarks.bench_pipeline --runs 3 --out bench_pipeline.json
+    python -m benchmarks.bench_pipeline --runs 3 --compare bench_pipeline.json
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bench_pipeline --mongo
+"""
+import os
+import sys
+import json
+import glob
+import time
+import pickle
+import shutil
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timedelta, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.fakes import route_requests  # noqa: E402
+
+# ~160 words per minute at edge-tts "+10%"
+WORDS_PER_SECOND = 2.7
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+    "/Library/Fonts/Arial.ttf",
+]
+
+
+# ---------- stand-ins ----------
+
+
+class StubCommunicate:
+    """edge_tts.Communicate: a silent MP3 as long as the text takes to read."""
+
+    latency = 0.15
+    cache_dir = "bench_tts"
+
+    def __init__(self, text, voice=None, rate="+0%", **kwargs):
+        self.text = text
+
+    async def save(self, path):
+        await asyncio.sleep(self.latency)
+        seconds = max(1.0, round(len(self.text.split()) / WORDS_PER_SECOND, 1))
+        shutil.copyfile(silent_mp3(seconds, self.cache_dir), path)
+
+
+def silent_mp3(seconds, cache_dir):
+    path = os.path.join(cache_dir, f"silence_{seconds:.1f}.mp3")
+    if not os.path.exists(path):
+        import imageio_ffmpeg
+
+        os.makedirs(cache_dir, exist_ok=True)
+        subprocess.run(
+            [imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-loglevel", "error",
+             "-f", "lavfi", "-i", "anullsrc=r=24000:cl=mono", "-t", f"{seconds:.1f}",
+             "-b:a", "48k", path],
+            check=True,
+        )
+    return path
+
+
+class StubWhisper:
+    """whisper model: evenly spaced words over the audio, like a steady narrator."""
+
+    WORDS = ["THE", "STORY", "THAT", "CHANGES", "EVERYTHING", "YOU", "NEED", "TO", "SEE"]
+
+    def transcribe(self, path, word_timestamps=True, **kwargs):
+        from mutagen.mp3 import MP3
+
+        duration = MP3(path).info.length
+        step = 1 / WORDS_PER_SECOND
+        words = []
+        t = 0.0
+        while t + step <= duration:
+            word = self.WORDS[len(words) % len(self.WORDS)]
+            words.append({"word": f" {word.lower()}", "start": t, "end": t + step * 0.9})
+            t += step
+        text = "".join(w["word"] for w in words)
+        return {"text": text, "segments": [{"start": 0.0, "end": duration, "text": text,
+                                            "words": words}]}
+
+
+def install_stubs(real_whisper=False):
+    import edge_tts
+
+    edge_tts.Communicate = StubCommunicate
+    if not real_whisper:
+        from core.assembler import VideoAssembler
+
+        # The model loads lazily, so stubbing it keeps whisper/torch out of the process
+        VideoAssembler.model = property(lambda self: StubWhisper())
+
+
+def write_fake_token(path="token.pickle"):
+    from google.oauth2.credentials import Credentials
+
+    creds = Credentials(token="bench-token", expiry=datetime.utcnow() + timedelta(days=1))
+    with open(path, "wb") as f:
+        pickle.dump(creds, f)
+
+
+# ---------- harness ----------
+
+
+def start_fakes(args):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fakes",
+         "--latency-ms", str(args.latency_ms),
+         "--groq-latency-ms", str(args.groq_latency_ms)],
+        cwd=REPO_ROOT,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    line = proc.stdout.readline().strip()
+    if not line.startswith("READY"):
+        proc.kill()
+        raise RuntimeError(f"fake services did not start: {line!r}")
+    return proc, f"http://127.0.0.1:{line.split()[1]}"
+
+
+def configure_env(args, base_url):
+    # Forced, not defaulted: the bench database gets dropped between runs
+    os.environ["DB_NAME"] = args.db_name
+    if not args.mongo:
+        os.environ["MONGO_URI"] = "mongodb://mongomock"
+    os.environ.update(
+        {
+            "GROQ_API_KEY": "bench",
+            "GROQ_BASE_URL": f"{base_url}/groq",
+            "YOUTUBE_UPLOAD_URL": f"{base_url}/youtube/upload",
+            "UNSPLASH_ACCESS_KEY": "bench",
+            "PEXELS_API_KEY": "bench",
+            "UPLOAD_PUBLISH_SPACING_MIN": "0",
+        }
+    )
+    if not os.getenv("FONT_PATH"):
+        font = next((p for p in FONT_CANDIDATES if os.path.exists(p)), None)
+        if font:
+            os.environ["FONT_PATH"] = font
+
+
+def use_mongomock():
+    import mongomock
+    import core.db_manager as db_manager
+
+    shared = mongomock.MongoClient()
+    # Every stage builds its own DBManager; they must all see the same data
+    db_manager.MongoClient = lambda *args, **kwargs: shared
+
+
+def reset_state(db):
+    db.client.drop_database(db.db_name)
+    for path in ["data", "logs"] + glob.glob("production_log*.jsonl"):
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+
+
+def fake_stats(base_url):
+    import requests
+
+    return requests.get(f"{base_url}/_stats", timeout=5).json()
+
+
+def summarize_run(index, run, error, wall, before, after):
+    stages = {}
+    for stage in (run or {}).get("stages", []):
+        stages[stage["stage"]] = {
+            "wall": stage["wall"],
+            "cpu": stage["cpu"],
+            "rss_growth_mb": stage["rss_growth_mb"],
+            "calls": sum(c["calls"] for c in stage["calls"].values()),
+            "bytes_in": sum(c["bytes_in"] for c in stage["calls"].values()),
+        }
+    return {
+        "run": index,
+        "ok": error is None,
+        "error": error,
+        "wall": round(wall, 3),
+        "cpu": (run or {}).get("cpu"),
+        "peak_rss_mb": (run or {}).get("peak_rss_mb"),
+        "stages": stages,
+        "ops": {
+            op["op"]: {"count": op["count"], "wall": op["wall"]}
+            for op in (run or {}).get("ops", [])
+        },
+        "groq_calls": after["groq_calls"] - before["groq_calls"],
+        "fake_requests": after["requests"] - before["requests"],
+        "uploaded_bytes": after["uploaded_bytes"] - before["uploaded_bytes"],
+    }
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(round((len(values) - 1) * pct)))]
+
+
+def aggregate(runs):
+    ok = [r for r in runs if r["ok"]]
+    names = []
+    for r in ok:
+        names += [n for n in r["stages"] if n not in names]
+    stages = {}
+    for name in names:
+        walls = [r["stages"][name]["wall"] for r in ok if name in r["stages"]]
+        stages[name] = {
+            "p50": percentile(walls, 0.5),
+            "p95": percentile(walls, 0.95),
+            "mean": round(sum(walls) / len(walls), 3),
+            "cpu_mean": round(sum(r["stages"][name]["cpu"] for r in ok if name in r["stages"])
+                              / len(walls), 3),
+        }
+    walls = [r["wall"] for r in ok]
+    mean_wall = sum(walls) / len(walls) if walls else None
+    return {
+        "runs": len(runs),
+        "ok_runs": len(ok),
+        "wall_p50": percentile(walls, 0.5),
+        "wall_mean": round(mean_wall, 3) if mean_wall else None,
+        "videos_per_hour": round(3600 / mean_wall, 2) if mean_wall else None,
+        "peak_rss_mb": max((r["peak_rss_mb"] or 0 for r in runs), default=None),
+        "stages": stages,
+    }
+
+
+def print_summary(summary):
+    print(f"\n📊 Pipeline benchmark: {summary['ok_runs']}/{summary['runs']} run(s) ok")
+    print(f"{'stage':<10} {'p50 s':>8} {'p95 s':>8} {'mean s':>8} {'cpu s':>8}")
+    for name, s in summary["stages"].items():
+        print(f"{name:<10} {s['p50']:>8.2f} {s['p95']:>8.2f} {s['mean']:>8.2f} {s['cpu_mean']:>8.2f}")
+    if summary["wall_p50"] is not None:
+        print(f"{'total':<10} {summary['wall_p50']:>8.2f}")
+        print(f"\n   Throughput: {summary['videos_per_hour']} videos/hour | "
+              f"peak RSS: {summary['peak_rss_mb']} MB")
+
+
+def print_comparison(summary, baseline):
+    base = baseline["summary"]
+    print(f"\n🆚 vs {baseline['meta'].get('commit') or 'baseline'}")
+    print(f"{'stage':<10} {'base p50':>9} {'new p50':>9} {'change':>8}")
+    rows = [(n, base["stages"].get(n, {}).get("p50"), s["p50"]) for n, s in summary["stages"].items()]
+    rows.append(("total", base.get("wall_p50"), summary.get("wall_p50")))
+    for name, old, new in rows:
+        if old is None or new is None:
+            print(f"{name:<10} {'-':>9} {new if new is not None else '-':>9}")
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        print(f"{name:<10} {old:>9.2f} {new:>9.2f} {change:>+7.1f}%")
+    print(f"{'peak RSS':<10} {base.get('peak_rss_mb') or 0:>9.1f} {summary['peak_rss_mb'] or 0:>9.1f}")
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end pipeline benchmark")
+    parser.add_argument("--slot", default="noon")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--out", help="Write results JSON here")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--mongo", action="store_true", help="Use MONGO_URI instead of mongomock")
+    parser.add_argument("--db-name", default="yt_automation_bench")
+    parser.add_argument("--latency-ms", type=float, default=30, help="Feeds/articles/images")
+    parser.add_argument("--groq-latency-ms", type=float, default=300)
+    parser.add_argument("--tts-latency-ms", type=float, default=150)
+    parser.add_argument("--real-whisper", action="store_true", help="Needs the model cached")
+    parser.add_argument("--warm", action="store_true", help="Keep DB and caches between runs")
+    parser.add_argument("--work-dir", help="Defaults to a fresh temp directory")
+    args = parser.parse_args()
+
+    if args.mongo and not args.db_name.endswith("_bench"):
+        parser.error("--db-name must end in _bench (it is dropped between runs)")
+
+    work_dir = os.path.abspath(args.work_dir or tempfile.mkdtemp(prefix="bench_pipeline_"))
+    os.makedirs(work_dir, exist_ok=True)
+    fakes, base_url = start_fakes(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    out_path = os.path.abspath(args.out) if args.out else None
+
+    try:
+        configure_env(args, base_url)
+        os.chdir(work_dir)
+        if not args.mongo:
+            use_mongomock()
+        route_requests(base_url)
+
+        import requests
+        import main as pipeline
+        from core.db_manager import DBManager
+        from core.scraper import NewsScraper
+
+        StubCommunicate.latency = args.tts_latency_ms / 1000
+        install_stubs(args.real_whisper)
+        write_fake_token()
+
+        # Tell the fakes which recorded feed each hardcoded source URL gets
+        feeds = {}
+        for config in NewsScraper().niche_map.values():
+            for i, url in enumerate(config["sources"]):
+                feeds[url] = [config["niche"], i]
+        requests.post(f"{base_url}/_config", json={"feeds": feeds}, timeout=5)
+
+        db = DBManager()
+        runs = []
+        for i in range(args.runs):
+            if not args.warm:
+                reset_state(db)
+            print(f"\n===== BENCH RUN {i + 1}/{args.runs} ({args.slot}) =====")
+            before = fake_stats(base_url)
+            started = time.perf_counter()
+            run, error = None, None
+            try:
+                run = pipeline.run_creation_pipeline(args.slot)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"[:300]
+                latest = db.db["pipeline_traces"].find_one(sort=[("started_at", -1)])
+                if latest and latest.get("run_id") == pipeline.tracer.run_id:
+                    run = latest
+            wall = time.perf_counter() - started
+            runs.append(summarize_run(i, run, error, wall, before, fake_stats(base_url)))
+
+        summary = aggregate(runs)
+        result = {
+            "meta": {
+                "commit": git_commit(),
+                "date": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "mongo": "mongo" if args.mongo else "mongomock",
+                "whisper": "real" if args.real_whisper else "stub",
+                "args": vars(args),
+            },
+            "summary": summary,
+            "runs": runs,
+        }
+        print_summary(summary)
+        if baseline:
+            print_comparison(summary, baseline)
+        if out_path:
+            with open(out_path, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2, default=str)
+            print(f"\n💾 Results: {out_path}")
+    finally:
+        fakes.terminate()
+        if not args.work_dir:
+            os.chdir(REPO_ROOT)
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Render farm scaling and recovery on one machine: N node processes sharing a
+local directory as the store, against a real MongoDB (the nodes are separate
+processes, so mongomock can't be shared with them).
+
+For each node count it publishes --jobs render jobs with realistic input
+sizes (8 scenes: voice + 2 images each), starts the nodes with
+`core.render_farm node --simulate` (a fixed render time, so the numbers show
+the queue, lease and store overhead rather than moviepy), and waits until
+every job is done or failed. With --kill, node 0 is SIGKILLed mid-job so its
+lease has to expire and the job must be finished by another node.
+
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bench_render_farm
+    python -m benchmarks.bench_render_farm --nodes 1,2,4 --jobs 16 --render-seconds 3
+    python -m benchmarks.bench_render_farm --nodes 3 --kill --fail-rate 0.2 --out farm.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from bson import ObjectId
+
+from benchmarks.bench_imports import git_commit
+
+SCENES = 8
+VOICE_BYTES = 120 * 1024
+IMAGE_BYTES = 350 * 1024
+
+
+def configure_env(args, work_dir):
+    # Read at import by core.render_farm, here and in every node process
+    os.environ.update(
+        {
+            "DB_NAME": args.db_name,
+            "RENDER_STORE": os.path.join(work_dir, "store"),
+            "RENDER_WORK_DIR": os.path.join(work_dir, "nodes"),
+            "RENDER_LEASE_SECONDS": str(args.lease),
+            "RENDER_RETRY_BACKOFF_SECONDS": "1",
+        }
+    )
+
+
+def make_task(db, i, work_dir):
+    """A ready_to_assemble task with random-byte inputs of realistic size."""
+    task_id = db.collection.insert_one(
+        {
+            "title": f"Farm benchmark {i}",
+            "status": "ready_to_assemble",
+            "slot": "noon",
+            "niche": "space",
+            "folder_path": os.path.join(work_dir, "tasks", str(i)),
+            "created_at": datetime.now(timezone.utc),
+        }
+    ).inserted_id
+    folder = os.path.join(work_dir, "tasks", str(i))
+    os.makedirs(folder, exist_ok=True)
+    scenes = []
+    for s in range(SCENES):
+        audio = os.path.join(folder, f"voice_{s}.mp3")
+        with open(audio, "wb") as f:
+            f.write(os.urandom(VOICE_BYTES))
+        images = []
+        for j in range(2):
+            path = os.path.join(folder, f"scene_{s}_img_{j}.jpg")
+            with open(path, "wb") as f:
+                f.write(os.urandom(IMAGE_BYTES))
+            images.append(path)
+        scenes.append({"text": "Benchmark scene.", "audio_path": audio, "image_paths": images})
+    db.update_task(task_id, {"script_data": scenes})
+    return task_id
+
+
+def start_node(node_id, args):
+    cmd = [sys.executable, "-m", "core.render_farm", "node", "--id", node_id,
+           "--simulate", str(args.render_seconds), "--fail-rate", str(args.fail_rate),
+           "--poll", "0.5", "--idle-exit", str(args.lease + 5)]
+    return subprocess.Popen(cmd, stdout=subprocess.DEVNULL if not args.verbose else None)
+
+
+def run_round(nodes, args, work_dir):
+    from core.db_manager import DBManager
+    from core.render_farm import RenderQueue
+
+    db = DBManager()
+    db.client.drop_database(args.db_name)
+    queue = RenderQueue(db)
+    queue.ensure_indexes()
+
+    started = time.monotonic()
+    for i in range(args.jobs):
+        queue.publish(db.next_task("ready_to_assemble", make_task(db, i, work_dir)))
+    publish_s = time.monotonic() - started
+
+    procs = [start_node(f"bench-node{n}", args) for n in range(nodes)]
+    started = time.monotonic()
+    killed = None
+    try:
+        while True:
+            open_jobs = queue.jobs.count_documents({"status": {"$in": ["queued", "leased"]}})
+            if not open_jobs:
+                break
+            if args.kill and killed is None:
+                job = queue.jobs.find_one({"status": "leased", "node": "bench-node0"})
+                if job:
+                    procs[0].send_signal(signal.SIGKILL)
+                    killed = str(job["_id"])
+                    print(f"   🔪 Killed bench-node0 while it held job {killed}")
+            if time.monotonic() - started > args.timeout:
+                print("   ⌛ Timed out waiting for the queue to drain")
+                break
+            time.sleep(0.25)
+        makespan = time.monotonic() - started
+    finally:
+        for p in procs:
+            if p.poll() is None:
+                p.terminate()
+        for p in procs:
+            p.wait()
+
+    collected = len(queue.collect())
+    report = queue.report(hours=1)
+    recovered = None
+    if killed:
+        job = queue.jobs.find_one({"_id": ObjectId(killed)})
+        recovered = {"status": job["status"], "node": job.get("node"), "attempts": job.get("attempts")}
+
+    done = report["queue"]["done"]
+    return {
+        "nodes": nodes,
+        "jobs": args.jobs,
+        "publish_s": round(publish_s, 2),
+        "makespan_s": round(makespan, 2),
+        "jobs_per_min": round(done / makespan * 60, 2) if makespan else None,
+        "done": done,
+        "failed": report["queue"]["failed"],
+        "collected": collected,
+        "killed_job": recovered,
+        "per_node": {
+            node_id: {k: n[k] for k in ("jobs", "failures", "avg_render_s", "jobs_per_hour")}
+            for node_id, n in report["nodes"].items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render farm scaling benchmark (real MongoDB)")
+    parser.add_argument("--nodes", default="1,2,4", help="Comma list of node counts")
+    parser.add_argument("--jobs", type=int, default=12)
+    parser.add_argument("--render-seconds", type=float, default=2.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--kill", action="store_true", help="SIGKILL node 0 mid-job")
+    parser.add_argument("--lease", type=int, default=6, help="RENDER_LEASE_SECONDS for the run")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--db-name", default="yt_automation_bench")
+    parser.add_argument("--work-dir", help="Defaults to a fresh temp directory")
+    parser.add_argument("--verbose", action="store_true", help="Show node output")
+    parser.add_argument("--out", help="Write results JSON here")
+    args = parser.parse_args()
+
+    if not args.db_name.endswith("_bench"):
+        parser.error("--db-name must end in _bench (it is dropped)")
+    if not os.getenv("MONGO_URI"):
+        parser.error("MONGO_URI must point at a MongoDB server the node processes can share")
+
+    work_dir = os.path.abspath(args.work_dir or tempfile.mkdtemp(prefix="bench_farm_"))
+    configure_env(args, work_dir)
+
+    rounds = []
+    for nodes in [int(n) for n in args.nodes.split(",")]:
+        print(f"⏱️ {nodes} node(s), {args.jobs} jobs, {args.render_seconds}s each")
+        shutil.rmtree(os.path.join(work_dir, "tasks"), ignore_errors=True)
+        rounds.append(run_round(nodes, args, work_dir))
+
+    print(f"\n🏭 Render farm ({args.render_seconds}s simulated render per job)")
+    print(f"{'nodes':>5} {'makespan s':>11} {'jobs/min':>9} {'speed-up':>9} {'done':>5} {'failed':>7}")
+    base = rounds[0]["makespan_s"] * rounds[0]["nodes"] if rounds else None
+    for r in rounds:
+        speedup = f"{base / r['makespan_s']:.2f}x" if base and r["makespan_s"] else "-"
+        print(f"{r['nodes']:>5} {r['makespan_s']:>11.1f} {r['jobs_per_min'] or 0:>9.1f} {speedup:>9} "
+              f"{r['done']:>5} {r['failed']:>7}")
+        if r["killed_job"]:
+            k = r["killed_job"]
+            print(f"      killed node's job ended {k['status']} on {k['node']} after {k['attempts']} attempt(s)")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "commit": git_commit(),
+                    "date": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "render_seconds": args.render_seconds,
+                    "lease_seconds": args.lease,
+                },
+                "rounds": rounds,
+            }, f, indent=2, default=str)
+        print(f"\n💾 Results: {args.out}")
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Scripting throughput and tokens per script (core/brain.py) on the fixture
+stories, with no network: one task at a time versus batch mode.
+
+Groq is the stand-in of benchmarks/fakes.py (--groq-latency-ms per call).
+The database is seeded with --tasks pending tasks built from the fixture
+feeds, and every mode starts with an empty LLM cache so no script is free.
+
+- sequential: generate_script, one task after another (the old way);
+- one:        a single batch run (generate_batch) scripts every pending task;
+- two:        two batch runs start at the same time on the same tasks, like
+              an overlapping cron job. Each task is claimed
+              (pending -> scripting) before it is submitted, so no story
+              should be scripted twice.
+
+Tokens come from the usage the stand-in reports (about 4 characters per
+token). It doesn't model provider-side prompt caching, so "prefix" is the
+share of prompt tokens that is the static SCRIPT_INSTRUCTIONS block: what a
+provider cache can serve, not a measured hit rate.
+
+    python -m benchmarks.bench_script_batch
+    python -m benchmarks.bench_script_batch --tasks 40 --workers 8 --out batch.json
+"""
+import os
+import re
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+from datetime import datetime, timezone
+
+from benchmarks.bench_imports import git_commit
+from benchmarks.bench_pipeline import REPO_ROOT, start_fakes, configure_env, use_mongomock, fake_stats
+from benchmarks.fakes import FIXTURES, route_requests
+
+
+def fixture_stories():
+    """(title, content) per fixture feed item."""
+    stories = []
+    for name in sorted(os.listdir(os.path.join(FIXTURES, "rss"))):
+        with open(os.path.join(FIXTURES, "rss", name), "r", encoding="utf-8") as f:
+            xml = f.read()
+        titles = re.findall(r"<title>(.*?)</title>", xml)[1:]
+        texts = re.findall(r"<description>(.*?)</description>", xml)[1:]
+        stories += [(t, d) for t, d in zip(titles, texts) if d.strip()]
+    return stories
+
+
+def seed_pending(db, n):
+    db.client.drop_database(db.db_name)
+    db.ensure_indexes()
+    stories = fixture_stories()
+    for i in range(n):
+        title, content = stories[i % len(stories)]
+        db.add_task(
+            f"{title} #{i}",
+            # Unique per task, so the LLM cache can't answer a repeat
+            f"{content}\n\nStory {i}.",
+            source="bench",
+            extra_data={"niche": "space", "source_url": f"https://example.com/story/{i}"},
+        )
+
+
+def run_mode(mode, args, base_url):
+    import core.llm_client as llm_client
+    from core.brain import ScriptGenerator, SCRIPT_INSTRUCTIONS
+    from core.db_manager import DBManager
+
+    os.environ["LLM_CACHE_DIR"] = os.path.abspath(os.path.join("caches", mode, "llm_cache"))
+    # The shared client read LLM_CACHE_DIR when it was built
+    llm_client._shared = None
+
+    db = DBManager()
+    seed_pending(db, args.tasks)
+    generators = [ScriptGenerator() for _ in range(2 if mode == "two" else 1)]
+
+    scripted = {}
+    usages = []
+    lock = threading.Lock()
+    for gen in generators:
+        process_task = gen.process_task
+
+        def counted(task, process_task=process_task):
+            with lock:
+                scripted[task["_id"]] = scripted.get(task["_id"], 0) + 1
+            usage = process_task(task)
+            if usage:
+                with lock:
+                    usages.append(usage)
+            return usage
+
+        gen.process_task = counted
+
+    before = fake_stats(base_url)
+    start = time.perf_counter()
+    if mode == "sequential":
+        # One call per task; a failed one stays pending and shows up as "left"
+        for _ in range(args.tasks):
+            generators[0].generate_script()
+    else:
+        threads = [threading.Thread(target=gen.generate_batch, args=(args.workers,)) for gen in generators]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    elapsed = time.perf_counter() - start
+    after = fake_stats(base_url)
+
+    done = db.collection.count_documents({"status": "scripted"})
+    prompt = sum(u.get("prompt_tokens", 0) for u in usages)
+    # Same estimate as the stand-in's usage: ~4 characters per token
+    prefix = (len(SCRIPT_INSTRUCTIONS) // 4) * len(usages)
+    return {
+        "tasks": args.tasks,
+        "scripted": done,
+        "seconds": round(elapsed, 2),
+        "scripts_per_min": round(done / elapsed * 60, 1) if elapsed else 0,
+        "groq_calls": after["groq_calls"] - before["groq_calls"],
+        "tokens_per_script": round(sum(u.get("total_tokens", 0) for u in usages) / len(usages)) if usages else 0,
+        "prompt_tokens_per_script": round(prompt / len(usages)) if usages else 0,
+        "prefix_share": round(prefix / prompt, 2) if prompt else 0,
+        "scripted_twice": sum(1 for count in scripted.values() if count > 1),
+        "left_pending": db.collection.count_documents({"status": {"$in": ["pending", "scripting"]}}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scripting throughput: sequential vs batch vs two concurrent batches")
+    parser.add_argument("--tasks", type=int, default=24)
+    parser.add_argument("--workers", type=int, default=4, help="Per batch run")
+    parser.add_argument("--latency-ms", type=float, default=30)
+    parser.add_argument("--groq-latency-ms", type=float, default=800)
+    parser.add_argument("--mongo", action="store_true", help="Use MONGO_URI instead of mongomock")
+    parser.add_argument("--db-name", default="yt_automation_bench")
+    parser.add_argument("--out", help="Write results JSON here")
+    args = parser.parse_args()
+
+    if not args.db_name.endswith("_bench"):
+        parser.error("--db-name must end in _bench (it is dropped)")
+
+    out_path = os.path.abspath(args.out) if args.out else None
+    work_dir = tempfile.mkdtemp(prefix="bench_script_batch_")
+    fakes, base_url = start_fakes(args)
+    try:
+        configure_env(args, base_url)
+        # Metadata files and caches land here, not in the repo
+        os.chdir(work_dir)
+        if not args.mongo:
+            use_mongomock()
+        route_requests(base_url)
+
+        results = {}
+        for mode in ("sequential", "one", "two"):
+            print(f"⏱️ {mode}: {args.tasks} pending task(s), {args.workers} worker(s) per batch run")
+            results[mode] = run_mode(mode, args, base_url)
+    finally:
+        fakes.terminate()
+        fakes.wait()
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\n🧠 Batch scripting, {args.groq_latency_ms:.0f}ms per Groq call")
+    print(f"{'mode':<10} {'scripted':>9} {'s':>7} {'per min':>8} {'groq':>6} {'tok/script':>11} "
+          f"{'prompt':>7} {'prefix':>7} {'twice':>6} {'left':>5}")
+    for mode, r in results.items():
+        print(f"{mode:<10} {r['scripted']:>9} {r['seconds']:>7.1f} {r['scripts_per_min']:>8.1f} "
+              f"{r['groq_calls']:>6} {r['tokens_per_script']:>11} {r['prompt_tokens_per_script']:>7} "
+              f"{r['prefix_share']:>7.0%} {r['scripted_twice']:>6} {r['left_pending']:>5}")
+
+    if out_path:
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "commit": git_commit(),
+                    "date": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "groq_latency_ms": args.groq_latency_ms,
+                    "workers": args.workers,
+                    "mongo": args.mongo,
+                },
+                "results": results,
+            }, f, indent=2)
+        print(f"\n💾 Results: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
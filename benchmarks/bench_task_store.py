@@ -0,0 +1,246 @@
+"""
+Hot-path query latency on video_tasks at N tasks (default 50k): with the
+payloads inline (the old layout), after `core.archive migrate` moved them to
+task_payloads, and after `core.archive run` moved finished tasks out.
+
+Seeds a separate database (--db-name, must end in _bench; it is dropped)
+with 60 days of realistic tasks: a ~3KB article, an 8-scene script_data and
+the AI metadata. Every phase times the same queries:
+
+- claim:    next_task() for a stage status, plus the payload it loads
+- dedup:    the 7-day window scan and URL check (db_manager.task_exists)
+- listing:  GET /tasks first page (default projection)
+- ranker:   recent titles + older uploaded performers (ranker.load_history)
+- storage:  the task list storage.scan() walks
+- buffer:   buffer depth count
+
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bench_task_store
+    python -m benchmarks.bench_task_store --tasks 5000 --mongomock   # smoke run
+    python -m benchmarks.bench_task_store --out tasks.json
+"""
+import os
+import json
+import time
+import random
+import argparse
+import platform
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.bench_imports import git_commit
+
+STATUS_MIX = [
+    ("uploaded", 0.9),
+    ("failed_qc", 0.03),
+    ("expired_buffer", 0.02),
+    ("pending", 0.01),
+    ("scripted", 0.01),
+    ("voiced", 0.01),
+    ("ready_to_assemble", 0.01),
+    ("completed_packaged", 0.01),
+]
+NICHES = {"morning": "motivation", "noon": "space", "evening": "nature", "night": "history"}
+PHASES = ("inline", "migrated", "archived")
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round((len(values) - 1) * pct)))]
+
+
+def fake_task(i, now, rng):
+    status = rng.choices([s for s, _ in STATUS_MIX], [w for _, w in STATUS_MIX])[0]
+    slot = rng.choice(list(NICHES))
+    # Unfinished tasks are recent; finished ones spread over 60 days
+    age = timedelta(minutes=rng.uniform(0, 6 * 60) if status not in ("uploaded", "failed_qc", "expired_buffer")
+                    else rng.uniform(0, 60 * 24 * 60))
+    created = now - age
+    task = {
+        "title": f"Story {i}: {rng.choice(['NASA', 'Ocean', 'Empire', 'Habit'])} {rng.random():.6f}",
+        "content": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 55,
+        "source": NICHES[slot].upper(),
+        "status": status,
+        "source_url": f"https://example.com/story/{i}",
+        "niche": NICHES[slot],
+        "slot": slot,
+        "folder_path": f"/nonexistent/bench/{i}",
+        "created_at": created,
+        "script_data": [
+            {
+                "text": "Scientists have made a discovery that changes everything we knew.",
+                "keywords": ["Scientist", "Laboratory", "Microscope"],
+                "image_count": 2,
+                "audio_path": f"/nonexistent/bench/{i}/voice_{s}_0123456789.mp3",
+                "duration": 5.2,
+                "image_paths": [f"/nonexistent/bench/{i}/scene_{s}_img_{j}_0123456789.jpg" for j in range(2)],
+            }
+            for s in range(8)
+        ],
+        "ai_description": "A three sentence summary of the story. " * 6 + "Subscribe for more!",
+        "ai_hashtags": "#Shorts #Space #Science #Facts",
+        "ai_tags": "space, nasa, science, universe, facts, shorts",
+    }
+    if status == "uploaded":
+        task["youtube_id"] = f"yt{i:09d}"
+        task["uploaded_at"] = (created + timedelta(minutes=20)).astimezone().strftime("%Y-%m-%d %H:%M:%S")
+        if age > timedelta(days=7):
+            task["storage_purged"] = True
+    if status == "expired_buffer":
+        task["expired_at"] = created + timedelta(hours=30)
+    return task
+
+
+def seed(db, n, seed_value=7):
+    rng = random.Random(seed_value)
+    now = datetime.now(timezone.utc)
+    db.client.drop_database(db.db_name)
+    batch = []
+    for i in range(n):
+        batch.append(fake_task(i, now, rng))
+        if len(batch) == 1000:
+            db.collection.insert_many(batch)
+            batch = []
+    if batch:
+        db.collection.insert_many(batch)
+    db.ensure_indexes()
+
+
+def queries(db):
+    from core.ranker import HeadlineRanker
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=7)
+    ranker = HeadlineRanker(db)
+
+    def claim():
+        for status in ("pending", "scripted", "voiced", "ready_to_assemble"):
+            task = db.next_task(status)
+            db.load_payload(task, ("content",) if status == "pending" else ("script_data",))
+
+    def dedup():
+        db.collection.find_one({"source_url": "https://example.com/story/0", "created_at": {"$gte": cutoff}})
+        for _ in db.collection.find({"created_at": {"$gte": cutoff}}, {"title": 1}):
+            pass
+
+    def listing():
+        list(db.collection.find({}, {"content": 0, "script_data": 0}).sort("_id", -1).limit(100))
+
+    def ranker_history():
+        ranker.load_history("space")
+
+    def storage():
+        query = {"folder_path": {"$exists": True}, "storage_purged": {"$ne": True}}
+        for _ in db.collection.find(query, {"folder_path": 1, "status": 1}):
+            pass
+
+    def buffer():
+        db.collection.count_documents({"status": "buffered", "slot": "noon"})
+
+    return {
+        "claim": claim,
+        "dedup": dedup,
+        "listing": listing,
+        "ranker": ranker_history,
+        "storage": storage,
+        "buffer": buffer,
+    }
+
+
+def measure(db, repeat):
+    results = {}
+    for name, run in queries(db).items():
+        run()  # warm-up: cache, query plan
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            times.append((time.perf_counter() - start) * 1000)
+        results[name] = {
+            "p50_ms": round(percentile(times, 0.5), 2),
+            "p95_ms": round(percentile(times, 0.95), 2),
+        }
+    return results
+
+
+def print_phases(phases):
+    names = list(next(iter(phases.values()))["queries"])
+    print(f"\n📊 Query p50 / p95 ms")
+    print(f"{'query':<9}" + "".join(f" {phase:>19}" for phase in phases))
+    for name in names:
+        cells = [f"{p['queries'][name]['p50_ms']:.2f} / {p['queries'][name]['p95_ms']:.2f}" for p in phases.values()]
+        print(f"{name:<9}" + "".join(f" {c:>19}" for c in cells))
+
+    print(f"\n🗄️ Collections")
+    for phase, p in phases.items():
+        parts = []
+        for coll, r in p["collections"].items():
+            avg = f", avg {r['avg_bytes'] / 1024:.1f}KB" if r.get("avg_bytes") else ""
+            parts.append(f"{coll} {r['count']}{avg}")
+        extra = f" (took {p['seconds']:.1f}s)" if p.get("seconds") is not None else ""
+        print(f"   {phase:<9} {'; '.join(parts)}{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="video_tasks query latency: inline vs payloads vs archive")
+    parser.add_argument("--tasks", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--db-name", default="yt_automation_bench")
+    parser.add_argument("--mongomock", action="store_true", help="No server; latencies are not representative")
+    parser.add_argument("--out", help="Write results JSON here")
+    args = parser.parse_args()
+
+    if not args.db_name.endswith("_bench"):
+        parser.error("--db-name must end in _bench (it is dropped)")
+    os.environ["DB_NAME"] = args.db_name
+    if args.mongomock:
+        from benchmarks.bench_pipeline import use_mongomock
+
+        os.environ["MONGO_URI"] = "mongodb://mongomock"
+        use_mongomock()
+
+    from core.archive import TaskArchive
+    from core.db_manager import DBManager
+
+    db = DBManager()
+    archive = TaskArchive(db)
+    print(f"🌱 Seeding {args.tasks} tasks into {args.db_name}...")
+    seed(db, args.tasks)
+
+    phases = {}
+    for phase in PHASES:
+        seconds = None
+        start = time.perf_counter()
+        if phase == "migrated":
+            archive.migrate()
+            seconds = time.perf_counter() - start
+        elif phase == "archived":
+            archive.ensure_indexes()
+            archive.run()
+            seconds = time.perf_counter() - start
+        print(f"⏱️ {phase}...")
+        phases[phase] = {
+            "seconds": seconds,
+            "queries": measure(db, args.repeat),
+            "collections": archive.report()["collections"],
+        }
+
+    print_phases(phases)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "commit": git_commit(),
+                    "date": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "tasks": args.tasks,
+                    "repeat": args.repeat,
+                    "mongomock": args.mongomock,
+                },
+                "phases": phases,
+            }, f, indent=2)
+        print(f"\n💾 Results: {args.out}")
+    db.client.drop_database(args.db_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Offline evaluation of the headline pre-ranker.
+
+Compares, for each recorded slot, the LLM judge's pick over ALL candidates
+with (a) the LLM pick over the ranker's top-K and (b) the ranker alone.
+
+    # snapshot today's feeds once (needs network)
+    python -m benchmarks.eval_ranker --record benchmarks/fixtures/ranker_slots.json
+    # replay as often as needed
+    python -m benchmarks.eval_ranker --snapshot benchmarks/fixtures/ranker_slots.json
+"""
+import json
+import time
+import argparse
+from core.scraper import NewsScraper
+
+
+def record(scraper, path):
+    slots = []
+    for slot, config in scraper.niche_map.items():
+        candidates = []
+        for url in config["sources"]:
+            for e in scraper.fetch_rss(url):
+                if hasattr(e, "title"):
+                    candidates.append(
+                        {
+                            "title": e.title,
+                            "link": getattr(e, "link", ""),
+                            "published": scraper.published_ts(e),
+                        }
+                    )
+        slots.append({"slot": slot, "niche": config["niche"], "candidates": candidates})
+        print(f"📥 {slot}: {len(candidates)} candidates")
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"recorded_at": time.time(), "slots": slots}, f, indent=2)
+    print(f"✅ Snapshot saved: {path}")
+
+
+def tokens_used(scraper):
+    s = scraper.llm.summary()
+    return s["prompt_tokens"] + s["completion_tokens"]
+
+
+def evaluate(scraper, path):
+    with open(path, "r", encoding="utf-8") as f:
+        slots = json.load(f)["slots"]
+
+    rows = []
+    for entry in slots:
+        niche = entry["niche"]
+        candidates = [dict(c, niche=niche) for c in entry["candidates"]]
+        if len(candidates) < 2:
+            continue
+
+        # A) LLM over everything (today's behaviour before the pre-ranker)
+        t0, k0 = time.perf_counter(), tokens_used(scraper)
+        full = scraper.pick_viral_topic([dict(c) for c in candidates], niche)
+        full_time, full_tokens = time.perf_counter() - t0, tokens_used(scraper) - k0
+
+        # B) Ranker shortlist -> LLM
+        t0 = time.perf_counter()
+        ranked = scraper.ranker.rank([dict(c) for c in candidates], niche)
+        rank_ms = (time.perf_counter() - t0) * 1000
+        shortlist = ranked[: scraper.ranker.top_k]
+        t0, k0 = time.perf_counter(), tokens_used(scraper)
+        pre = scraper.pick_viral_topic(shortlist, niche)
+        pre_time, pre_tokens = time.perf_counter() - t0, tokens_used(scraper) - k0
+
+        top_titles = [c["title"] for c in shortlist]
+        rows.append(
+            {
+                "slot": entry["slot"],
+                "candidates": len(candidates),
+                "full_pick": full["title"],
+                "prerank_pick": pre["title"],
+                "local_pick": ranked[0]["title"],
+                "full_pick_in_top_k": full["title"] in top_titles,
+                "prerank_agrees": pre["title"] == full["title"],
+                "local_agrees": ranked[0]["title"] == full["title"],
+                "rank_ms": round(rank_ms, 2),
+                "full_seconds": round(full_time, 2),
+                "prerank_seconds": round(pre_time, 2),
+                "full_tokens": full_tokens,
+                "prerank_tokens": pre_tokens,
+            }
+        )
+
+    if not rows:
+        print("📭 Nothing to evaluate.")
+        return []
+
+    n = len(rows)
+    print("\n📊 PRE-RANKER EVALUATION")
+    for r in rows:
+        print(
+            f"   {r['slot']:<8} {r['candidates']:>3} cands | in top-K: {r['full_pick_in_top_k']!s:<5} "
+            f"| shortlist agrees: {r['prerank_agrees']!s:<5} | local agrees: {r['local_agrees']!s:<5} "
+            f"| tokens {r['full_tokens']} -> {r['prerank_tokens']}"
+        )
+    print(f"   Full pick inside top-K: {sum(r['full_pick_in_top_k'] for r in rows)}/{n}")
+    print(f"   Shortlist agreement:    {sum(r['prerank_agrees'] for r in rows)}/{n}")
+    print(f"   Ranker-only agreement:  {sum(r['local_agrees'] for r in rows)}/{n}")
+    print(
+        f"   Judge tokens:           {sum(r['full_tokens'] for r in rows)} -> "
+        f"{sum(r['prerank_tokens'] for r in rows)}"
+    )
+    print(f"   Avg rank time:          {sum(r['rank_ms'] for r in rows) / n:.2f}ms")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate the headline pre-ranker")
+    parser.add_argument("--record", help="Fetch live feeds and save a snapshot here")
+    parser.add_argument("--snapshot", help="Replay a saved snapshot")
+    parser.add_argument("--out", help="Write per-slot results as JSON")
+    args = parser.parse_args()
+
+    scraper = NewsScraper()
+    if args.record:
+        record(scraper, args.record)
+    if args.snapshot:
+        results = evaluate(scraper, args.snapshot)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
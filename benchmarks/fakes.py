@@ -0,0 +1,362 @@
+"""
+Local stand-ins for every external service the pipeline talks to, so a full
+run_creation_pipeline can be benchmarked on a box with no network.
+
+Runs as its own process (so its CPU and memory stay out of the pipeline's
+numbers) and serves:
+
+    /groq/...              OpenAI-compatible chat completions (GROQ_BASE_URL)
+    /youtube/upload        the resumable upload protocol (YOUTUBE_UPLOAD_URL)
+    /ext/<host>/<path>     everything else: RSS feeds, articles, Google image
+                           search, Unsplash, Pexels and the image files
+    /_config               {"feeds": {url: [niche, index]}, "hosts": {host:
+                           {"latency_ms", "fail_rate"}}} (slow/flaky providers)
+
+`route_requests()` rewrites every non-local `requests` URL to /ext/<host>/...
+so the hardcoded feed and provider URLs in the stages resolve here.
+
+    python -m benchmarks.fakes --port 8765
+"""
+import io
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit, parse_qs, quote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+LOCAL_HOSTS = {"127.0.0.1", "localhost"}
+
+# Roughly what the real providers hand back for the URLs the stages use
+# (landscape; portrait results are the same size turned, fit=crop gives w x h)
+IMAGE_SIZES = {
+    "images.unsplash.com": (1080, 720),  # urls.regular
+    "images.pexels.com": (1880, 1253),  # src.large2x
+    "images.fixture.test": (1200, 800),  # Google image results
+}
+
+
+class FakeState:
+    def __init__(self, latency, groq_latency, seed):
+        self.latency = latency
+        self.groq_latency = groq_latency
+        self.seed = seed
+        self.feeds = {}  # feed url -> (niche, index within the niche)
+        self.hosts = {}  # host -> {"latency_ms", "fail_rate"}: per-provider behaviour
+        self.rng = random.Random(seed)
+        self.uploads = {}  # session id -> {"total", "received"}
+        self.images = {}
+        self.stats = {"requests": 0, "bytes_out": 0, "groq_calls": 0, "uploaded_bytes": 0}
+        self.lock = threading.Lock()
+
+    def count(self, sent):
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["bytes_out"] += sent
+
+    # ---------- fixtures ----------
+
+    def feed(self, url):
+        niche, index = self.feeds.get(url, (None, 0))
+        if niche is None:
+            return None
+        with open(os.path.join(FIXTURES, "rss", f"{niche}.xml"), "r", encoding="utf-8") as f:
+            xml = f.read()
+
+        # Each source gets its own window of items, with fresh pubDates
+        head, _, rest = xml.partition("<item>")
+        items = ["<item>" + part for part in rest.split("<item>")]
+        items[-1] = items[-1].split("</channel>")[0]
+        window = [items[(index * 3 + i) % len(items)] for i in range(10)]
+        now = datetime.now(timezone.utc)
+        for i, item in enumerate(window):
+            stamp = format_datetime(now - timedelta(hours=2 + i * 5 + index), usegmt=True)
+            window[i] = re.sub(r"<pubDate>.*?</pubDate>", f"<pubDate>{stamp}</pubDate>", item)
+        return head + "".join(window) + "</channel>\n</rss>\n"
+
+    def article(self, path):
+        niche, _, number = path.strip("/").partition("/")
+        try:
+            with open(os.path.join(FIXTURES, "rss", f"{niche}.xml"), "r", encoding="utf-8") as f:
+                xml = f.read()
+            titles = re.findall(r"<item>\s*<title>(.*?)</title>", xml)
+            summaries = re.findall(r"<description>(.*?)</description>", xml)[1:]
+            n = int(number)
+            title, summary = titles[n], summaries[n]
+        except (OSError, ValueError, IndexError):
+            return None
+
+        rng = random.Random(f"{self.seed}:{path}")
+        filler = [
+            "Researchers say the finding surprised even the team that made it.",
+            "The work was published this week after two years of checks.",
+            "Other groups are already trying to repeat the measurements.",
+            "Experts caution that more data is needed before drawing conclusions.",
+            "The team plans a follow-up study with new instruments next year.",
+            "Local officials welcomed the news and promised further support.",
+        ]
+        paragraphs = [summary]
+        for _ in range(9):
+            paragraphs.append(" ".join(rng.choice(filler) for _ in range(4)))
+        with open(os.path.join(FIXTURES, "article.html"), "r", encoding="utf-8") as f:
+            page = f.read()
+        body = "\n      ".join(f"<p>{p}</p>" for p in paragraphs)
+        return page.replace("{title}", title).replace("{paragraphs}", body)
+
+    def image(self, host, path, query=None):
+        from PIL import Image
+
+        width, height = IMAGE_SIZES.get(host, (1080, 720))
+        query = query or {}
+        if query.get("fit") == ["crop"] and "w" in query and "h" in query:
+            # imgix (Unsplash) / Pexels resizing: fit=crop gives exactly w x h
+            width, height = int(query["w"][0]), int(query["h"][0])
+        elif "portrait" in path:
+            width, height = height, width
+        # q= (imgix) or auto=compress (Pexels) ask for stronger compression
+        quality = int(query["q"][0]) if "q" in query else 75 if query.get("auto") == ["compress"] else 85
+        variant = int(hashlib.md5(path.encode()).hexdigest(), 16) % 6
+        key = (width, height, variant, quality)
+        with self.lock:
+            cached = self.images.get(key)
+        if cached:
+            return cached
+
+        # Gradient + noise: compresses like a photo, not like a flat colour
+        rng = random.Random(f"{self.seed}:{variant}")
+        top = tuple(rng.randrange(256) for _ in range(3))
+        bottom = tuple(rng.randrange(256) for _ in range(3))
+        gradient = Image.linear_gradient("L").resize((width, height))
+        img = Image.composite(Image.new("RGB", (width, height), top),
+                              Image.new("RGB", (width, height), bottom), gradient)
+        noise = Image.effect_noise((width, height), 40).convert("RGB")
+        img = Image.blend(img, noise, 0.25)
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=quality)
+        data = buf.getvalue()
+        with self.lock:
+            self.images[key] = data
+        return data
+
+    # ---------- groq ----------
+
+    def chat(self, body):
+        messages = body.get("messages", [])
+        system = next((m["content"] for m in messages if m["role"] == "system"), "")
+        user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+
+        if "Return ONLY the index number" in user:
+            content = str(random.Random(f"{self.seed}:{user}").randrange(3))
+        elif "Documentary Director" in system:
+            content = json.dumps(self.script(user))
+        else:
+            content = "{}"  # repair follow-ups: nothing to patch
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": content},
+                 "finish_reason": "stop"}
+            ],
+            "usage": {
+                "prompt_tokens": sum(len(m["content"]) for m in messages) // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": (sum(len(m["content"]) for m in messages) + len(content)) // 4,
+            },
+        }
+
+    def script(self, user):
+        niche = re.search(r"NICHE: (\w+)", user)
+        niche = niche.group(1) if niche else "general"
+        source = user.split("SOURCE:", 1)[-1].strip().strip('"')
+        sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+", source) if len(s.strip()) > 20]
+        words = [w for w in re.findall(r"[A-Za-z]{5,}", source)] or [niche.title()]
+        rng = random.Random(f"{self.seed}:{source[:200]}")
+
+        scenes = [{"text": "Stop scrolling, you need to see this.",
+                   "keywords": [words[0], niche.title()], "image_count": 1}]
+        for sentence in (sentences or [source[:150]])[:6]:
+            scenes.append({"text": sentence[:180],
+                           "keywords": [rng.choice(words), rng.choice(words)],
+                           "image_count": rng.choice([1, 2])})
+        scenes.append({"text": f"Follow us for more {niche} stories and daily discoveries!",
+                       "keywords": ["Subscribe Button", "Social Media"], "image_count": 1})
+        return {
+            "title": f"You Won't BELIEVE This {niche.title()} Story",
+            "description": f"{scenes[1]['text']} Follow for more {niche} stories!",
+            "hashtags": f"#Viral #Shorts #{niche} #news #facts",
+            "tags": f"{niche}, shorts, news",
+            "scenes": scenes,
+        }
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None  # set by serve()
+
+    def log_message(self, *args):
+        pass
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status, body=b"", content_type="application/json", headers=None):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.state.count(len(body))
+
+    # ---------- dispatch ----------
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == "/_stats":
+            return self._send(200, json.dumps(self.state.stats))
+        if parts.path.startswith("/ext/"):
+            return self.external(parts)
+        self._send(404, "{}")
+
+    def do_POST(self):
+        parts = urlsplit(self.path)
+        body = self._body()
+        if parts.path == "/_config":
+            config = json.loads(body)
+            if "feeds" in config:
+                self.state.feeds = {url: tuple(v) for url, v in config["feeds"].items()}
+            if "hosts" in config:
+                self.state.hosts = config["hosts"]
+            return self._send(200, "{}")
+        if parts.path.endswith("/chat/completions"):
+            time.sleep(self.state.groq_latency)
+            with self.state.lock:
+                self.state.stats["groq_calls"] += 1
+            return self._send(200, json.dumps(self.state.chat(json.loads(body))))
+        if parts.path == "/youtube/upload":
+            session = hashlib.md5(f"{time.time()}:{id(body)}".encode()).hexdigest()[:12]
+            total = int(self.headers.get("X-Upload-Content-Length") or 0)
+            with self.state.lock:
+                self.state.uploads[session] = {"total": total, "received": 0}
+            host = self.headers.get("Host")
+            return self._send(200, "", headers={"Location": f"http://{host}/youtube/session/{session}"})
+        self._send(404, "{}")
+
+    def do_PUT(self):
+        parts = urlsplit(self.path)
+        body = self._body()
+        session = self.state.uploads.get(parts.path.rsplit("/", 1)[-1])
+        if not session:
+            return self._send(404, "{}")
+        content_range = self.headers.get("Content-Range", "")
+        if not content_range.startswith("bytes */"):
+            start = int(content_range.split()[1].split("-")[0])
+            if start != session["received"]:
+                return self._send(400, json.dumps({"error": "offset mismatch"}))
+            session["received"] += len(body)
+            with self.state.lock:
+                self.state.stats["uploaded_bytes"] += len(body)
+        if session["received"] >= session["total"]:
+            video_id = "bench" + parts.path.rsplit("/", 1)[-1][:6]
+            return self._send(200, json.dumps({"id": video_id, "kind": "youtube#video"}))
+        headers = {"Range": f"bytes=0-{session['received'] - 1}"} if session["received"] else {}
+        self._send(308, "", headers=headers)
+
+    def external(self, parts):
+        host, _, path = parts.path[len("/ext/"):].partition("/")
+        behaviour = self.state.hosts.get(host, {})
+        time.sleep(behaviour.get("latency_ms", self.state.latency * 1000) / 1000)
+        with self.state.lock:
+            failing = self.state.rng.random() < behaviour.get("fail_rate", 0)
+        if failing:
+            return self._send(503, json.dumps({"error": "unavailable"}))
+        path = "/" + path
+        query = parse_qs(parts.query)
+        original = f"https://{host}{path}"
+
+        if host == "news.fixture.test":
+            page = self.state.article(path)
+            return self._send(200 if page else 404, page or "", "text/html; charset=utf-8")
+        if host in IMAGE_SIZES:
+            return self._send(200, self.state.image(host, path, query), "image/jpeg")
+        if host == "api.unsplash.com":
+            q = quote(query.get("query", ["x"])[0])
+            shape = "portrait" if query.get("orientation") == ["portrait"] else "landscape"
+            results = [{"urls": {"raw": f"https://images.unsplash.com/photo-{q}-{i}-{shape}?ixid=fake",
+                                 "regular": f"https://images.unsplash.com/photo-{q}-{i}-{shape}?ixid=fake&q=80&w=1080"}}
+                       for i in range(int(query.get("per_page", ["3"])[0]))]
+            return self._send(200, json.dumps({"results": results}))
+        if host == "api.pexels.com":
+            q = quote(query.get("query", ["x"])[0])
+            shape = "portrait" if query.get("orientation") == ["portrait"] else "landscape"
+            photos = []
+            for i in range(int(query.get("per_page", ["3"])[0])):
+                original = f"https://images.pexels.com/photos/{q}-{i}-{shape}.jpeg"
+                photos.append({"src": {"original": original,
+                                       "large2x": f"{original}?auto=compress&cs=tinysrgb&dpr=2&h=650&w=940"}})
+            return self._send(200, json.dumps({"photos": photos}))
+        if host == "www.google.com":
+            q = quote(query.get("q", ["x"])[0])
+            blobs = ", ".join(f'"https://images.fixture.test/{q}/{i}.jpg"' for i in range(3))
+            return self._send(200, f"<html><script>var data = [{blobs}];</script></html>",
+                              "text/html; charset=utf-8")
+
+        feed = self.state.feed(original) or self.state.feed(f"http://{host}{path}")
+        if feed:
+            return self._send(200, feed, "application/rss+xml; charset=utf-8")
+        self._send(404, "not a fixture", "text/plain")
+
+
+def serve(port=0, latency=0.03, groq_latency=0.3, seed=7):
+    Handler.state = FakeState(latency, groq_latency, seed)
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def route_requests(base_url):
+    """Sends every non-local `requests` call to the fake server's /ext/ tree."""
+    import requests
+
+    original_send = requests.adapters.HTTPAdapter.send
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        if parts.hostname not in LOCAL_HOSTS:
+            request.url = f"{base_url}/ext/{parts.hostname}{parts.path or '/'}" + (
+                f"?{parts.query}" if parts.query else ""
+            )
+        return original_send(self, request, **kwargs)
+
+    requests.adapters.HTTPAdapter.send = send
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake external services for benchmarks")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=30)
+    parser.add_argument("--groq-latency-ms", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    server = serve(args.port, args.latency_ms / 1000, args.groq_latency_ms / 1000, args.seed)
+    # The harness reads the port from this line
+    print(f"READY {server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,235 @@
+import os
+import argparse
+from datetime import datetime, timedelta, timezone
+import bson
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+from core.db_manager import DBManager, PAYLOAD_FIELDS
+from core.storage import status_time
+
+# Finished tasks leave video_tasks this long after they finished. Never less
+# than 8 days, so the 7-day duplicate check (db_manager.task_exists) and the
+# ranker's novelty window still see every task they need.
+ARCHIVE_AFTER_DAYS = max(8.0, float(os.getenv("ARCHIVE_AFTER_DAYS", 14)))
+# ...and the archive forgets them this long after that (TTL index)
+ARCHIVE_TTL_DAYS = float(os.getenv("ARCHIVE_TTL_DAYS", 365))
+ARCHIVE_STATUSES = ("uploaded", "expired_buffer", "failed_qc")
+
+# What an archived scene keeps: the narration, not paths to files that are gone
+SCENE_FIELDS = ("text", "keywords", "duration")
+# Never copied to the archive: the article can be re-read at source_url
+DROPPED_FIELDS = ("content", "upload_session")
+
+# A payload younger than this may belong to a task that is being inserted
+ORPHAN_GRACE = timedelta(hours=1)
+
+
+def now_utc():
+    return datetime.now(timezone.utc)
+
+
+def compact(task, payload):
+    """The archive document for a task: small fields, its script text and AI metadata."""
+    doc = {k: v for k, v in task.items() if k not in DROPPED_FIELDS}
+    for field in PAYLOAD_FIELDS:
+        if field in payload and field not in DROPPED_FIELDS:
+            doc[field] = payload[field]
+    doc["script_data"] = [
+        {k: scene[k] for k in SCENE_FIELDS if k in scene}
+        for scene in doc.get("script_data") or []
+    ]
+    doc["archived_at"] = now_utc()
+    return doc
+
+
+class TaskArchive:
+    """
+    Keeps `video_tasks` small:
+
+    - migrate(): moves the inline payload fields of old task documents to
+      `task_payloads` (what DBManager.add_task/update_task do for new tasks);
+    - run(): moves finished tasks whose files are gone to `task_archive`,
+      compacted, where a TTL index drops them after ARCHIVE_TTL_DAYS, and
+      deletes payloads that have no task any more;
+    - report(): document counts and sizes of the three collections.
+    """
+
+    def __init__(self, db=None, dry_run=False):
+        self.db = db or DBManager()
+        self.dry_run = dry_run
+
+    def ensure_indexes(self):
+        ttl = int(ARCHIVE_TTL_DAYS * 86400)
+        try:
+            self.db.archive.create_index("archived_at", expireAfterSeconds=ttl)
+        except OperationFailure:
+            # The TTL changed since the index was made
+            self.db.db.command(
+                "collMod",
+                self.db.archive.name,
+                index={"keyPattern": {"archived_at": 1}, "expireAfterSeconds": ttl},
+            )
+        # The ranker's "older uploaded titles in this niche"
+        self.db.archive.create_index([("niche", 1), ("status", 1), ("created_at", -1)])
+
+    # ---------- migration ----------
+
+    def migrate(self, batch_size=500):
+        """Moves inline payload fields out of task documents. Returns (tasks, bytes moved)."""
+        query = {"$or": [{f: {"$exists": True}} for f in PAYLOAD_FIELDS]}
+        projection = dict.fromkeys(PAYLOAD_FIELDS, 1)
+        moved = moved_bytes = 0
+        batch = []
+
+        def flush(batch):
+            ids = [t["_id"] for t in batch]
+            stored = {
+                p["_id"]: p
+                for p in self.db.payloads.find({"_id": {"$in": ids}}, projection)
+            }
+            payload_ops, task_ops = [], []
+            for task in batch:
+                inline = {f: task[f] for f in PAYLOAD_FIELDS if f in task}
+                # A payload field written since (update_task) is newer than the inline copy
+                fresh = {k: v for k, v in inline.items() if k not in stored.get(task["_id"], {})}
+                if fresh:
+                    payload_ops.append(UpdateOne({"_id": task["_id"]}, {"$set": fresh}, upsert=True))
+                task_ops.append(UpdateOne({"_id": task["_id"]}, {"$unset": dict.fromkeys(inline, "")}))
+            if self.dry_run:
+                return
+            # Payloads first: a task never loses a field that isn't stored yet
+            if payload_ops:
+                self.db.payloads.bulk_write(payload_ops, ordered=False)
+            self.db.collection.bulk_write(task_ops, ordered=False)
+
+        for task in self.db.collection.find(query, projection).batch_size(batch_size):
+            batch.append(task)
+            moved += 1
+            moved_bytes += len(bson.encode({f: task[f] for f in PAYLOAD_FIELDS if f in task}))
+            if len(batch) == batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+
+        verb = "Would move" if self.dry_run else "Moved"
+        print(f"📦 Migration: {verb} payloads of {moved} task(s), {moved_bytes / 1024 / 1024:.1f}MB")
+        return moved, moved_bytes
+
+    # ---------- archive ----------
+
+    def is_archivable(self, task, now):
+        since = status_time(task)
+        if since is None or now - since < timedelta(days=ARCHIVE_AFTER_DAYS):
+            return False
+        # storage.py finds folders through their task; keep the task until they're gone
+        folder = task.get("folder_path")
+        return bool(task.get("storage_purged")) or not folder or not os.path.exists(folder)
+
+    def run(self, now=None):
+        """Archives finished tasks. Returns the number archived."""
+        now = now or now_utc()
+        cutoff = now - timedelta(days=ARCHIVE_AFTER_DAYS)
+        # created_at <= status time, so this is a safe (indexed) pre-filter
+        candidates = self.db.collection.find(
+            {"status": {"$in": list(ARCHIVE_STATUSES)}, "created_at": {"$lt": cutoff}}
+        )
+        archived = 0
+        for task in candidates:
+            if not self.is_archivable(task, now):
+                continue
+            if self.dry_run:
+                archived += 1
+                continue
+            payload = self.db.payloads.find_one({"_id": task["_id"]}) or {}
+            # Copy first, then delete: a crash in between leaves a duplicate, never a loss
+            self.db.archive.replace_one({"_id": task["_id"]}, compact(task, payload), upsert=True)
+            res = self.db.collection.delete_one({"_id": task["_id"], "status": task["status"]})
+            if res.deleted_count != 1:
+                # Its status changed since the find: the task is live again, so it
+                # keeps its payload and the copy goes
+                self.db.archive.delete_one({"_id": task["_id"]})
+                continue
+            self.db.payloads.delete_one({"_id": task["_id"]})
+            archived += 1
+
+        verb = "Would archive" if self.dry_run else "Archived"
+        print(f"🗄️ Archive: {verb} {archived} finished task(s)")
+        return archived
+
+    def prune_orphans(self, batch_size=1000, now=None):
+        """Deletes payloads whose task is gone (reset_db, a failed insert). Returns the count."""
+        grace = bson.ObjectId.from_datetime((now or now_utc()) - ORPHAN_GRACE)
+        orphans = []
+        batch = []
+
+        def check(batch):
+            alive = {t["_id"] for t in self.db.collection.find({"_id": {"$in": batch}}, {"_id": 1})}
+            orphans.extend(i for i in batch if i not in alive)
+
+        for payload in self.db.payloads.find({"_id": {"$lt": grace}}, {"_id": 1}):
+            batch.append(payload["_id"])
+            if len(batch) == batch_size:
+                check(batch)
+                batch = []
+        if batch:
+            check(batch)
+
+        if orphans and not self.dry_run:
+            for i in range(0, len(orphans), batch_size):
+                self.db.payloads.delete_many({"_id": {"$in": orphans[i : i + batch_size]}})
+        verb = "Would delete" if self.dry_run else "Deleted"
+        print(f"🧽 Payloads: {verb} {len(orphans)} orphan(s)")
+        return len(orphans)
+
+    # ---------- reporting ----------
+
+    def report(self):
+        rows = {}
+        for coll in (self.db.collection, self.db.payloads, self.db.archive):
+            try:
+                stats = self.db.db.command({"collStats": coll.name})
+                rows[coll.name] = {
+                    "count": stats.get("count", 0),
+                    "avg_bytes": stats.get("avgObjSize", 0),
+                    "data_bytes": stats.get("size", 0),
+                    "storage_bytes": stats.get("storageSize", 0),
+                }
+            except (OperationFailure, NotImplementedError):
+                # No collStats (no permission, or mongomock in the benchmarks)
+                rows[coll.name] = {"count": coll.estimated_document_count()}
+        inline = self.db.collection.count_documents(
+            {"$or": [{f: {"$exists": True}} for f in PAYLOAD_FIELDS]}
+        )
+        return {"collections": rows, "unmigrated_tasks": inline}
+
+
+def print_report(report):
+    kb = 1024
+    print(f"\n🗄️ Task storage")
+    print(f"{'collection':<14} {'docs':>8} {'avg KB':>8} {'data MB':>9} {'disk MB':>9}")
+    for name, r in report["collections"].items():
+        cells = [r.get("avg_bytes"), r.get("data_bytes"), r.get("storage_bytes")]
+        avg, data, disk = [
+            "-" if c is None else f"{c / (kb if i == 0 else kb * kb):.1f}"
+            for i, c in enumerate(cells)
+        ]
+        print(f"{name:<14} {r['count']:>8} {avg:>8} {data:>9} {disk:>9}")
+    if report["unmigrated_tasks"]:
+        print(f"   ⚠️ {report['unmigrated_tasks']} task(s) still carry payloads inline: run `migrate`")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Task payload migration, archive and size report")
+    parser.add_argument("action", nargs="?", default="run", choices=["run", "migrate", "report"])
+    parser.add_argument("--dry-run", action="store_true", help="Only say what would change")
+    args = parser.parse_args()
+
+    archive = TaskArchive(dry_run=args.dry_run)
+    if args.action == "migrate":
+        archive.migrate()
+    if args.action == "run":
+        archive.ensure_indexes()
+        archive.run()
+        archive.prune_orphans()
+    print_report(archive.report())
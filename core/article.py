@@ -0,0 +1,243 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import requests
+from html.parser import HTMLParser
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Tags whose text is never part of the story
+SKIP_TAGS = {
+    "script", "style", "noscript", "nav", "header", "footer", "aside", "form",
+    "svg", "iframe", "button", "figure", "figcaption", "select", "template",
+}
+BLOCK_TAGS = {"p", "h2", "h3", "li", "blockquote"}
+BOILERPLATE_RE = re.compile(
+    r"(subscribe|newsletter|cookie|sign up|all rights reserved|advertisement|"
+    r"share this|related articles?|read more|follow us|click here)",
+    re.I,
+)
+
+
+class _TextCollector(HTMLParser):
+    """Collects paragraph-level text, remembering which blocks sat inside <article>."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.skip_depth = 0
+        self.article_depth = 0
+        self.block = None
+        self.link_depth = 0
+        self.link_chars = 0
+        self.blocks = []  # (text, inside_article, link_ratio)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag in ("article", "main"):
+            self.article_depth += 1
+        elif tag in BLOCK_TAGS and not self.skip_depth:
+            self._flush()
+            self.block = []
+            self.link_chars = 0
+        elif tag == "a":
+            self.link_depth += 1
+        elif tag == "br" and self.block is not None:
+            self.block.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+        elif tag in ("article", "main") and self.article_depth:
+            self.article_depth -= 1
+        elif tag == "a" and self.link_depth:
+            self.link_depth -= 1
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_data(self, data):
+        if self.skip_depth or self.block is None:
+            return
+        self.block.append(data)
+        if self.link_depth:
+            self.link_chars += len(data.strip())
+
+    def _flush(self):
+        if self.block:
+            text = re.sub(r"\s+", " ", "".join(self.block)).strip()
+            if text:
+                ratio = self.link_chars / len(text)
+                self.blocks.append((text, self.article_depth > 0, ratio))
+        self.block = None
+        self.link_chars = 0
+
+
+def extract_text(html, max_chars=8000):
+    """Returns the main story text of an HTML page, without menus, ads and footers."""
+    parser = _TextCollector()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        pass
+    parser._flush()
+
+    blocks = parser.blocks
+    # If the page marks its story with <article>/<main>, trust that
+    if any(inside for _, inside, _ in blocks):
+        blocks = [b for b in blocks if b[1]]
+
+    paragraphs = []
+    seen = set()
+    for text, _, link_ratio in blocks:
+        if len(text) < 40 or link_ratio > 0.5:
+            continue
+        if len(text) < 200 and BOILERPLATE_RE.search(text):
+            continue
+        if text in seen:
+            continue
+        seen.add(text)
+        paragraphs.append(text)
+
+    return "\n\n".join(paragraphs)[:max_chars]
+
+
+class ArticleExtractor:
+    """
+    Fetches and extracts full articles concurrently, with size/time caps and an
+    on-disk cache keyed by URL (metadata) and content hash (extracted text).
+    """
+
+    def __init__(self):
+        self.cache_dir = os.getenv("ARTICLE_CACHE_DIR", "data/article_cache")
+        self.max_bytes = int(os.getenv("ARTICLE_MAX_BYTES", 2 * 1024 * 1024))
+        self.timeout = float(os.getenv("ARTICLE_TIMEOUT", 8))
+        self.max_chars = int(os.getenv("ARTICLE_MAX_CHARS", 8000))
+        self.fresh_for = 24 * 3600  # reuse a cached article without re-fetching
+        self.headers = {"User-Agent": "Mozilla/5.0"}
+        self.pool = ThreadPoolExecutor(max_workers=int(os.getenv("ARTICLE_WORKERS", 4)))
+        os.makedirs(os.path.join(self.cache_dir, "urls"), exist_ok=True)
+        os.makedirs(os.path.join(self.cache_dir, "texts"), exist_ok=True)
+
+    # ---------- cache ----------
+
+    def _url_path(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, "urls", f"{key}.json")
+
+    def _text_path(self, content_hash):
+        return os.path.join(self.cache_dir, "texts", f"{content_hash}.txt")
+
+    def _load_meta(self, url):
+        try:
+            with open(self._url_path(url), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _load_text(self, content_hash):
+        try:
+            with open(self._text_path(content_hash), "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write(self, path, data):
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    # ---------- fetch ----------
+
+    def _download(self, url, meta):
+        headers = dict(self.headers)
+        if meta and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        with requests.get(url, headers=headers, timeout=self.timeout, stream=True) as r:
+            if r.status_code == 304:
+                return None, r.headers
+            r.raise_for_status()
+            if "html" not in r.headers.get("Content-Type", "text/html"):
+                raise ValueError(f"not HTML ({r.headers.get('Content-Type')})")
+
+            chunks, size = [], 0
+            deadline = time.monotonic() + self.timeout
+            for chunk in r.iter_content(64 * 1024):
+                chunks.append(chunk)
+                size += len(chunk)
+                # Cap both size and total read time (a slow drip can dodge `timeout`)
+                if size >= self.max_bytes or time.monotonic() > deadline:
+                    break
+            body = b"".join(chunks)
+            # requests assumes latin-1 when no charset is sent; most sites are utf-8
+            charset = r.encoding if "charset" in r.headers.get("Content-Type", "") else "utf-8"
+            return body.decode(charset or "utf-8", errors="replace"), r.headers
+
+    def fetch(self, url):
+        """Returns {"url", "text", "chars", "seconds", "cached"}; text is "" on failure."""
+        started = time.monotonic()
+        result = {"url": url, "text": "", "chars": 0, "seconds": 0.0, "cached": False}
+        if not url:
+            return result
+
+        meta = self._load_meta(url)
+        if meta and time.time() - meta.get("fetched_at", 0) < self.fresh_for:
+            text = self._load_text(meta.get("content_hash", ""))
+            if text is not None:
+                result.update(text=text, chars=len(text), cached=True)
+                result["seconds"] = time.monotonic() - started
+                return result
+
+        try:
+            html, headers = self._download(url, meta)
+            if html is None:
+                # 304 Not Modified: the cached extraction is still right
+                content_hash = meta["content_hash"]
+                text = self._load_text(content_hash) or ""
+                result["cached"] = True
+            else:
+                content_hash = hashlib.sha256(html.encode("utf-8")).hexdigest()
+                text = self._load_text(content_hash)
+                if text is None:
+                    text = extract_text(html, self.max_chars)
+                    self._write(self._text_path(content_hash), text)
+
+            self._write(
+                self._url_path(url),
+                json.dumps(
+                    {
+                        "url": url,
+                        "content_hash": content_hash,
+                        "etag": headers.get("ETag"),
+                        "last_modified": headers.get("Last-Modified"),
+                        "fetched_at": time.time(),
+                    }
+                ),
+            )
+            result.update(text=text, chars=len(text))
+        except Exception as e:
+            print(f"      ⚠️ Article fetch failed ({url[:60]}): {e}")
+
+        result["seconds"] = time.monotonic() - started
+        return result
+
+    def prefetch(self, urls):
+        """Starts fetching in the background. Returns {url: Future}."""
+        return {url: self.pool.submit(self.fetch, url) for url in dict.fromkeys(urls) if url}
+
+    def collect(self, futures, urls, budget=None):
+        """Waits (at most `budget` seconds) for the given urls' futures."""
+        wanted = [futures[u] for u in urls if u in futures]
+        wait(wanted, timeout=budget if budget is not None else self.timeout * 2)
+        results = {}
+        for url in urls:
+            future = futures.get(url)
+            if future is not None and future.done() and not future.exception():
+                results[url] = future.result()
+        return results
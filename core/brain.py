@@ -1,121 +1,247 @@
 import json
-import re
 import os
-from groq import Groq  # <--- CHANGED
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from core.llm_client import get_llm_client
 from core.db_manager import DBManager
+from core.script_schema import parse_json, repair_script, apply_patch
+from core.tracing import tracer
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# A batch that crashed leaves its claimed tasks in "scripting"; after this
+# long they go back to "pending"
+SCRIPT_CLAIM_TIMEOUT = timedelta(minutes=int(os.getenv("SCRIPT_CLAIM_TIMEOUT_MIN", 30)))
+
+# 🟢 STATIC PREFIX: identical for every task, so it goes first (system message)
+# and only the short per-task part (niche + source) changes between calls.
+# That keeps the prompt prefix cache-friendly and lets batch runs reuse it.
+SCRIPT_INSTRUCTIONS = """
+    You are a helpful assistant that outputs ONLY valid JSON.
+
+    ROLE: Documentary Director.
+    TASK: Convert the news given in SOURCE into a structured video script.
+
+    REQUIREMENTS:
+    1. Break the story into 6-8 distinct SCENES.
+
+    2. 'text': The narration for that scene (1-2 sentences).
+
+    3. **VISUALS**:
+        - 'keywords': List exactly 2 specific search terms for stock footage.
+        - 'image_count': 1 (slow paced) or 2 (fast paced).
+
+    4.  **METADATA**:
+        - 'title': MUST be "Clickbait" style. High curiosity.
+        - BAD: "New Space Discovery"
+        - GOOD: "NASA Just Found THIS on Mars!?"
+        - GOOD: "You Won't Believe What Hubble Saw..."
+        - RULE: Use ALL CAPS for emphasis words. Max 50 chars.
+        - 'description': 3-sentence summary + call to action.
+        - 'hashtags': #Viral #Shorts + 3 niche tags.
+
+    5. **CRITICAL - KEYWORD RULES (ZERO TOLERANCE)**:
+        - 'keywords': A list of exactly 2 string search terms.
+        - **NEVER leave this empty.** Even for the Outro/CTA scene.
+        - **SPECIFICITY**: Use specific names (e.g., "Sony Camera", "Elon Musk", "SpaceX Rocket").
+        - **FALLBACK**: If the scene is generic, use keywords like ["Abstract Tech Background", "News Studio"].
+        - **BAD**: [] or [""] -> THIS WILL CRASH THE SYSTEM.
+        - **GOOD**: ["Sony LinkBuds", "Earbuds"] or ["Subscribe Button", "Social Media"].
+
+    6. **CRITICAL - CTA RULES**:
+        - The FINAL SCENE must be a generic social media Call to Action.
+        - Example: "Follow us for more <NICHE> stories and daily discoveries!"
+        - **FORBIDDEN**: Do NOT say "Check out our full documentary", "Watch the full video", or "Link in bio". We do NOT have a full video. Keep it short.
+
+    7. **NARRATION ('text')**:
+        - Scene 1 MUST be a "Hook". (e.g., "Stop scrolling, you need to see this.")
+        - Keep sentences punchy and conversational.
+
+    OUTPUT FORMAT (JSON ONLY):
+    {
+        "title": "Viral Title Here",
+        "description": "Short summary...",
+        "hashtags": "#Tag1 #Tag2",
+        "tags": "tag1, tag2, tag3",
+        "scenes": [
+            {
+                "text": "Scientists have made a discovery.",
+                "keywords": ["Scientist", "Lab"],
+                "image_count": 1
+            }
+        ]
+    }
+"""
+
 
 class ScriptGenerator:
     def __init__(self):
         self.db = DBManager()
-        # Initialize Groq Client
-        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))  # <--- CHANGED
+        # Shared Groq client (rate limits, retries, cache, token metrics)
+        self.llm = get_llm_client(self.db)
         self.model = "llama-3.3-70b-versatile"  # Fast, high quality
+        # Small follow-ups for single broken fields don't need the 70B model
+        self.repair_model = os.getenv("SCRIPT_REPAIR_MODEL", "llama-3.1-8b-instant")
+        self.repairs = self.db.db["script_repairs"]
 
     def repair_json(self, json_str):
-        try:
-            # Clean generic AI chatter
-            json_str = re.sub(r"^[^{]*", "", json_str)
-            json_str = re.sub(r"[^}]*$", "", json_str)
-            return json.loads(json_str)
-        except:
-            return None
+        # Clean generic AI chatter, trailing commas and cut-off output
+        return parse_json(json_str)[0]
 
-    def generate_script(self):
-        task = self.db.collection.find_one({"status": "pending"})
+    def build_messages(self, task):
+        niche = task.get("niche", "tech")
+        source = task.get("content", "")[:3000]
+        return [
+            {"role": "system", "content": SCRIPT_INSTRUCTIONS},
+            {"role": "user", "content": f'NICHE: {niche}\nSOURCE: "{source}"'},
+        ]
+
+    def generate_script(self, task_id=None):
+        # A crashed batch run's claims would otherwise hide tasks from this path too
+        self.recover_stale_claims()
+        task = self.db.next_task("pending", task_id)
         if not task:
             print("📭 No pending tasks.")
             return
 
-        niche = task.get("niche", "tech")
-        source = task.get("content", "")[:3000]
-        source_url = task.get("source_url", "https://news.google.com")
+        self.process_task(task)
 
-        # PROMPT REMAINS EXACTLY THE SAME AS BEFORE
+    def ask_for_fields(self, data, problems, niche):
+        """Re-asks the model only for the broken fields. Returns (patch, usage)."""
+        outline = {
+            "title": data.get("title", ""),
+            "scenes": {str(i): s.get("text", "") for i, s in enumerate(data["scenes"])},
+        }
         prompt = f"""
-            ROLE: Documentary Director.
-            TASK: Convert this news into a structured video script.
-            SOURCE: "{source}"
-            
-            REQUIREMENTS:
-            1. Break the story into 6-8 distinct SCENES.
-            
-            2. 'text': The narration for that scene (1-2 sentences).
-            
-            3. **VISUALS**:
-                - 'keywords': List exactly 2 specific search terms for stock footage.
-                - 'image_count': 1 (slow paced) or 2 (fast paced).
-            
-            4.  **METADATA**:
-                - 'title': MUST be "Clickbait" style. High curiosity. 
-                - BAD: "New Space Discovery"
-                - GOOD: "NASA Just Found THIS on Mars!?"
-                - GOOD: "You Won't Believe What Hubble Saw..."
-                - RULE: Use ALL CAPS for emphasis words. Max 50 chars.
-                - 'description': 3-sentence summary + call to action.
-                - 'hashtags': #Viral #Shorts + 3 niche tags.
-                
-            5. **CRITICAL - KEYWORD RULES (ZERO TOLERANCE)**:
-                - 'keywords': A list of exactly 2 string search terms.
-                - **NEVER leave this empty.** Even for the Outro/CTA scene.
-                - **SPECIFICITY**: Use specific names (e.g., "Sony Camera", "Elon Musk", "SpaceX Rocket").
-                - **FALLBACK**: If the scene is generic, use keywords like ["Abstract Tech Background", "News Studio"].
-                - **BAD**: [] or [""] -> THIS WILL CRASH THE SYSTEM.
-                - **GOOD**: ["Sony LinkBuds", "Earbuds"] or ["Subscribe Button", "Social Media"].
-            
-            6. **CRITICAL - CTA RULES**: 
-                - The FINAL SCENE must be a generic social media Call to Action.
-                - Example: "Follow us for more {niche} stories and daily discoveries!"
-                - **FORBIDDEN**: Do NOT say "Check out our full documentary", "Watch the full video", or "Link in bio". We do NOT have a full video. Keep it short.
-            
-            7. **NARRATION ('text')**:
-                - Scene 1 MUST be a "Hook". (e.g., "Stop scrolling, you need to see this.")
-                - Keep sentences punchy and conversational.
-            
-            OUTPUT FORMAT (JSON ONLY):
-            {{
-                "title": "Viral Title Here",
-                "description": "Short summary...",
-                "hashtags": "#Tag1 #Tag2",
-                "tags": "tag1, tag2, tag3",
-                "scenes": [
-                    {{
-                        "text": "Scientists have made a discovery.",
-                        "keywords": ["Scientist", "Lab"],
-                        "image_count": 1
-                    }}
-                ]
-            }}
+            This {niche} YouTube Shorts script has missing fields: {", ".join(problems)}.
+            Fill in ONLY those fields. Do not change anything else.
+            - title: clickbait, ALL CAPS emphasis words, max 50 chars.
+            - description: 3-sentence summary + call to action.
+            - scene text: 1-2 punchy narration sentences that fit between the neighbours.
+
+            SCRIPT: {json.dumps(outline)}
+
+            OUTPUT FORMAT (JSON ONLY), e.g.:
+            {{"description": "...", "scenes": {{"3": {{"text": "..."}}}}}}
         """
+        result = self.llm.chat(
+            [{"role": "user", "content": prompt}],
+            self.repair_model,
+            tag="script_repair",
+            response_format={"type": "json_object"},
+        )
+        patch, _ = parse_json(result["content"])
+        return patch, result.get("usage") or {}
 
+    def record_repair(self, task, fixes, followup_fields, full_usage, followup_usage, regenerated):
+        full_tokens = full_usage.get("total_tokens", 0)
+        followup_tokens = followup_usage.get("total_tokens", 0)
+        repaired = bool(fixes or followup_fields)
         try:
-            print(f"🧠 Groq Director: Segmenting {niche.upper()} story...")
-
-            # CALL GROQ API
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    # System prompt ensures it forces JSON mode
-                    {
-                        "role": "system",
-                        "content": "You are a helpful assistant that outputs ONLY valid JSON.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                model=self.model,
-                response_format={
-                    "type": "json_object"
-                },  # Groq supports native JSON mode!
+            self.repairs.insert_one(
+                {
+                    "task_id": task["_id"],
+                    "repaired": repaired,
+                    "regenerated": regenerated,
+                    "local_fixes": fixes,
+                    "followup_fields": followup_fields,
+                    "followup_tokens": followup_tokens,
+                    # Without repair, this script would have cost another full call
+                    "tokens_saved": max(0, full_tokens - followup_tokens) if repaired else 0,
+                    "created_at": datetime.now(timezone.utc),
+                }
             )
+        except Exception as e:
+            print(f"   ⚠️ Repair stats not saved: {e}")
 
-            response_content = chat_completion.choices[0].message.content
-            data = self.repair_json(response_content)
+    def parse_script(self, task, messages, options):
+        """Calls the model, then validates and repairs the script as cheaply as possible."""
+        niche = task.get("niche", "tech")
+        regenerated = False
+        result = self.llm.chat(messages, self.model, tag="script", **options)
+        data, fixes = parse_json(result["content"])
+        more, problems = repair_script(data, niche)
+        fixes += more
 
-            if not data or "scenes" not in data:
+        if "scenes" in problems:
+            # No usable scene list at all: a full call is the only fix.
+            # Forget the cached answer so the retry isn't the same broken one.
+            print("   ⚠️ Script has no usable scenes. Regenerating once...")
+            self.llm.forget(messages, self.model, **options)
+            regenerated = True
+            result = self.llm.chat(messages, self.model, tag="script", use_cache=False, **options)
+            data, fixes = parse_json(result["content"])
+            more, problems = repair_script(data, niche)
+            fixes += more
+            if "scenes" in problems:
+                self.llm.forget(messages, self.model, **options)
                 raise ValueError("Invalid JSON structure from AI")
 
+        followup_fields, followup_usage = [], {}
+        if problems:
+            print(f"   🩹 Asking only for broken fields: {', '.join(problems)}")
+            followup_fields = list(problems)
+            patch, followup_usage = self.ask_for_fields(data, problems, niche)
+            apply_patch(data, patch)
+            more, problems = repair_script(data, niche)
+            fixes += more
+
+            # Metadata can still be filled from what we have; scene text can't
+            if "title" in problems:
+                data["title"] = task["title"][:50]
+            if "description" in problems:
+                texts = [sc.get("text", "") for sc in data["scenes"][:2]]
+                data["description"] = " ".join(texts) + " Follow for more!"
+            problems = [p for p in problems if p not in ("title", "description")]
+            if problems:
+                raise ValueError(f"Script still broken after repair: {problems}")
+
+        if fixes:
+            print(f"   🩹 Repaired locally: {', '.join(sorted(set(fixes)))}")
+        self.record_repair(
+            task, fixes, followup_fields, result.get("usage") or {}, followup_usage, regenerated
+        )
+
+        usage = dict(result.get("usage") or {})
+        usage["total_tokens"] = usage.get("total_tokens", 0) + followup_usage.get("total_tokens", 0)
+        return data, usage
+
+    def repair_stats(self):
+        total = self.repairs.count_documents({})
+        repaired = self.repairs.count_documents({"repaired": True})
+        saved = list(
+            self.repairs.aggregate(
+                [{"$group": {"_id": None, "saved": {"$sum": "$tokens_saved"}}}]
+            )
+        )
+        return {
+            "scripts": total,
+            "repaired": repaired,
+            "repair_rate": round(repaired / total, 3) if total else 0,
+            "regenerated": self.repairs.count_documents({"regenerated": True}),
+            "tokens_saved": saved[0]["saved"] if saved else 0,
+        }
+
+    def process_task(self, task):
+        """Scripts one task and saves it. Returns the LLM usage dict or None."""
+        tracer.tag_task(task["_id"])
+        self.db.load_payload(task, ("content",))
+        niche = task.get("niche", "tech")
+        source_url = task.get("source_url", "https://news.google.com")
+
+        try:
+            print(f"🧠 Groq Director: Segmenting {niche.upper()} story...")
+
+            # CALL GROQ API
+            data, usage = self.parse_script(
+                task,
+                self.build_messages(task),
+                {"response_format": {"type": "json_object"}},  # Groq supports native JSON mode!
+            )
+
             # 🟢 Create Metadata File (Same as before)
             meta_filename = f"metadata_{task['_id']}.txt"
             metadata_content = f"""
@@ -134,20 +260,105 @@ class ScriptGenerator:
                 f.write(metadata_content)
 
             # Update Database
-            self.db.collection.update_one(
-                {"_id": task["_id"]},
+            self.db.update_task(
+                task["_id"],
                 {
-                    "$set": {
-                        "script_data": data["scenes"],
-                        "title": data.get("title", task["title"]),
-                        "ai_description": data.get("description"),
-                        "ai_hashtags": data.get("hashtags"),
-                        "ai_tags": data.get("tags"),
-                        "status": "scripted",
-                    }
+                    "script_data": data["scenes"],
+                    "title": data.get("title", task["title"]),
+                    "ai_description": data.get("description"),
+                    "ai_hashtags": data.get("hashtags"),
+                    "ai_tags": data.get("tags"),
+                    "status": "scripted",
                 },
             )
             print(f"✅ Script Segmented: {len(data['scenes'])} scenes created.")
+            return usage
 
         except Exception as e:
             print(f"❌ Brain Error: {e}")
+            return None
+
+    def claim_pending(self):
+        """Atomically moves one pending task to "scripting" and returns it."""
+        return self.db.collection.find_one_and_update(
+            {"status": "pending"},
+            {"$set": {"status": "scripting", "script_claimed_at": datetime.now(timezone.utc)}},
+        )
+
+    def recover_stale_claims(self):
+        cutoff = datetime.now(timezone.utc) - SCRIPT_CLAIM_TIMEOUT
+        res = self.db.collection.update_many(
+            {"status": "scripting", "script_claimed_at": {"$lt": cutoff}},
+            {"$set": {"status": "pending"}},
+        )
+        if res.modified_count:
+            print(f"   ♻️ Re-queued {res.modified_count} stale script claim(s).")
+
+    # 🟢 BATCH MODE: script every pending task at once
+    def generate_batch(self, max_workers=None):
+        self.recover_stale_claims()
+        max_workers = max_workers or int(os.getenv("GROQ_MAX_CONCURRENCY", 4))
+
+        started = time.monotonic()
+        done, failed, tokens = 0, 0, 0
+
+        # The shared client enforces RPM/TPM, so workers just queue on it.
+        # Each task is written to Mongo as soon as its own call finishes.
+        # Claiming before submitting keeps two batch runs from scripting
+        # the same task twice.
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {}
+            while True:
+                task = self.claim_pending()
+                if not task:
+                    break
+                futures[pool.submit(self.process_task, task)] = task["_id"]
+
+            if not futures:
+                print("📭 No pending tasks.")
+                return None
+            print(f"🧠 Batch Director: {len(futures)} pending tasks, {max_workers} in flight...")
+
+            for future in as_completed(futures):
+                usage = future.result()
+                if usage is None:
+                    failed += 1
+                    # Give it back for the next run
+                    self.db.collection.update_one(
+                        {"_id": futures[future], "status": "scripting"},
+                        {"$set": {"status": "pending"}},
+                    )
+                else:
+                    done += 1
+                    tokens += usage.get("total_tokens", 0)
+
+        elapsed = time.monotonic() - started
+        stats = {
+            "scripted": done,
+            "failed": failed,
+            "seconds": round(elapsed, 1),
+            "scripts_per_min": round(done / elapsed * 60, 2) if elapsed else 0,
+            "tokens_per_script": round(tokens / done) if done else 0,
+        }
+        print(
+            f"📊 Batch: {done} scripted, {failed} failed in {stats['seconds']}s "
+            f"({stats['scripts_per_min']} scripts/min, "
+            f"{stats['tokens_per_script']} tokens/script)"
+        )
+        return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate video scripts")
+    parser.add_argument("--batch", action="store_true", help="Script all pending tasks")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--repair-stats", action="store_true", help="Print repair rate and tokens saved")
+    args = parser.parse_args()
+
+    if args.repair_stats:
+        for key, value in ScriptGenerator().repair_stats().items():
+            print(f"{key}: {value}")
+    elif args.batch:
+        ScriptGenerator().generate_batch(max_workers=args.workers)
+    else:
+        ScriptGenerator().generate_script()
@@ -0,0 +1,212 @@
+import os
+import argparse
+from datetime import datetime, timedelta, timezone
+from core.db_manager import DBManager
+
+# Local publish times, as scheduled in scheduler.py
+SLOT_TIMES = {"morning": "09:00", "noon": "13:00", "evening": "18:00", "night": "22:00"}
+
+
+def now_utc():
+    return datetime.now(timezone.utc)
+
+
+def as_utc(value):
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def last_slot_time(slot, now=None):
+    """The slot's most recent scheduled time (UTC), allowing a run to start a little early."""
+    now = now or datetime.now().astimezone()
+    hour, minute = map(int, SLOT_TIMES[slot].split(":"))
+    at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if at > now + timedelta(minutes=30):
+        at -= timedelta(days=1)
+    return at.astimezone(timezone.utc)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(round((len(values) - 1) * pct)))]
+
+
+class ProductionBuffer:
+    """
+    Finished videos made ahead of their slot. A rendered task that passes QC
+    is parked as `buffered` (the upload queue never sees it); at slot time
+    the oldest one for that slot goes back to `ready_to_upload`, so the slot
+    only pays for packaging and the upload.
+
+    Buffered videos older than `max_age_hours` are news that went stale:
+    they are moved to `expired_buffer` instead of being published.
+    """
+
+    def __init__(self, db=None, depth=None, max_age_hours=None):
+        self.db = db or DBManager()
+        self.depth = depth or int(os.getenv("BUFFER_DEPTH", 1))
+        self.max_age = timedelta(
+            hours=max_age_hours or float(os.getenv("BUFFER_MAX_AGE_HOURS", 30))
+        )
+        self.metrics_collection = self.db.db["buffer_metrics"]
+
+    def depth_of(self, slot):
+        return self.db.collection.count_documents({"status": "buffered", "slot": slot})
+
+    def expire_stale(self):
+        cutoff = now_utc() - self.max_age
+        res = self.db.collection.update_many(
+            {"status": "buffered", "created_at": {"$lt": cutoff}},
+            {"$set": {"status": "expired_buffer", "expired_at": now_utc()}},
+        )
+        if res.modified_count:
+            hours = self.max_age.total_seconds() / 3600
+            print(f"   🗑️ Buffer: {res.modified_count} video(s) older than {hours:g}h expired.")
+        return res.modified_count
+
+    def hold(self, task_id, slot):
+        """
+        QCs a rendered task and parks it for `slot`. Returns True if it was
+        buffered; a failed check moves it to `failed_qc` like the verifier does.
+        """
+        task = self.db.next_task("ready_to_upload", task_id)
+        if not task:
+            print("   ⚠️ Buffer: task did not reach ready_to_upload. Not buffered.")
+            return False
+
+        from core.verifier import VideoVerifier  # cv2 + skimage, only for buffering
+
+        video_path = task.get("final_video_path")
+        if not video_path or not os.path.exists(video_path):
+            is_clean, reason = False, "Video file missing"
+        else:
+            is_clean, reason = VideoVerifier().check(video_path)
+
+        if not is_clean:
+            print(f"   ⛔ Buffer QC failed: {reason}")
+            self.db.collection.update_one(
+                {"_id": task_id}, {"$set": {"status": "failed_qc", "qc_reason": reason}}
+            )
+            return False
+
+        self.db.collection.update_one(
+            {"_id": task_id, "status": "ready_to_upload"},
+            {"$set": {"status": "buffered", "slot": slot, "buffered_at": now_utc()}},
+        )
+        print(f"   🧊 Buffered for {slot.upper()}: {task.get('title')}")
+        return True
+
+    def release(self, slot):
+        """Hands the oldest fresh buffered video for `slot` back to the pipeline. Returns its id."""
+        self.expire_stale()
+        task = self.db.collection.find_one_and_update(
+            {"status": "buffered", "slot": slot},
+            {"$set": {"status": "ready_to_upload", "released_at": now_utc()}},
+            sort=[("created_at", 1)],
+        )
+        return task["_id"] if task else None
+
+    # ---------- reporting ----------
+
+    def record_publish(self, slot, slot_time, mode, task_ids):
+        """
+        Stores how long after the slot time the video went live: the end of
+        its upload, or its scheduled publishAt if that is later.
+        """
+        finished = now_utc()
+        task = None
+        for task_id in task_ids:
+            task = self.db.collection.find_one(
+                {"_id": task_id, "status": "uploaded"},
+                {"slot": 1, "niche": 1, "publish_at": 1},
+            )
+            if task and task.get("slot") == slot:
+                break
+
+        live_at = None
+        if task:
+            live_at = max(finished, as_utc(task.get("publish_at")) or finished)
+        entry = {
+            "slot": slot,
+            "niche": task.get("niche") if task else None,
+            "task_id": task["_id"] if task else None,
+            "mode": mode,
+            "slot_time": slot_time,
+            "live_at": live_at,
+            "delay_seconds": round((live_at - slot_time).total_seconds(), 1) if live_at else None,
+            "created_at": finished,
+        }
+        self.metrics_collection.insert_one(entry)
+        if live_at:
+            print(f"⏰ Live {entry['delay_seconds']:.0f}s after the {slot} slot ({mode}).")
+        else:
+            print(f"⚠️ Nothing went live for the {slot} slot ({mode}).")
+        return entry
+
+    def report(self, last=50):
+        now = now_utc()
+        slots = {}
+        for slot in SLOT_TIMES:
+            tasks = list(
+                self.db.collection.find(
+                    {"status": "buffered", "slot": slot}, {"niche": 1, "created_at": 1}
+                )
+            )
+            ages = [(now - as_utc(t["created_at"])).total_seconds() / 3600 for t in tasks]
+            slots[slot] = {
+                "niches": sorted({t.get("niche") for t in tasks if t.get("niche")}),
+                "depth": len(tasks),
+                "target": self.depth,
+                "oldest_hours": round(max(ages), 1) if ages else None,
+            }
+
+        delays = {}
+        for entry in self.metrics_collection.find().sort("created_at", -1).limit(last):
+            delays.setdefault(entry["mode"], []).append(entry.get("delay_seconds"))
+        publish = {}
+        for mode, values in delays.items():
+            live = [v for v in values if v is not None]
+            publish[mode] = {
+                "publishes": len(values),
+                "missed": len(values) - len(live),
+                "delay_p50_s": percentile(live, 0.5),
+                "delay_p95_s": percentile(live, 0.95),
+                "delay_max_s": max(live) if live else None,
+            }
+
+        return {
+            "slots": slots,
+            "expired": self.db.collection.count_documents({"status": "expired_buffer"}),
+            "publish_delay": publish,
+        }
+
+
+def print_report(report):
+    print(f"\n🧊 Production buffer ({report['expired']} expired so far)")
+    print(f"{'slot':<9} {'niche':<12} {'depth':>7} {'oldest h':>9}")
+    for slot, s in report["slots"].items():
+        niche = ",".join(s["niches"]) or "-"
+        oldest = f"{s['oldest_hours']:.1f}" if s["oldest_hours"] is not None else "-"
+        print(f"{slot:<9} {niche:<12} {s['depth']:>3}/{s['target']:<3} {oldest:>9}")
+
+    print(f"\n⏰ Publish delay after slot time")
+    print(f"{'mode':<8} {'runs':>5} {'missed':>7} {'p50 s':>8} {'p95 s':>8} {'max s':>8}")
+    for mode, p in report["publish_delay"].items():
+        cells = [p["delay_p50_s"], p["delay_p95_s"], p["delay_max_s"]]
+        cells = [f"{c:.0f}" if c is not None else "-" for c in cells]
+        print(f"{mode:<8} {p['publishes']:>5} {p['missed']:>7} {cells[0]:>8} {cells[1]:>8} {cells[2]:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Production buffer status")
+    parser.add_argument("--last", type=int, default=50, help="Publishes to include in delay stats")
+    parser.add_argument("--expire", action="store_true", help="Expire stale videos first")
+    args = parser.parse_args()
+
+    buffer = ProductionBuffer()
+    if args.expire:
+        buffer.expire_stale()
+    print_report(buffer.report(last=args.last))
@@ -0,0 +1,232 @@
+import os
+import hashlib
+import argparse
+from datetime import datetime, timedelta, timezone
+from pymongo import UpdateOne
+from core.db_manager import DBManager, TITLE_MATCH, title_similarity
+from core.ranker import tokenize
+
+# CANDIDATE_POOL=0 turns the pool off: every slot fetches and dedups from scratch
+POOL_ENABLED = os.getenv("CANDIDATE_POOL", "1") != "0"
+# A candidate leaves the pool this long after a feed last listed it...
+POOL_TTL = timedelta(hours=float(os.getenv("POOL_TTL_HOURS", 36)))
+# ...or this long after it was published, whichever comes first
+POOL_MAX_AGE = timedelta(hours=float(os.getenv("POOL_MAX_AGE_HOURS", 72)))
+# The feeds are fetched again when the last refresh is older than this...
+POOL_REFRESH = timedelta(hours=float(os.getenv("POOL_REFRESH_HOURS", 6)))
+# ...or fewer open candidates than this are left (the ranker's top-K), unless
+# the feeds were fetched less than POOL_THIN_REFRESH ago (they won't have more)
+POOL_MIN_CANDIDATES = int(os.getenv("POOL_MIN_CANDIDATES", 8))
+POOL_THIN_REFRESH = timedelta(minutes=float(os.getenv("POOL_THIN_REFRESH_MINUTES", 30)))
+
+# What the scraper's candidate dicts carry (and the pool hands back)
+CANDIDATE_FIELDS = ("title", "summary", "link", "niche", "published", "feed")
+
+
+def now_utc():
+    return datetime.now(timezone.utc)
+
+
+def as_utc(value):
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def candidate_key(candidate):
+    """Pool _id of a candidate: its link (else its title), hashed."""
+    raw = candidate.get("link") or candidate["title"]
+    return hashlib.sha1(raw.encode("utf-8", "ignore")).hexdigest()[:16]
+
+
+def signature(title):
+    """Same words, any order/case/punctuation: the same story from two feeds."""
+    words = " ".join(sorted(set(tokenize(title))))
+    return hashlib.sha1(words.encode("utf-8")).hexdigest()[:16]
+
+
+class CandidatePool:
+    """
+    The deduplicated headlines a scrape did not pick, kept in `candidate_pool`
+    so the next scrape of the niche can start from them:
+
+    - take(): the open candidates, re-checked only against tasks created
+      since they were last checked (not the whole 7-day window);
+    - the scraper fetches the feeds only when the pool is stale or thin, and
+      then skips the duplicate check for items the pool already knows;
+    - entries expire (TTL index) POOL_TTL after a feed last listed them or
+      POOL_MAX_AGE after publication.
+
+    States: open (can be picked), duplicate (a task covers it), used (won).
+    Duplicate and used entries are kept until they expire so a refresh
+    doesn't check them again.
+    """
+
+    def __init__(self, db=None):
+        self.db = db or DBManager()
+        self.collection = self.db.db["candidate_pool"]
+        self.refreshes = self.db.db["pool_refreshes"]
+
+    def ensure_indexes(self):
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+        self.collection.create_index([("niche", 1), ("state", 1)])
+
+    def expires_at(self, candidate, seen_at):
+        expiry = seen_at + POOL_TTL
+        if candidate.get("published"):
+            published = datetime.fromtimestamp(candidate["published"], timezone.utc)
+            expiry = min(expiry, published + POOL_MAX_AGE)
+        return expiry
+
+    # ---------- reading ----------
+
+    def take(self, niche, now=None):
+        """
+        Returns (candidates, state). `candidates` are the open, still-unique
+        entries; `state` has `known` ({key: state} of every live entry, for
+        the refresh), `refresh` (None, "thin" or "stale") and counts.
+        """
+        now = now or now_utc()
+        live = list(self.collection.find({"niche": niche, "expires_at": {"$gt": now}}))
+        known = {doc["_id"]: doc["state"] for doc in live}
+        open_docs = [doc for doc in live if doc["state"] == "open"]
+
+        duplicates = self.revalidate(open_docs, now)
+        for doc in open_docs:
+            if doc["_id"] in duplicates:
+                known[doc["_id"]] = "duplicate"
+        candidates = [
+            {k: doc.get(k) for k in CANDIDATE_FIELDS}
+            for doc in open_docs
+            if doc["_id"] not in duplicates
+        ]
+
+        last = self.refreshes.find_one({"_id": niche}) or {}
+        refreshed_at = as_utc(last.get("refreshed_at"))
+        age = now - refreshed_at if refreshed_at else None
+        refresh = None
+        if age is None or age > POOL_REFRESH:
+            refresh = "stale"
+        elif len(candidates) < POOL_MIN_CANDIDATES and age > POOL_THIN_REFRESH:
+            refresh = "thin"
+        return candidates, {
+            "known": known,
+            "refresh": refresh,
+            "open": len(candidates),
+            "dropped": len(duplicates),
+            "refreshed_at": refreshed_at,
+        }
+
+    def revalidate(self, docs, now):
+        """Marks open entries a newer task duplicates. Returns their keys."""
+        if not docs:
+            return set()
+        since = min(as_utc(doc["checked_at"]) for doc in docs)
+        # Usually a handful: only tasks created since the oldest check
+        newer = [
+            (as_utc(t["created_at"]), t.get("title", ""), t.get("source_url"))
+            for t in self.db.collection.find(
+                {"created_at": {"$gte": since}}, {"title": 1, "source_url": 1, "created_at": 1}
+            )
+        ]
+        duplicates = set()
+        for doc in docs:
+            checked = as_utc(doc["checked_at"])
+            for created, title, url in newer:
+                if created < checked:
+                    continue
+                if (url and url == doc.get("link")) or title_similarity(doc["title"], title) > TITLE_MATCH:
+                    duplicates.add(doc["_id"])
+                    break
+
+        ops = [UpdateOne({"_id": key}, {"$set": {"state": "duplicate"}}) for key in duplicates]
+        fresh = [doc["_id"] for doc in docs if doc["_id"] not in duplicates]
+        if ops:
+            self.collection.bulk_write(ops, ordered=False)
+        if fresh:
+            self.collection.update_many({"_id": {"$in": fresh}}, {"$set": {"checked_at": now}})
+        return duplicates
+
+    # ---------- writing ----------
+
+    def add(self, candidates, niche, checked_at, now=None):
+        """
+        Stores what a feed refresh found. `checked_at` is when its duplicate
+        check started. Entries already pooled only get their expiry pushed
+        back; a new entry with the signature of a pooled one is skipped.
+        Returns the number of new entries.
+        """
+        now = now or now_utc()
+        sigs = {
+            doc["sig"]: doc["_id"]
+            for doc in self.collection.find({"niche": niche, "expires_at": {"$gt": now}}, {"sig": 1})
+        }
+        ops, added = [], 0
+        for c in candidates:
+            key, sig = candidate_key(c), signature(c["title"])
+            if sigs.get(sig, key) != key:
+                continue
+            sigs[sig] = key
+            fields = {k: c.get(k) for k in CANDIDATE_FIELDS}
+            fields.update({"niche": niche, "seen_at": now, "expires_at": self.expires_at(c, now)})
+            ops.append(
+                UpdateOne(
+                    {"_id": key},
+                    {
+                        "$set": fields,
+                        "$setOnInsert": {"sig": sig, "state": "open", "checked_at": checked_at, "added_at": now},
+                    },
+                    upsert=True,
+                )
+            )
+        if ops:
+            added = self.collection.bulk_write(ops, ordered=False).upserted_count
+        self.refreshes.update_one(
+            {"_id": niche},
+            {"$set": {"refreshed_at": now, "listed": len(candidates), "added": added}},
+            upsert=True,
+        )
+        return added
+
+    def mark_used(self, candidate):
+        self.collection.update_one({"_id": candidate_key(candidate)}, {"$set": {"state": "used"}})
+
+    # ---------- reporting ----------
+
+    def report(self):
+        now = now_utc()
+        niches = {}
+        for doc in self.collection.find({"expires_at": {"$gt": now}}, {"niche": 1, "state": 1, "seen_at": 1}):
+            row = niches.setdefault(doc["niche"], {"open": 0, "duplicate": 0, "used": 0, "oldest_seen": None})
+            row[doc["state"]] += 1
+            seen = as_utc(doc.get("seen_at"))
+            if doc["state"] == "open" and seen and (row["oldest_seen"] is None or seen < row["oldest_seen"]):
+                row["oldest_seen"] = seen
+        for last in self.refreshes.find():
+            row = niches.setdefault(last["_id"], {"open": 0, "duplicate": 0, "used": 0, "oldest_seen": None})
+            row.update({"refreshed_at": as_utc(last["refreshed_at"]), "listed": last.get("listed"),
+                        "added": last.get("added")})
+        return niches
+
+
+def print_report(report):
+    print(f"\n🗃️ Candidate pool")
+    print(f"{'niche':<11} {'open':>5} {'dup':>5} {'used':>5}  {'last refresh':<16} {'listed':>6} {'added':>6}")
+    for niche, row in sorted(report.items()):
+        refreshed = row.get("refreshed_at")
+        when = refreshed.astimezone().strftime("%d-%m %H:%M") if refreshed else "-"
+        print(f"{niche:<11} {row['open']:>5} {row['duplicate']:>5} {row['used']:>5}  {when:<16} "
+              f"{row.get('listed', '-'):>6} {row.get('added', '-'):>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Candidate pool per niche")
+    parser.add_argument("--clear", metavar="NICHE", help="Empty a niche's pool (next scrape fetches all feeds)")
+    args = parser.parse_args()
+
+    pool = CandidatePool()
+    if args.clear:
+        pool.collection.delete_many({"niche": args.clear})
+        pool.refreshes.delete_one({"_id": args.clear})
+        print(f"🧹 Cleared the {args.clear} pool")
+    print_report(pool.report())
@@ -3,11 +3,25 @@ import re
 import difflib
 import certifi
 from datetime import datetime, timedelta, timezone  # <--- Added timezone import
+from bson import ObjectId
 from pymongo import MongoClient
 from dotenv import load_dotenv
+from core.tracing import traced
 
 load_dotenv()
 
+# Big per-task fields, kept in `task_payloads` under the task's _id so the
+# `video_tasks` documents every listing, queue claim and dedup scan touches
+# stay small. Only the stage that needs one loads it (load_payload).
+PAYLOAD_FIELDS = ("content", "script_data", "ai_description", "ai_hashtags", "ai_tags")
+
+# Titles at least this similar count as the same story (7-day duplicate check)
+TITLE_MATCH = 0.85
+
+
+def title_similarity(a, b):
+    return difflib.SequenceMatcher(None, a.lower(), b.lower()).ratio()
+
 
 class DBManager:
     def __init__(self):
@@ -27,10 +41,57 @@ class DBManager:
 
         self.db = self.client[self.db_name]
         self.collection = self.db["video_tasks"]
+        self.payloads = self.db["task_payloads"]
+        # Finished tasks, compacted, once their files are gone (core/archive.py)
+        self.archive = self.db["task_archive"]
 
         self.base_dir = "data/generated_videos_folder"
         os.makedirs(self.base_dir, exist_ok=True)
 
+    def ensure_indexes(self):
+        # Listing by status (newest first) and the 7-day dedup window scan
+        self.collection.create_index([("status", 1), ("_id", -1)])
+        self.collection.create_index([("created_at", -1)])
+        self.collection.create_index([("source_url", 1), ("created_at", -1)])
+
+    def next_task(self, status, task_id=None):
+        """The oldest-inserted task in `status`, or that exact task if `task_id` is given."""
+        query = {"status": status}
+        if task_id is not None:
+            query["_id"] = task_id
+        return self.collection.find_one(query)
+
+    def load_payload(self, task, fields=PAYLOAD_FIELDS):
+        """Fills `fields` into `task` from its payload document. Returns the task."""
+        if task is None:
+            return None
+        # A task that was never migrated still carries them inline
+        missing = [f for f in fields if f not in task]
+        if missing:
+            payload = self.payloads.find_one({"_id": task["_id"]}, dict.fromkeys(missing, 1))
+            for field in missing:
+                if payload and field in payload:
+                    task[field] = payload[field]
+        return task
+
+    def update_task(self, task_id, changes):
+        """
+        $sets `changes` on a task, routing PAYLOAD_FIELDS to its payload
+        document. The payload is written first, so a status change in
+        `changes` never points the next stage at data that isn't there yet.
+        """
+        payload = {k: v for k, v in changes.items() if k in PAYLOAD_FIELDS}
+        rest = {k: v for k, v in changes.items() if k not in PAYLOAD_FIELDS}
+        update = {}
+        if payload:
+            self.payloads.update_one({"_id": task_id}, {"$set": payload}, upsert=True)
+            # An inline copy from before the migration would shadow the new value
+            update["$unset"] = dict.fromkeys(payload, "")
+        if rest:
+            update["$set"] = rest
+        if update:
+            self.collection.update_one({"_id": task_id}, update)
+
     def sanitize_filename(self, name):
         clean = re.sub(r"[^\w\s-]", "", name)
         return re.sub(r"[-\s]+", "_", clean).strip()
@@ -46,6 +107,7 @@ class DBManager:
         return full_path
 
     # 🟢 HYBRID CHECK: URL + FUZZY TITLE + 7-DAY WINDOW
+    @traced("task_exists")
     def task_exists(self, new_title, source_url=None):
         # 🟢 FIX 1: Use timezone-aware UTC
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=7)
@@ -67,11 +129,9 @@ class DBManager:
         for task in recent_tasks:
             existing_title = task.get("title", "")
 
-            similarity = difflib.SequenceMatcher(
-                None, new_title.lower(), existing_title.lower()
-            ).ratio()
+            similarity = title_similarity(new_title, existing_title)
 
-            if similarity > 0.85:
+            if similarity > TITLE_MATCH:
                 print(
                     f"      🚫 Duplicate Title Found ({int(similarity*100)}% match): '{new_title}' ≈ '{existing_title}'"
                 )
@@ -95,9 +155,10 @@ class DBManager:
         final_url = source_url if source_url else "https://news.google.com/"
         folder_path = self.get_video_folder(slot, title)
 
+        task_id = ObjectId()
         task = {
+            "_id": task_id,
             "title": title,
-            "content": content,
             "source": source,
             "status": status,
             "source_url": final_url,
@@ -107,6 +168,11 @@ class DBManager:
             # 🟢 FIX 2: Use timezone-aware UTC here too
             "created_at": datetime.now(timezone.utc),
         }
+        if extra_data.get("content_stats"):
+            task["content_stats"] = extra_data["content_stats"]
 
+        # Payload first: a task is only visible once its article is stored
+        self.payloads.insert_one({"_id": task_id, "content": content})
         self.collection.insert_one(task)
         print(f"📥 Task Added: {title}")
+        return task_id
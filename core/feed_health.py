@@ -0,0 +1,257 @@
+import os
+import hashlib
+import argparse
+from datetime import datetime, timedelta, timezone
+from core.db_manager import DBManager
+
+# Seconds the scraper may spend fetching feeds for one slot
+FEED_BUDGET_SECONDS = float(os.getenv("FEED_BUDGET_SECONDS", 20))
+# Feeds fetched even if the budget says stop (a niche never goes empty-handed)
+FEED_MIN_SOURCES = int(os.getenv("FEED_MIN_SOURCES", 2))
+# After N failures in a row a feed rests for BASE * 2^(N-1), capped at MAX
+BACKOFF_BASE = timedelta(minutes=float(os.getenv("FEED_BACKOFF_BASE_MIN", 30)))
+BACKOFF_MAX = timedelta(hours=float(os.getenv("FEED_BACKOFF_MAX_HOURS", 24)))
+# A feed that answers but brings nothing new this many times in a row rests too
+STALE_AFTER = int(os.getenv("FEED_STALE_AFTER", 4))
+STALE_BACKOFF = timedelta(hours=float(os.getenv("FEED_STALE_BACKOFF_HOURS", 6)))
+
+# Smoothing for latency/yield (weight of the newest fetch)
+ALPHA = 0.3
+# Optimistic prior for feeds without history, so new sources get tried
+PRIOR_YIELD = 3.0
+PRIOR_LATENCY_MS = 2000
+WIN_WEIGHT = 5.0
+# A fetch costs at least this much (dedup pass included), however fast the feed
+MIN_FETCH_COST = 1.0
+# Entries remembered per feed to tell new items from re-reads
+SEEN_LIMIT = 60
+
+
+def now_utc():
+    return datetime.now(timezone.utc)
+
+
+def as_utc(value):
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def entry_key(entry):
+    """Short stable id of a feed entry (link, else title)."""
+    raw = getattr(entry, "link", "") or getattr(entry, "title", "")
+    return hashlib.sha1(raw.encode("utf-8", "ignore")).hexdigest()[:12]
+
+
+def ewma(old, new):
+    return new if old is None else round(ALPHA * new + (1 - ALPHA) * old, 3)
+
+
+class FeedHealth:
+    """
+    Per-feed statistics in `feed_stats` (one document per URL) and the plan
+    for which feeds a slot fetches:
+
+    - feeds that keep failing (HTTP errors, timeouts, unparseable XML) back
+      off exponentially; one that keeps answering with nothing new rests for
+      STALE_BACKOFF. When a back-off ends the feed is tried again;
+    - the rest are fetched best first (new unique items per fetch, plus how
+      often the feed supplies the winner, per second of latency) until
+      FEED_BUDGET_SECONDS is used up.
+    """
+
+    def __init__(self, db=None, budget_seconds=None):
+        self.db = db or DBManager()
+        self.collection = self.db.db["feed_stats"]
+        self.budget = FEED_BUDGET_SECONDS if budget_seconds is None else budget_seconds
+
+    def stats_for(self, urls):
+        return {s["_id"]: s for s in self.collection.find({"_id": {"$in": list(urls)}})}
+
+    @staticmethod
+    def expected_latency(stats):
+        return (stats.get("latency_ms") or PRIOR_LATENCY_MS) / 1000
+
+    @staticmethod
+    def score(stats):
+        """Expected value of one fetch: new unique items + winners, per second."""
+        fetches = stats.get("fetches", 0)
+        ok = fetches - stats.get("failures", 0)
+        unique = stats.get("unique_ewma")
+        if unique is None:
+            unique = PRIOR_YIELD
+        # Laplace-smoothed: one lucky win from one fetch isn't a 100% feed
+        win_rate = (stats.get("wins", 0) + 1) / (ok + 4)
+        return (unique + WIN_WEIGHT * win_rate) / max(FeedHealth.expected_latency(stats), MIN_FETCH_COST)
+
+    def plan(self, niche, sources, now=None):
+        """
+        Returns (ordered, skipped): the feeds to try in order, and
+        {url: reason} for the ones resting. The scraper stops going down
+        `ordered` once the budget is spent (see over_budget).
+        """
+        now = now or now_utc()
+        stats = self.stats_for(sources)
+        ready, skipped = [], {}
+        for url in sources:
+            s = stats.get(url, {})
+            until = as_utc(s.get("backoff_until"))
+            if until and until > now:
+                skipped[url] = f"{s.get('backoff_reason', 'backoff')} until {until:%H:%M}"
+            else:
+                ready.append(url)
+        if not ready and sources:
+            # Everything is resting: probe the one that is due first
+            url = min(sources, key=lambda u: as_utc(stats[u]["backoff_until"]))
+            skipped.pop(url)
+            ready.append(url)
+        ready.sort(key=lambda u: self.score(stats.get(u, {})), reverse=True)
+        self._expected = {u: self.expected_latency(stats.get(u, {})) for u in ready}
+        return ready, skipped
+
+    def over_budget(self, url, elapsed, fetched):
+        """True if fetching `url` now would likely overrun the budget."""
+        if fetched < FEED_MIN_SOURCES:
+            return False
+        return elapsed + self._expected.get(url, PRIOR_LATENCY_MS / 1000) > self.budget
+
+    def remaining(self, elapsed, fetched):
+        """Seconds left for the next request (at least a short timeout)."""
+        if fetched < FEED_MIN_SOURCES:
+            return 10
+        return max(2.0, min(10.0, self.budget - elapsed))
+
+    # ---------- recording ----------
+
+    def record_fetch(self, url, niche, latency, error=None, entries=(), unique=0):
+        """
+        Stores one fetch. `entries` are the parsed items, `unique` how many
+        passed the duplicate check. Returns the number of items the feed
+        had not shown before.
+        """
+        now = now_utc()
+        s = self.collection.find_one({"_id": url}) or {}
+        seen = s.get("seen", [])
+        keys = [entry_key(e) for e in entries]
+        new_items = sum(1 for k in keys if k not in seen)
+        # New *and* not already made into a video: the yield that matters
+        new_unique = min(new_items, unique)
+
+        update = {
+            "niche": niche,
+            "last_fetch_at": now,
+            "last_latency_ms": round(latency * 1000),
+            "latency_ms": ewma(s.get("latency_ms"), latency * 1000),
+        }
+        inc = {"fetches": 1}
+        if error:
+            failures_in_row = s.get("consecutive_failures", 0) + 1
+            inc["failures"] = 1
+            update.update(
+                {
+                    "consecutive_failures": failures_in_row,
+                    "last_error": str(error)[:300],
+                    "backoff_until": now + min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (failures_in_row - 1)),
+                    "backoff_reason": "failing",
+                }
+            )
+        else:
+            empty_in_row = 0 if new_unique else s.get("empty_streak", 0) + 1
+            inc.update({"items": len(keys), "unique": unique, "new_unique": new_unique})
+            update.update(
+                {
+                    "consecutive_failures": 0,
+                    "empty_streak": empty_in_row,
+                    "last_success_at": now,
+                    "unique_ewma": ewma(s.get("unique_ewma"), new_unique),
+                    "seen": (keys + [k for k in seen if k not in keys])[:SEEN_LIMIT],
+                    "backoff_until": now + STALE_BACKOFF if empty_in_row >= STALE_AFTER else None,
+                    "backoff_reason": "no new items" if empty_in_row >= STALE_AFTER else None,
+                }
+            )
+        self.collection.update_one({"_id": url}, {"$set": update, "$inc": inc}, upsert=True)
+        return new_items
+
+    def record_skip(self, url, niche, reason):
+        self.collection.update_one(
+            {"_id": url},
+            {"$set": {"niche": niche, "last_skip": reason}, "$inc": {"skips": 1}},
+            upsert=True,
+        )
+
+    def record_win(self, url):
+        self.collection.update_one({"_id": url}, {"$inc": {"wins": 1}})
+
+    def reset(self, url):
+        """Clears a feed's back-off (e.g. after fixing its URL)."""
+        self.collection.update_one(
+            {"_id": url},
+            {"$set": {"backoff_until": None, "consecutive_failures": 0, "empty_streak": 0}},
+        )
+
+    # ---------- reporting ----------
+
+    def report(self, niche=None):
+        now = now_utc()
+        query = {"niche": niche} if niche else {}
+        niches = {}
+        for s in self.collection.find(query, {"seen": 0}).sort("_id", 1):
+            fetches = s.get("fetches", 0)
+            ok = fetches - s.get("failures", 0)
+            until = as_utc(s.get("backoff_until"))
+            feed = {
+                "url": s["_id"],
+                "fetches": fetches,
+                "skips": s.get("skips", 0),
+                "failure_rate": round(s.get("failures", 0) / fetches, 3) if fetches else None,
+                "latency_ms": round(s["latency_ms"]) if s.get("latency_ms") is not None else None,
+                "new_unique": s.get("new_unique", 0),
+                "yield_per_fetch": round(s.get("new_unique", 0) / ok, 2) if ok else None,
+                "wins": s.get("wins", 0),
+                "win_rate": round(s.get("wins", 0) / ok, 3) if ok else None,
+                "state": f"{s.get('backoff_reason')} until {until:%d-%m %H:%M}"
+                if until and until > now
+                else "ok",
+                "last_error": s.get("last_error") if s.get("consecutive_failures") else None,
+            }
+            row = niches.setdefault(
+                s.get("niche") or "unknown", {"feeds": [], "fetches": 0, "ok": 0, "new_unique": 0, "wins": 0}
+            )
+            row["feeds"].append(feed)
+            row["fetches"] += fetches
+            row["ok"] += ok
+            row["new_unique"] += feed["new_unique"]
+            row["wins"] += feed["wins"]
+        for row in niches.values():
+            row["yield_per_fetch"] = round(row["new_unique"] / row["ok"], 2) if row["ok"] else None
+            row["feeds"].sort(key=lambda f: f["yield_per_fetch"] or 0, reverse=True)
+        return niches
+
+
+def print_report(report):
+    for niche, row in sorted(report.items()):
+        per_fetch = row["yield_per_fetch"] if row["yield_per_fetch"] is not None else "-"
+        print(f"\n📡 {niche.upper()}: {row['new_unique']} new unique item(s), {per_fetch}/fetch, "
+              f"{row['wins']} winner(s)")
+        print(f"{'feed':<52} {'fetch':>5} {'skip':>5} {'fail%':>6} {'ms':>6} {'new/f':>6} {'wins':>5}  state")
+        for f in row["feeds"]:
+            fail = f"{f['failure_rate'] * 100:.0f}" if f["failure_rate"] is not None else "-"
+            ms = f"{f['latency_ms']}" if f["latency_ms"] is not None else "-"
+            per = f"{f['yield_per_fetch']}" if f["yield_per_fetch"] is not None else "-"
+            url = f["url"] if len(f["url"]) <= 52 else f["url"][:49] + "..."
+            print(f"{url:<52} {f['fetches']:>5} {f['skips']:>5} {fail:>6} {ms:>6} {per:>6} {f['wins']:>5}  {f['state']}")
+            if f["last_error"]:
+                print(f"{'':<52} ⚠️ {f['last_error'][:80]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RSS feed health and yield per niche")
+    parser.add_argument("--niche", help="Only this niche (motivation, space, nature, history)")
+    parser.add_argument("--reset", metavar="URL", help="Clear a feed's back-off")
+    args = parser.parse_args()
+
+    health = FeedHealth()
+    if args.reset:
+        health.reset(args.reset)
+        print(f"♻️ Back-off cleared for {args.reset}")
+    print_report(health.report(args.niche))
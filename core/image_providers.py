@@ -0,0 +1,405 @@
+import io
+import os
+import re
+import math
+import time
+import random
+import argparse
+import threading
+import requests
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from core.db_manager import DBManager
+
+# A race starts the next attempt if nothing has come back after this long...
+HEDGE_DELAY = float(os.getenv("IMAGE_HEDGE_DELAY", 0.8))
+# ...with at most this many requests in flight (1 = the old one-by-one order)
+HEDGE_MAX = int(os.getenv("IMAGE_HEDGE_MAX", 3))
+# Per-request timeouts: provider API / image download
+API_TIMEOUT = float(os.getenv("IMAGE_API_TIMEOUT", 5))
+DOWNLOAD_TIMEOUT = float(os.getenv("IMAGE_DOWNLOAD_TIMEOUT", 10))
+# After BREAKER_FAILURES failures in a row a provider is skipped for BASE,
+# doubling with every further failure, capped at MAX
+BREAKER_FAILURES = int(os.getenv("IMAGE_BREAKER_FAILURES", 3))
+BREAKER_BASE = timedelta(minutes=float(os.getenv("IMAGE_BREAKER_BASE_MIN", 5)))
+BREAKER_MAX = timedelta(hours=float(os.getenv("IMAGE_BREAKER_MAX_HOURS", 2)))
+# Smoothing for latency (weight of the newest call)
+ALPHA = 0.3
+
+# The frame every image ends up cropped to (kenburns.OUTPUT_SIZE)
+TARGET_SIZE = (1080, 1920)
+# IMAGE_PROVIDER_RESIZE=0: download the providers' default (landscape, oversized) renditions
+PROVIDER_RESIZE = os.getenv("IMAGE_PROVIDER_RESIZE", "1") != "0"
+# Quality asked of the providers / used when an image is shrunk on arrival
+JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", 80))
+
+BROWSER_UA = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/103.0.0.0 Safari/537.36"
+)
+
+
+def now_utc():
+    return datetime.now(timezone.utc)
+
+
+def as_utc(value):
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+class ProviderError(Exception):
+    """The provider itself is failing (network, 5xx, 429, bad key), not just out of results."""
+
+
+class Cancelled(Exception):
+    """Another attempt of the race already won."""
+
+
+class ImageProvider:
+    """
+    One image source. `search` returns candidate image URLs (empty when the
+    provider has nothing for the query) and raises ProviderError when the
+    provider is failing; `download` fetches one of them.
+    """
+
+    name = None
+    per_page = 3
+
+    def available(self):
+        return True
+
+    def search(self, query, cancel=None):
+        raise NotImplementedError
+
+    def candidates(self, urls):
+        """The URLs to try, in order (stock sites: one random pick of the top results)."""
+        return [random.choice(urls)] if urls else []
+
+    def get(self, url, cancel=None, **kwargs):
+        if cancel is not None and cancel.is_set():
+            raise Cancelled()
+        try:
+            res = requests.get(url, **kwargs)
+        except requests.RequestException as e:
+            raise ProviderError(f"{type(e).__name__}: {e}"[:200])
+        if res.status_code in (401, 403, 429) or res.status_code >= 500:
+            res.close()
+            raise ProviderError(f"HTTP {res.status_code}")
+        return res
+
+    def download(self, url, cancel=None):
+        """Image bytes, or None for a broken link. Stops early once `cancel` is set."""
+        res = self.get(url, cancel, headers={"User-Agent": BROWSER_UA}, timeout=DOWNLOAD_TIMEOUT, stream=True)
+        with res:
+            if res.status_code != 200:
+                return None
+            chunks = []
+            try:
+                for chunk in res.iter_content(64 * 1024):
+                    if cancel is not None and cancel.is_set():
+                        raise Cancelled()
+                    chunks.append(chunk)
+            except requests.RequestException as e:
+                raise ProviderError(f"{type(e).__name__}: {e}"[:200])
+            return b"".join(chunks)
+
+
+class GoogleImages(ImageProvider):
+    name = "google"
+
+    def search(self, query, cancel=None):
+        # udm=2 forces the new image layout
+        url = f"https://www.google.com/search?q={query}&tbm=isch&udm=2"
+        res = self.get(url, cancel, headers={"User-Agent": BROWSER_UA}, timeout=API_TIMEOUT * 2)
+        # The large original images sit in Google's data blobs as plain http...jpg/png strings
+        matches = re.findall(r'"(https?://[^"]+?\.(?:jpg|jpeg|png))"', res.text)
+        # Decode unicode escapes (e.g. \u003d -> =)
+        return [m.encode().decode("unicode_escape") for m in matches[: self.per_page]]
+
+    def candidates(self, urls):
+        # Sometimes the first match is a logo or an icon: try the first three in order
+        return urls
+
+    def download(self, url, cancel=None):
+        # The images live on arbitrary sites: one being down says nothing about Google
+        try:
+            return super().download(url, cancel)
+        except ProviderError:
+            return None
+
+
+class Unsplash(ImageProvider):
+    name = "unsplash"
+
+    def __init__(self):
+        self.key = os.getenv("UNSPLASH_ACCESS_KEY")
+        self.resize = PROVIDER_RESIZE
+
+    def available(self):
+        return bool(self.key)
+
+    def search(self, query, cancel=None):
+        url = f"https://api.unsplash.com/search/photos?query={query}&per_page={self.per_page}&client_id={self.key}"
+        if self.resize:
+            url += "&orientation=portrait"
+        res = self.get(url, cancel, timeout=API_TIMEOUT)
+        if res.status_code != 200:
+            return []
+        results = res.json().get("results", [])
+        if not self.resize:
+            return [r["urls"]["regular"] for r in results]
+        # imgix renders exactly the frame: cropped around the busiest part, recompressed
+        w, h = TARGET_SIZE
+        params = f"w={w}&h={h}&fit=crop&crop=entropy&fm=jpg&q={JPEG_QUALITY}"
+        return [with_params(r["urls"]["raw"], params) for r in results]
+
+
+class Pexels(ImageProvider):
+    name = "pexels"
+
+    def __init__(self):
+        self.key = os.getenv("PEXELS_API_KEY")
+        self.resize = PROVIDER_RESIZE
+
+    def available(self):
+        return bool(self.key)
+
+    def search(self, query, cancel=None):
+        url = f"https://api.pexels.com/v1/search?query={query}&per_page={self.per_page}"
+        if self.resize:
+            url += "&orientation=portrait"
+        res = self.get(url, cancel, headers={"Authorization": self.key}, timeout=API_TIMEOUT)
+        if res.status_code != 200:
+            return []
+        photos = res.json().get("photos", [])
+        if not self.resize:
+            return [p["src"]["large2x"] for p in photos]
+        # The `src` renditions are all query params on `original`; ask for the frame itself
+        w, h = TARGET_SIZE
+        params = f"auto=compress&cs=tinysrgb&fit=crop&w={w}&h={h}"
+        return [with_params(p["src"]["original"], params) for p in photos]
+
+
+def with_params(url, params):
+    return f"{url}{'&' if '?' in url else '?'}{params}"
+
+
+def fit_image(content, size=TARGET_SIZE, quality=JPEG_QUALITY):
+    """
+    Crops an image to the frame's aspect ratio and shrinks it to `size`:
+    the part the assembler's cover-fit would show, nothing more. Returns
+    `content` unchanged when it already fits (e.g. a provider-sized image).
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(content)) as img:
+        w, h = img.size
+        tw, th = size
+        cover = max(tw / w, th / h)
+        crop_w, crop_h = min(w, math.ceil(tw / cover)), min(h, math.ceil(th / cover))
+        # Less than 5% to crop and nothing to shrink: not worth a re-encode
+        if cover >= 1 and crop_w * crop_h >= 0.95 * w * h:
+            return content
+        x0, y0 = (w - crop_w) // 2, (h - crop_h) // 2
+        img = img.convert("RGB").crop((x0, y0, x0 + crop_w, y0 + crop_h))
+        if cover < 1:
+            img = img.resize(size, Image.LANCZOS)
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=quality, optimize=True)
+    return buf.getvalue()
+
+
+def default_providers():
+    return {p.name: p for p in (GoogleImages(), Unsplash(), Pexels())}
+
+
+class ProviderBreakers:
+    """
+    Circuit breakers for the image providers, kept in `image_providers` (one
+    document per provider) so they survive restarts:
+
+    - closed: calls go through;
+    - open: after BREAKER_FAILURES failures in a row the provider is skipped
+      without a request until `open_until` (BASE, doubling per further
+      failure, capped at MAX);
+    - half-open: once `open_until` passes calls go through again; one success
+      closes the breaker, one failure opens it for longer.
+
+    Empty results and broken images are misses, not failures.
+    """
+
+    def __init__(self, db=None):
+        self.db = db or DBManager()
+        self.collection = self.db.db["image_providers"]
+        self._lock = threading.Lock()
+        self.state = None  # loaded on first use
+
+    def load(self):
+        self.state = {s["_id"]: s for s in self.collection.find()}
+
+    def entry(self, name):
+        if self.state is None:
+            self.load()
+        return self.state.setdefault(name, {"_id": name})
+
+    def allow(self, name, now=None):
+        until = self.open_until(name)
+        return not until or until <= (now or now_utc())
+
+    def open_until(self, name):
+        return as_utc(self.entry(name).get("open_until"))
+
+    def record(self, name, latency, error=None, hit=True):
+        now = now_utc()
+        with self._lock:
+            s = self.entry(name)
+            update = {
+                "last_call_at": now,
+                "latency_ms": round(latency * 1000) if s.get("latency_ms") is None
+                else round(ALPHA * latency * 1000 + (1 - ALPHA) * s["latency_ms"]),
+            }
+            inc = {"calls": 1}
+            if error:
+                in_row = s.get("consecutive_failures", 0) + 1
+                inc["failures"] = 1
+                update.update({"consecutive_failures": in_row, "last_error": str(error)[:300]})
+                if in_row >= BREAKER_FAILURES:
+                    # Opens, or re-opens for longer after a failed half-open probe
+                    update["open_until"] = now + min(BREAKER_MAX, BREAKER_BASE * 2 ** (in_row - BREAKER_FAILURES))
+                    inc["trips"] = 1
+            else:
+                update.update({"consecutive_failures": 0, "open_until": None, "last_success_at": now})
+                if hit:
+                    inc["hits"] = 1
+            s.update(update)
+            for key, n in inc.items():
+                s[key] = s.get(key, 0) + n
+        self.collection.update_one({"_id": name}, {"$set": update, "$inc": inc}, upsert=True)
+
+    def reset(self, name):
+        self.collection.update_one({"_id": name}, {"$set": {"open_until": None, "consecutive_failures": 0}})
+        self.entry(name).update({"open_until": None, "consecutive_failures": 0})
+
+    def report(self):
+        now = now_utc()
+        rows = []
+        for s in self.collection.find().sort("_id", 1):
+            calls = s.get("calls", 0)
+            until = as_utc(s.get("open_until"))
+            rows.append(
+                {
+                    "provider": s["_id"],
+                    "calls": calls,
+                    "hits": s.get("hits", 0),
+                    "failure_rate": round(s.get("failures", 0) / calls, 3) if calls else None,
+                    "latency_ms": s.get("latency_ms"),
+                    "trips": s.get("trips", 0),
+                    "state": f"open until {until:%d-%m %H:%M}" if until and until > now else "closed",
+                    "last_error": s.get("last_error") if s.get("consecutive_failures") else None,
+                }
+            )
+        return rows
+
+
+class HedgedImageFetch:
+    """
+    Races image attempts ((provider, query) pairs, in order of preference):
+    the first starts at once, the next one HEDGE_DELAY later or as soon as an
+    earlier one misses, with at most HEDGE_MAX in flight. The first valid
+    image wins and the others are cancelled (queued ones never start,
+    running ones stop at their next request or chunk). Providers whose
+    breaker is open are skipped without a request.
+    """
+
+    def __init__(self, providers=None, breakers=None, validate=None, delay=None, max_inflight=None):
+        self.providers = providers or default_providers()
+        self.breakers = breakers
+        self.validate = validate or (lambda content: bool(content))
+        self.delay = HEDGE_DELAY if delay is None else delay
+        self.max_inflight = max(1, HEDGE_MAX if max_inflight is None else max_inflight)
+        self.pool = ThreadPoolExecutor(max_workers=self.max_inflight * 2, thread_name_prefix="image")
+
+    def attempt(self, name, query, cancel):
+        """Runs one provider for one query. Returns image bytes or None."""
+        provider = self.providers[name]
+        started = time.monotonic()
+        try:
+            for url in provider.candidates(provider.search(query, cancel)):
+                content = provider.download(url, cancel)
+                if content and self.validate(content):
+                    self._record(name, started, hit=True)
+                    return content
+            self._record(name, started, hit=False)
+        except ProviderError as e:
+            self._record(name, started, error=e)
+            print(f"      ⚠️ {name} failed for '{query}': {e}")
+        except Cancelled:
+            pass
+        return None
+
+    def _record(self, name, started, error=None, hit=False):
+        if self.breakers:
+            self.breakers.record(name, time.monotonic() - started, error, hit)
+
+    def usable(self, attempts):
+        out, skipped = [], set()
+        for name, query in attempts:
+            provider = self.providers.get(name)
+            if not provider or not provider.available():
+                continue
+            if self.breakers and not self.breakers.allow(name):
+                if name not in skipped:
+                    skipped.add(name)
+                    print(f"      ⏭️ {name} skipped (circuit open until {self.breakers.open_until(name):%H:%M})")
+                continue
+            out.append((name, query))
+        return out
+
+    def fetch(self, attempts):
+        """Returns (content, provider, query) of the first valid image, or (None, None, None)."""
+        pending = list(dict.fromkeys(self.usable(attempts)))
+        cancel = threading.Event()
+        running = {}
+        try:
+            while pending or running:
+                if pending and len(running) < self.max_inflight:
+                    name, query = pending.pop(0)
+                    running[self.pool.submit(self.attempt, name, query, cancel)] = (name, query)
+                # Wait for a result, or for the hedge delay before starting the next attempt
+                timeout = self.delay if pending and len(running) < self.max_inflight else None
+                done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, query = running.pop(future)
+                    content = future.result()
+                    if content:
+                        return content, name, query
+            return None, None, None
+        finally:
+            cancel.set()
+            for future in running:
+                future.cancel()
+
+
+def print_report(rows):
+    print("\n🖼️ Image providers")
+    print(f"{'provider':<10} {'calls':>6} {'hits':>6} {'fail%':>6} {'ms':>6} {'trips':>6}  state")
+    for r in rows:
+        fail = f"{r['failure_rate'] * 100:.0f}" if r["failure_rate"] is not None else "-"
+        ms = r["latency_ms"] if r["latency_ms"] is not None else "-"
+        print(f"{r['provider']:<10} {r['calls']:>6} {r['hits']:>6} {fail:>6} {ms:>6} {r['trips']:>6}  {r['state']}")
+        if r["last_error"]:
+            print(f"{'':<10} ⚠️ {r['last_error'][:80]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Image provider circuit breakers")
+    parser.add_argument("--reset", metavar="PROVIDER", help="Close a provider's breaker (google, unsplash, pexels)")
+    args = parser.parse_args()
+
+    breakers = ProviderBreakers()
+    if args.reset:
+        breakers.reset(args.reset)
+        print(f"♻️ Breaker closed for {args.reset}")
+    print_report(breakers.report())
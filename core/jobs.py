@@ -0,0 +1,292 @@
+import os
+import sys
+import time
+import threading
+import subprocess
+from datetime import datetime, timezone
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure, PyMongoError
+from core.db_manager import DBManager
+
+# The API hands the job id to main.py through this env variable
+JOB_ENV = "PIPELINE_JOB_ID"
+STAGES = ["scrape", "script", "voice", "visuals", "assemble", "package", "upload", "log"]
+TERMINAL = ("succeeded", "failed")
+
+# One lock per job: seq allocation and the event insert must happen together,
+# or a parallel emitter's event can land after a reader has moved past its seq
+_emit_locks = {}
+_emit_locks_guard = threading.Lock()
+
+
+def _emit_lock(job_id):
+    with _emit_locks_guard:
+        return _emit_locks.setdefault(job_id, threading.Lock())
+
+
+def now_utc():
+    return datetime.now(timezone.utc)
+
+
+class JobStore:
+    """
+    Pipeline runs as Mongo documents (`pipeline_jobs`) plus an ordered event
+    log per job (`job_events`). Every event bumps the job's `seq`, so clients
+    can resume a stream from the last event they saw.
+    """
+
+    def __init__(self, db=None):
+        self.db = db or DBManager()
+        self.jobs = self.db.db["pipeline_jobs"]
+        self.events = self.db.db["job_events"]
+
+    def ensure_indexes(self):
+        self.jobs.create_index([("created_at", -1)])
+        self.events.create_index([("job_id", 1), ("seq", 1)], unique=True)
+
+    def create(self, slot):
+        created = now_utc()
+        job = {
+            "slot": slot,
+            "status": "queued",
+            "stage": None,
+            "stages": {name: {"status": "pending", "percent": 0} for name in STAGES},
+            "seq": 0,
+            "created_at": created,
+            "updated_at": created,
+        }
+        job["_id"] = self.jobs.insert_one(job).inserted_id
+        return job
+
+    def get(self, job_id):
+        return self.jobs.find_one({"_id": job_id})
+
+    def recent(self, limit=20):
+        return list(self.jobs.find().sort("created_at", -1).limit(limit))
+
+    # ---------- writing ----------
+
+    def _updates(self, kind, stage, fields, at):
+        updates = {"updated_at": at}
+        if kind == "stage":
+            status = fields["status"]
+            updates[f"stages.{stage}.status"] = status
+            if status == "running":
+                updates.update({"status": "running", "stage": stage})
+                updates[f"stages.{stage}.started_at"] = at
+            else:
+                updates[f"stages.{stage}.finished_at"] = at
+                if status == "done":
+                    updates[f"stages.{stage}.percent"] = 100
+        elif kind == "progress":
+            updates[f"stages.{stage}.percent"] = fields["percent"]
+        elif kind == "job":
+            updates["status"] = fields["status"]
+            updates["finished_at"] = at
+            for key in ("error", "returncode"):
+                if key in fields:
+                    updates[key] = fields[key]
+        return updates
+
+    def emit(self, job_id, kind, stage=None, only_active=False, **fields):
+        """
+        Applies one event to the job document and appends it to the event log.
+        Returns the stored event, or None if the job is unknown (or already
+        finished, with `only_active`).
+
+        Serialised per job within the process (parallel uploads emit from
+        several threads), so events are inserted in seq order.
+        """
+        query = {"_id": job_id}
+        if only_active:
+            query["status"] = {"$nin": list(TERMINAL)}
+        with _emit_lock(job_id):
+            at = now_utc()
+            job = self.jobs.find_one_and_update(
+                query,
+                {"$inc": {"seq": 1}, "$set": self._updates(kind, stage, fields, at)},
+                projection={"seq": 1},
+                return_document=ReturnDocument.AFTER,
+            )
+            if not job:
+                return None
+            event = {"job_id": job_id, "seq": job["seq"], "type": kind, "stage": stage, "at": at}
+            event.update(fields)
+            self.events.insert_one(event)
+        return event
+
+    def finish(self, job_id, status, **fields):
+        """Marks the job succeeded/failed unless something already did."""
+        return self.emit(job_id, "job", status=status, only_active=True, **fields)
+
+    # ---------- reading ----------
+
+    def _is_over(self, job_id):
+        job = self.jobs.find_one({"_id": job_id}, {"status": 1})
+        return not job or job["status"] in TERMINAL
+
+    def stream(self, job_id, after=0, heartbeat=15.0, poll=1.0):
+        """
+        Yields the job's events with seq > `after` until the job ends, then
+        stops. Yields None whenever `heartbeat` seconds pass without an event
+        (so the caller can send a keepalive).
+
+        Uses a change stream when the server supports it (replica sets and
+        Atlas) and falls back to polling on a standalone mongod.
+        """
+        watch = None
+        try:
+            # Subscribe before the catch-up read so nothing slips in between
+            watch = self.events.watch(
+                [{"$match": {"operationType": "insert", "fullDocument.job_id": job_id}}],
+                max_await_time_ms=int(heartbeat * 1000),
+            )
+        except (OperationFailure, NotImplementedError):
+            watch = None
+
+        try:
+            while True:
+                batch = list(
+                    self.events.find(
+                        {"job_id": job_id, "seq": {"$gt": after}}, {"_id": 0}
+                    ).sort("seq", 1)
+                )
+                for event in batch:
+                    after = event["seq"]
+                    yield event
+                    if event["type"] == "job":
+                        return
+                if not batch and self._is_over(job_id):
+                    return
+
+                if watch is not None:
+                    # Blocks for up to `heartbeat` waiting for the next insert;
+                    # the event itself is re-read from the log so order stays strict
+                    if watch.try_next() is None:
+                        yield None
+                else:
+                    waited = 0.0
+                    while waited < heartbeat and not self.events.find_one(
+                        {"job_id": job_id, "seq": {"$gt": after}}, {"_id": 1}
+                    ):
+                        time.sleep(poll)
+                        waited += poll
+                    if waited >= heartbeat:
+                        yield None
+        finally:
+            if watch is not None:
+                watch.close()
+
+
+class JobRunner:
+    """Starts main.py for a slot as a tracked job and records how it exited."""
+
+    def __init__(self, store, script="main.py"):
+        self.store = store
+        self.script = script
+
+    def start(self, slot):
+        job = self.store.create(slot)
+        env = dict(os.environ, **{JOB_ENV: str(job["_id"])})
+        proc = subprocess.Popen([sys.executable, self.script, slot], env=env)
+        self.store.jobs.update_one({"_id": job["_id"]}, {"$set": {"pid": proc.pid}})
+        threading.Thread(target=self._reap, args=(job["_id"], proc), daemon=True).start()
+        return job
+
+    def _reap(self, job_id, proc):
+        code = proc.wait()
+        # main.py reports its own success/failure; this covers crashes and kills
+        self.store.finish(job_id, "succeeded" if code == 0 else "failed", returncode=code)
+
+
+class ProgressReporter:
+    """
+    Emits stage and percent events for the job this process runs as
+    (PIPELINE_JOB_ID). Without a job id every call is a no-op, so the stages
+    run unchanged from the CLI or the scheduler.
+    """
+
+    def __init__(self, job_id=None, min_interval=0.5):
+        try:
+            self.job_id = ObjectId(job_id) if job_id else None
+        except InvalidId:
+            self.job_id = None
+        self.min_interval = min_interval
+        self.stage = None
+        self._store = None
+        self._last = {}  # (stage, key) -> (percent, time)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.job_id is not None
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = JobStore()
+        return self._store
+
+    def _emit(self, kind, stage=None, **fields):
+        if not self.enabled:
+            return
+        try:
+            self.store.emit(self.job_id, kind, stage, **fields)
+        except PyMongoError as e:
+            # Progress is best-effort: never fail a render over it
+            print(f"   ⚠️ Progress event dropped: {e}")
+
+    def begin(self, stage):
+        """Closes the current stage (if any) and starts `stage`."""
+        if self.stage:
+            self._emit("stage", self.stage, status="done")
+        self.stage = stage
+        self._emit("stage", stage, status="running")
+
+    def update(self, percent, stage=None, key=None, message=None):
+        """Percent (0-100) within a stage; throttled to whole percents every `min_interval`."""
+        if not self.enabled:
+            return
+        stage = stage or self.stage
+        percent = max(0, min(100, int(percent)))
+        with self._lock:
+            last_percent, last_time = self._last.get((stage, key), (-1, 0.0))
+            now = time.monotonic()
+            if percent == last_percent:
+                return
+            if percent < 100 and now - last_time < self.min_interval:
+                return
+            self._last[(stage, key)] = (percent, now)
+
+        fields = {"percent": percent}
+        if key is not None:
+            fields["key"] = str(key)
+        if message:
+            fields["message"] = message
+        self._emit("progress", stage, **fields)
+
+    def finish(self):
+        if self.stage:
+            self._emit("stage", self.stage, status="done")
+            self.stage = None
+        if self.enabled:
+            self.store.finish(self.job_id, "succeeded", returncode=0)
+
+    def fail(self, error):
+        if self.stage:
+            self._emit("stage", self.stage, status="failed", error=str(error))
+        if self.enabled:
+            self.store.finish(self.job_id, "failed", error=str(error))
+
+
+_reporter = None
+
+
+def get_reporter():
+    """The process-wide reporter for PIPELINE_JOB_ID (a no-op when unset)."""
+    global _reporter
+    if _reporter is None:
+        _reporter = ProgressReporter(os.getenv(JOB_ENV))
+    return _reporter
@@ -0,0 +1,88 @@
+import math
+import cv2
+import numpy as np
+
+# Output frame (width, height): vertical 9:16
+OUTPUT_SIZE = (1080, 1920)
+
+
+def load_rgb(path):
+    """The image as an RGB uint8 array (what moviepy's ImageClip would read)."""
+    from PIL import Image
+
+    with Image.open(path) as img:
+        return np.asarray(img.convert("RGB"))
+
+
+class KenBurns:
+    """
+    Slow centred zoom (1 + zoom_rate * t) over one still, rendered directly at
+    the output size.
+
+    The old chain resized the whole 1920-high image on every frame
+    (vfx.Resize) and then cropped it. Here the part of the photo that is ever
+    visible is cropped and scaled once, to the output size times the final
+    zoom. Each frame is then a single warpAffine of that source into a reused
+    output buffer: the zoom window is computed analytically for `t`, with
+    sub-pixel precision, so there is no jitter from integer crops.
+
+    `frame(t)` returns one of two preallocated buffers; a caller that keeps a
+    frame beyond the next call must copy it (moviepy consumes each frame
+    before asking for the next).
+    """
+
+    def __init__(self, image, duration, zoom_rate=0.04, size=OUTPUT_SIZE):
+        self.width, self.height = size
+        self.zoom_rate = zoom_rate
+        self.max_zoom = 1 + zoom_rate * max(duration, 0)
+
+        # Cover-fit window (what a centre crop at t=0 shows), in photo pixels
+        h, w = image.shape[:2]
+        cover = max(self.width / w, self.height / h)
+        crop_w = min(w, math.ceil(self.width / cover))
+        crop_h = min(h, math.ceil(self.height / cover))
+        x0, y0 = (w - crop_w) // 2, (h - crop_h) // 2
+        crop = image[y0 : y0 + crop_h, x0 : x0 + crop_w]
+
+        # Sized for the last frame, so every frame is a mild downscale of it
+        src_w = round(self.width * self.max_zoom)
+        src_h = round(self.height * self.max_zoom)
+        shrink = src_w < crop_w
+        self.source = cv2.resize(
+            np.ascontiguousarray(crop),
+            (src_w, src_h),
+            interpolation=cv2.INTER_AREA if shrink else cv2.INTER_CUBIC,
+        )
+
+        self.buffers = [np.empty((self.height, self.width, 3), np.uint8) for _ in range(2)]
+        self.current = 0
+        self.matrix = np.zeros((2, 3), np.float64)
+
+    def frame(self, t):
+        scale = (1 + self.zoom_rate * t) / self.max_zoom
+        src_h, src_w = self.source.shape[:2]
+        m = self.matrix
+        m[0, 0] = m[1, 1] = scale
+        # Keep the centres aligned (pixel centres sit at integer coordinates)
+        m[0, 2] = (self.width - 1) / 2 - scale * (src_w - 1) / 2
+        m[1, 2] = (self.height - 1) / 2 - scale * (src_h - 1) / 2
+
+        out = self.buffers[self.current]
+        self.current ^= 1
+        cv2.warpAffine(
+            self.source,
+            m,
+            (self.width, self.height),
+            dst=out,
+            flags=cv2.INTER_LINEAR,
+            borderMode=cv2.BORDER_REPLICATE,
+        )
+        return out
+
+
+def ken_burns_clip(path, duration, zoom_rate=0.04):
+    """A moviepy clip of `path` zooming in over `duration` seconds, already 1080x1920."""
+    from moviepy import VideoClip
+
+    effect = KenBurns(load_rgb(path), duration, zoom_rate)
+    return VideoClip(effect.frame, duration=duration)
@@ -0,0 +1,260 @@
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from core.tracing import tracer
+
+load_dotenv()
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Refills `rate_per_min` units per minute, holding at most one minute's worth."""
+
+    def __init__(self, rate_per_min):
+        self.capacity = float(rate_per_min)
+        self.tokens = float(rate_per_min)
+        self.rate = rate_per_min / 60.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        # A single request bigger than the bucket still has to go through
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(min(wait, 5))
+
+    def adjust(self, delta):
+        """Gives back (delta < 0) or takes extra (delta > 0) after the real cost is known."""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - delta)
+
+    def drain(self):
+        with self.lock:
+            self.tokens = 0
+            self.updated = time.monotonic()
+
+
+class LLMClient:
+    """
+    One Groq client shared by the whole pipeline: limits requests and tokens
+    per minute, retries 429/5xx with backoff, caches responses on disk and
+    records latency + token usage for every call.
+    """
+
+    def __init__(self, metrics_collection=None):
+        from groq import Groq  # httpx + pydantic models; deferred until a stage needs the LLM
+
+        base_url = os.getenv("GROQ_BASE_URL")  # e.g. a local fake server
+        self.client = Groq(
+            api_key=os.getenv("GROQ_API_KEY"),
+            base_url=base_url or None,
+            max_retries=0,  # retries are handled here, with our own limiter
+        )
+        self.rpm = TokenBucket(int(os.getenv("GROQ_RPM", 30)))
+        self.tpm = TokenBucket(int(os.getenv("GROQ_TPM", 12000)))
+        self.slots = threading.Semaphore(int(os.getenv("GROQ_MAX_CONCURRENCY", 4)))
+        self.max_retries = int(os.getenv("GROQ_MAX_RETRIES", 5))
+        self.max_backoff = 60.0
+
+        self.cache_enabled = os.getenv("LLM_CACHE", "1") != "0"
+        self.cache_dir = os.getenv("LLM_CACHE_DIR", "data/llm_cache")
+        self.metrics_collection = metrics_collection
+
+        self.stats_lock = threading.Lock()
+        self.stats = {
+            "calls": 0,
+            "cache_hits": 0,
+            "retries": 0,
+            "failures": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "latency_total": 0.0,
+        }
+
+    # ---------- cache ----------
+
+    def cache_key(self, model, messages, options):
+        blob = json.dumps(
+            {"model": model, "messages": messages, "options": options}, sort_keys=True
+        )
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _cache_get(self, key):
+        path = self._cache_path(key)
+        if not self.cache_enabled or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _cache_put(self, key, entry):
+        if not self.cache_enabled:
+            return
+        path = self._cache_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+    def forget(self, messages, model, **options):
+        """Drops a cached answer that turned out to be unusable."""
+        path = self._cache_path(self.cache_key(model, messages, options))
+        if os.path.exists(path):
+            os.remove(path)
+
+    # ---------- accounting ----------
+
+    def estimate_tokens(self, messages, options):
+        chars = sum(len(m.get("content", "")) for m in messages)
+        return chars // 4 + options.get("max_tokens", 1024)
+
+    def _record(self, model, tag, latency, usage, cached, error=None):
+        with self.stats_lock:
+            self.stats["calls"] += 1
+            self.stats["cache_hits"] += int(cached)
+            self.stats["failures"] += int(error is not None)
+            self.stats["prompt_tokens"] += usage.get("prompt_tokens", 0)
+            self.stats["completion_tokens"] += usage.get("completion_tokens", 0)
+            self.stats["latency_total"] += latency
+
+        if self.metrics_collection is None:
+            return
+        try:
+            self.metrics_collection.insert_one(
+                {
+                    "model": model,
+                    "tag": tag,
+                    "latency": round(latency, 3),
+                    "cached": cached,
+                    "error": error,
+                    **usage,
+                    "created_at": datetime.now(timezone.utc),
+                }
+            )
+        except Exception as e:
+            print(f"      ⚠️ LLM metrics not saved: {e}")
+
+    # ---------- calls ----------
+
+    def _retry_delay(self, attempt, error):
+        retry_after = None
+        response = getattr(error, "response", None)
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+        try:
+            if retry_after:
+                return min(self.max_backoff, float(retry_after))
+        except ValueError:
+            pass
+        return min(self.max_backoff, 2**attempt) + random.uniform(0, 1)
+
+    def chat(self, messages, model, tag="", use_cache=True, **options):
+        """
+        Runs a chat completion. Returns a dict with `content`, `usage`
+        (prompt/completion/total tokens), `latency` and `cached`.
+        Raises the last Groq error once retries are exhausted.
+        """
+        import groq
+
+        key = self.cache_key(model, messages, options)
+        if use_cache:
+            hit = self._cache_get(key)
+            if hit:
+                self._record(model, tag, 0.0, {}, True)
+                return {**hit, "latency": 0.0, "cached": True}
+
+        estimate = self.estimate_tokens(messages, options)
+        request_bytes = len(json.dumps(messages, ensure_ascii=False).encode("utf-8"))
+        attempt = 0
+
+        while True:
+            self.rpm.acquire(1)
+            self.tpm.acquire(estimate)
+            started = time.monotonic()
+            try:
+                with self.slots:
+                    completion = self.client.chat.completions.create(
+                        messages=messages, model=model, **options
+                    )
+            except (groq.APIStatusError, groq.APIConnectionError) as e:
+                latency = time.monotonic() - started
+                tracer.count("groq", bytes_out=request_bytes)
+                status = getattr(e, "status_code", None)
+                retryable = status is None or status in RETRYABLE_STATUS
+                if status == 429:
+                    # Groq is telling us the window is spent; stop everyone
+                    self.rpm.drain()
+                if not retryable or attempt >= self.max_retries:
+                    self._record(model, tag, latency, {}, False, error=str(e)[:200])
+                    raise
+                attempt += 1
+                with self.stats_lock:
+                    self.stats["retries"] += 1
+                delay = self._retry_delay(attempt, e)
+                print(f"      ⏳ Groq {status or 'connection error'}. Retry {attempt} in {delay:.1f}s...")
+                time.sleep(delay)
+                continue
+
+            latency = time.monotonic() - started
+            usage = {}
+            if getattr(completion, "usage", None):
+                usage = {
+                    "prompt_tokens": completion.usage.prompt_tokens or 0,
+                    "completion_tokens": completion.usage.completion_tokens or 0,
+                    "total_tokens": completion.usage.total_tokens or 0,
+                }
+                self.tpm.adjust(usage["total_tokens"] - estimate)
+
+            content = completion.choices[0].message.content or ""
+            tracer.count("groq", bytes_in=len(content.encode("utf-8")), bytes_out=request_bytes)
+            self._record(model, tag, latency, usage, False)
+            if use_cache:
+                self._cache_put(key, {"content": content, "usage": usage})
+            return {"content": content, "usage": usage, "latency": latency, "cached": False}
+
+    def summary(self):
+        with self.stats_lock:
+            s = dict(self.stats)
+        live = s["calls"] - s["cache_hits"]
+        s["avg_latency"] = s["latency_total"] / live if live else 0.0
+        return s
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_llm_client(db=None):
+    """Returns the process-wide client so every stage shares one rate limit."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            metrics = db.db["llm_metrics"] if db is not None else None
+            _shared = LLMClient(metrics_collection=metrics)
+        elif _shared.metrics_collection is None and db is not None:
+            _shared.metrics_collection = db.db["llm_metrics"]
+        return _shared
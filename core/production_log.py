@@ -0,0 +1,231 @@
+import os
+import json
+import glob
+import argparse
+import datetime
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_LOG = "production_log.jsonl"
+LEGACY_LOG = "production_log.json"
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+@contextmanager
+def locked(f):
+    """Exclusive lock on an open file, held across processes."""
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class ProductionLog:
+    """
+    Append-only JSON Lines log of produced videos: one entry per line, so a
+    run only ever writes its own line and readers can stream or tail it.
+    """
+
+    def __init__(self, path=DEFAULT_LOG):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+
+    @contextmanager
+    def _lock(self):
+        with open(self.lock_path, "a+") as lock_file:
+            with locked(lock_file):
+                yield
+
+    def append(self, entry):
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock():
+            # O_APPEND + a single write: the line lands whole at the end
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, line)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    # ---------- reading ----------
+
+    def files(self, include_rotated=True):
+        """Rotated archives (oldest first) followed by the live file."""
+        base, ext = os.path.splitext(self.path)
+        rotated = sorted(glob.glob(f"{base}.*{ext}")) if include_rotated else []
+        return [p for p in rotated if p != self.path] + (
+            [self.path] if os.path.exists(self.path) else []
+        )
+
+    def _iter_file(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # a torn last line from a crash
+
+    def iter_entries(self, since=None, until=None, slot=None, include_rotated=True):
+        """
+        Streams entries; `since`/`until` are "YYYY-MM-DD[ HH:MM:SS]" strings.
+        Both bounds are inclusive at their own precision: `until="2026-10-19"`
+        keeps everything logged that day.
+        """
+        for path in self.files(include_rotated):
+            for entry in self._iter_file(path):
+                stamp = entry.get("generated_at", "")
+                if since and stamp < since:
+                    continue
+                # Compare at the bound's precision, or a date-only `until`
+                # would sort before every timestamp of that day
+                if until and stamp[:len(until)] > until:
+                    continue
+                if slot and entry.get("time_slot") != slot:
+                    continue
+                yield entry
+
+    def tail(self, n=10):
+        """Last `n` entries, read backwards in blocks instead of loading the file."""
+        if not os.path.exists(self.path) or n <= 0:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            data = b""
+            while pos > 0 and data.count(b"\n") <= n:
+                step = min(64 * 1024, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+
+        entries = []
+        for line in data.splitlines()[-(n + 1):]:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+        return entries[-n:]
+
+    # ---------- maintenance ----------
+
+    def compact(self):
+        """Rewrites the live file without torn or blank lines. Returns lines dropped."""
+        if not os.path.exists(self.path):
+            return 0
+        with self._lock():
+            with open(self.path, "r", encoding="utf-8") as f:
+                total = sum(1 for _ in f)
+            entries = list(self._iter_file(self.path))
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        return total - len(entries)
+
+    def rotate(self, max_bytes=5 * 1024 * 1024, force=False):
+        """Moves the live file to production_log.<timestamp>.jsonl once it gets big."""
+        if not os.path.exists(self.path):
+            return None
+        if not force and os.path.getsize(self.path) < max_bytes:
+            return None
+        base, ext = os.path.splitext(self.path)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        target = f"{base}.{stamp}{ext}"
+        with self._lock():
+            os.replace(self.path, target)
+        return target
+
+    def migrate(self, legacy_path=LEGACY_LOG):
+        """Converts the old JSON-array log to JSON Lines (keeps a .bak copy)."""
+        if not os.path.exists(legacy_path):
+            print(f"📭 Nothing to migrate: {legacy_path} not found.")
+            return 0
+
+        entries = []
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                raw = f.read().strip()
+            entries = json.loads(raw) if raw else []
+        except ValueError as e:
+            print(f"❌ {legacy_path} is not valid JSON ({e}). Nothing changed.")
+            return 0
+
+        with self._lock():
+            # Old entries go first so the file stays in time order
+            existing = b""
+            if os.path.exists(self.path):
+                with open(self.path, "rb") as f:
+                    existing = f.read()
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "wb") as f:
+                for entry in entries:
+                    f.write((json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8"))
+                f.write(existing)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+
+        os.replace(legacy_path, f"{legacy_path}.bak")
+        print(f"✅ Migrated {len(entries)} entries: {legacy_path} -> {self.path}")
+        return len(entries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Production log tools")
+    parser.add_argument("--file", default=DEFAULT_LOG)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_tail = sub.add_parser("tail", help="Show the latest entries")
+    p_tail.add_argument("-n", type=int, default=10)
+
+    p_query = sub.add_parser("query", help="Filter entries by date and slot")
+    p_query.add_argument("--since")
+    p_query.add_argument("--until")
+    p_query.add_argument("--slot")
+
+    p_rotate = sub.add_parser("rotate", help="Archive the live file when it is large")
+    p_rotate.add_argument("--max-mb", type=float, default=5)
+    p_rotate.add_argument("--force", action="store_true")
+
+    sub.add_parser("compact", help="Drop torn/blank lines")
+
+    p_migrate = sub.add_parser("migrate", help="Convert production_log.json to JSON Lines")
+    p_migrate.add_argument("--legacy", default=LEGACY_LOG)
+
+    args = parser.parse_args()
+    log = ProductionLog(args.file)
+
+    if args.command == "tail":
+        for entry in log.tail(args.n):
+            print(json.dumps(entry, ensure_ascii=False))
+    elif args.command == "query":
+        for entry in log.iter_entries(args.since, args.until, args.slot):
+            print(json.dumps(entry, ensure_ascii=False))
+    elif args.command == "rotate":
+        target = log.rotate(int(args.max_mb * 1024 * 1024), force=args.force)
+        print(f"✅ Rotated to {target}" if target else "ℹ️ No rotation needed.")
+    elif args.command == "compact":
+        print(f"✅ Compacted. Dropped {log.compact()} bad line(s).")
+    elif args.command == "migrate":
+        log.migrate(args.legacy)
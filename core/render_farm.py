@@ -0,0 +1,550 @@
+import os
+import sys
+import time
+import random
+import shutil
+import socket
+import argparse
+import threading
+import subprocess
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from pymongo import ReturnDocument
+from core.db_manager import DBManager
+from core.tracing import tracer
+
+# A directory every render node can reach: local disk for nodes on this box,
+# an NFS/SMB mount for other machines
+RENDER_STORE = os.getenv("RENDER_STORE", "data/render_store")
+# Node-local scratch space; a job's copy is deleted after it is pushed back
+RENDER_WORK_DIR = os.getenv("RENDER_WORK_DIR", "data/render_work")
+LEASE_SECONDS = int(os.getenv("RENDER_LEASE_SECONDS", 120))
+MAX_ATTEMPTS = int(os.getenv("RENDER_MAX_ATTEMPTS", 3))
+RETRY_BACKOFF_SECONDS = int(os.getenv("RENDER_RETRY_BACKOFF_SECONDS", 30))
+WAIT_MINUTES = float(os.getenv("RENDER_WAIT_MINUTES", 60))
+
+OUTPUT_NAME = "FINAL_VIDEO.mp4"
+
+
+def now_utc():
+    return datetime.now(timezone.utc)
+
+
+def as_utc(value):
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def farm_enabled():
+    return os.getenv("RENDER_FARM", "").lower() in ("1", "true", "yes")
+
+
+class DirectoryStore:
+    """
+    Job inputs and outputs under `root`, by key (`<job_id>/inputs/<file>`).
+    Every write lands under a temp name and is renamed into place, so a
+    reader never sees half a file. Files on the same filesystem are
+    hard-linked instead of copied (they are never rewritten in place).
+    """
+
+    def __init__(self, root=None):
+        self.root = os.path.abspath(root or RENDER_STORE)
+
+    def path(self, key):
+        return os.path.join(self.root, *key.split("/"))
+
+    @staticmethod
+    def _copy(src, dest):
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = dest + ".part"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        try:
+            os.link(src, tmp)
+        except OSError:
+            shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+        return os.path.getsize(dest)
+
+    def put(self, local_path, key):
+        """Returns the bytes stored."""
+        return self._copy(local_path, self.path(key))
+
+    def get(self, key, local_path):
+        """Returns the bytes fetched."""
+        return self._copy(self.path(key), local_path)
+
+    def delete(self, prefix):
+        shutil.rmtree(self.path(prefix), ignore_errors=True)
+
+
+class RenderQueue:
+    """
+    The producer side, on the box that runs the pipeline. publish() copies a
+    task's audio and images to the store and queues a job in `render_jobs`;
+    the task waits as `rendering`. collect() brings finished videos home and
+    moves their tasks on to `ready_to_upload`, like a local render would.
+    """
+
+    def __init__(self, db=None, store=None):
+        self.db = db or DBManager()
+        self.store = store or DirectoryStore()
+        self.jobs = self.db.db["render_jobs"]
+        self.nodes = self.db.db["render_nodes"]
+
+    def ensure_indexes(self):
+        self.jobs.create_index([("status", 1), ("not_before", 1), ("created_at", 1)])
+        self.jobs.create_index([("task_id", 1)])
+
+    def publish(self, task):
+        """Queues a render job for a `ready_to_assemble` task. Returns the job id."""
+        from core.assembler import RENDER_SETTINGS
+
+        self.db.load_payload(task, ("script_data",))
+        job_id = ObjectId()
+        input_bytes = 0
+        scenes = []
+        for scene in task.get("script_data", []):
+            keys = []
+            for path in [scene["audio_path"]] + list(scene.get("image_paths", [])):
+                key = f"{job_id}/inputs/{os.path.basename(path)}"
+                input_bytes += self.store.put(path, key)
+                keys.append(key)
+            scenes.append({"audio": keys[0], "images": keys[1:]})
+
+        now = now_utc()
+        self.jobs.insert_one(
+            {
+                "_id": job_id,
+                "task_id": task["_id"],
+                "status": "queued",
+                "spec": {
+                    "title": task.get("title", ""),
+                    "scenes": scenes,
+                    "settings": RENDER_SETTINGS,
+                },
+                "input_bytes": input_bytes,
+                "attempts": 0,
+                "attempts_left": MAX_ATTEMPTS,
+                "created_at": now,
+                "not_before": now,
+            }
+        )
+        self.db.collection.update_one(
+            {"_id": task["_id"], "status": "ready_to_assemble"},
+            {"$set": {"status": "rendering", "render_job_id": job_id}},
+        )
+        print(f"📮 Render job {job_id} queued ({len(scenes)} scenes, {input_bytes / 1024 / 1024:.1f}MB)")
+        return job_id
+
+    def wait(self, job_id, timeout_minutes=WAIT_MINUTES, poll=5):
+        """
+        Blocks until the job is done or failed (or the timeout). Returns the
+        job, or None if it was deleted meanwhile (--clear, cleanup).
+        """
+        deadline = time.monotonic() + timeout_minutes * 60
+        last_status = None
+        while True:
+            job = self.jobs.find_one({"_id": job_id}, {"spec": 0})
+            if job is None:
+                return None
+            if job["status"] != last_status:
+                node = f" on {job['node']}" if job.get("node") else ""
+                print(f"   ⏳ Render job: {job['status']}{node} (attempt {job.get('attempts', 0)})")
+                last_status = job["status"]
+            if job["status"] in ("done", "failed") or time.monotonic() > deadline:
+                return job
+            time.sleep(poll)
+
+    def collect(self):
+        """Moves every finished job's video into its task folder. Returns the tasks made ready."""
+        ready = []
+        for job in self.jobs.find({"status": {"$in": ["done", "failed"]}, "collected": {"$ne": True}}):
+            task = self.db.collection.find_one(
+                {"_id": job["task_id"], "status": "rendering"}, {"folder_path": 1, "title": 1}
+            )
+            if task and job["status"] == "done":
+                out_path = os.path.join(task["folder_path"], OUTPUT_NAME)
+                self.store.get(job["output_key"], out_path)
+                self.db.collection.update_one(
+                    {"_id": task["_id"]},
+                    {"$set": {"status": "ready_to_upload", "final_video_path": out_path}},
+                )
+                print(f"🎉 Farm render ready ({job['node']}): {out_path}")
+                ready.append(task["_id"])
+            elif task:
+                # Back to the queue of the assemble stage: the next run tries again
+                self.db.collection.update_one(
+                    {"_id": task["_id"]},
+                    {"$set": {"status": "ready_to_assemble", "render_error": job.get("last_error")}},
+                )
+                print(f"❌ Farm render failed for '{task['title']}': {job.get('last_error')}")
+            self.jobs.update_one({"_id": job["_id"]}, {"$set": {"collected": True, "collected_at": now_utc()}})
+            self.store.delete(str(job["_id"]))
+        return ready
+
+    def assemble(self, task_id=None, wait=True):
+        """The assemble stage, rendered by the farm instead of this process."""
+        from core.assembler import VideoAssembler
+
+        self.ensure_indexes()
+        self.collect()  # anything a previous run stopped waiting for
+        task = self.db.next_task("ready_to_assemble", task_id)
+        if not task:
+            return
+
+        tracer.tag_task(task["_id"])
+        self.db.load_payload(task, ("script_data",))
+        out_path = os.path.join(task["folder_path"], OUTPUT_NAME)
+        if VideoAssembler.is_up_to_date(out_path, task.get("script_data", [])):
+            print(f"⏭️ {out_path} is newer than its audio and images. Skipping render.")
+            self.db.collection.update_one(
+                {"_id": task["_id"]},
+                {"$set": {"status": "ready_to_upload", "final_video_path": out_path}},
+            )
+            return
+
+        job_id = self.publish(task)
+        if not wait:
+            return
+        job = self.wait(job_id)
+        if job is None:
+            # collect() never sees a deleted job: fail the render here, like collect would
+            self.db.collection.update_one(
+                {"_id": task["_id"], "status": "rendering"},
+                {"$set": {"status": "ready_to_assemble", "render_error": "render job deleted"}},
+            )
+            print(f"❌ Farm render failed for '{task['title']}': job {job_id} was deleted.")
+            return
+        if job["status"] not in ("done", "failed"):
+            print("⌛ Still rendering. The next run collects it (task stays 'rendering').")
+        self.collect()
+
+    # ---------- reporting ----------
+
+    def report(self, hours=24):
+        since = now_utc() - timedelta(hours=hours)
+        queue = {
+            status: self.jobs.count_documents({"status": status})
+            for status in ("queued", "leased", "done", "failed")
+        }
+        oldest = self.jobs.find_one({"status": "queued"}, {"created_at": 1}, sort=[("created_at", 1)])
+        queue["oldest_queued_s"] = (
+            round((now_utc() - as_utc(oldest["created_at"])).total_seconds()) if oldest else None
+        )
+
+        nodes = {}
+
+        def row_for(node_id, node=None):
+            if node_id not in nodes:
+                nodes[node_id] = {
+                    "status": (node or {}).get("status"),
+                    "last_seen": (node or {}).get("last_seen"),
+                    "jobs": 0,
+                    "failures": 0,
+                    "render_s": 0.0,
+                    "busy_s": 0.0,
+                    "video_s": 0.0,
+                }
+            return nodes[node_id]
+
+        for node in self.nodes.find():
+            row_for(node["_id"], node)
+        first = {}
+        last = {}
+        # Failed attempts are counted on every job touched in the window
+        window = {"$or": [{"finished_at": {"$gte": since}}, {"errors.at": {"$gte": since}}]}
+        for job in self.jobs.find(window, {"spec": 0}):
+            for error in job.get("errors", []):
+                if as_utc(error["at"]) >= since:
+                    row_for(error["node"])["failures"] += 1
+            if job["status"] != "done":
+                continue
+            row = row_for(job["node"])
+            timings = job.get("timings", {})
+            row["jobs"] += 1
+            row["render_s"] += timings.get("render_s", 0)
+            row["busy_s"] += sum(timings.values())
+            row["video_s"] += job.get("video_seconds") or 0
+            started, finished = as_utc(job["leased_at"]), as_utc(job["finished_at"])
+            first[job["node"]] = min(first.get(job["node"], started), started)
+            last[job["node"]] = max(last.get(job["node"], finished), finished)
+
+        for node_id, row in nodes.items():
+            span = (last[node_id] - first[node_id]).total_seconds() if node_id in first else 0
+            row["avg_render_s"] = round(row["render_s"] / row["jobs"], 1) if row["jobs"] else None
+            row["jobs_per_hour"] = round(row["jobs"] / span * 3600, 1) if span else None
+            # Seconds of finished video per second of rendering
+            row["speed"] = round(row["video_s"] / row["render_s"], 2) if row["render_s"] else None
+        return {"hours": hours, "queue": queue, "nodes": nodes}
+
+
+class RenderNode:
+    """
+    A render worker: leases the oldest queued job, pulls its inputs from the
+    store, renders with VideoAssembler.render and pushes the MP4 back.
+
+    The lease is renewed every third of RENDER_LEASE_SECONDS while it works.
+    A node that dies stops renewing; its job is queued again once the lease
+    runs out, up to RENDER_MAX_ATTEMPTS claims in total. Failed attempts are
+    retried after a growing back-off.
+    """
+
+    def __init__(self, node_id=None, db=None, store=None, simulate=None, fail_rate=0.0):
+        self.node_id = node_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.db = db or DBManager()
+        self.store = store or DirectoryStore()
+        self.jobs = self.db.db["render_jobs"]
+        self.nodes = self.db.db["render_nodes"]
+        self.lease = timedelta(seconds=LEASE_SECONDS)
+        # Testing: sleep instead of rendering, and fail this share of jobs
+        self.simulate = simulate
+        self.fail_rate = fail_rate
+        self._assembler = None
+
+    @property
+    def assembler(self):
+        # One per node: whisper stays loaded between jobs
+        if self._assembler is None:
+            from core.assembler import VideoAssembler
+
+            self._assembler = VideoAssembler()
+        return self._assembler
+
+    def heartbeat(self, status):
+        self.nodes.update_one(
+            {"_id": self.node_id},
+            {
+                "$set": {"status": status, "last_seen": now_utc(), "host": socket.gethostname(), "pid": os.getpid()},
+                "$setOnInsert": {"started_at": now_utc()},
+            },
+            upsert=True,
+        )
+
+    def requeue_expired(self):
+        """Jobs whose node stopped renewing the lease: queue again, or fail when out of attempts."""
+        now = now_utc()
+        expired = {"status": "leased", "lease_until": {"$lt": now}}
+        res = self.jobs.update_many(
+            {**expired, "attempts_left": {"$gt": 0}},
+            {"$set": {"status": "queued", "not_before": now, "last_error": "lease expired"}},
+        )
+        failed = self.jobs.update_many(
+            {**expired, "attempts_left": {"$lte": 0}},
+            {"$set": {"status": "failed", "finished_at": now, "last_error": "lease expired"}},
+        )
+        if res.modified_count or failed.modified_count:
+            print(f"   ♻️ Expired leases: {res.modified_count} re-queued, {failed.modified_count} failed.")
+        return res.modified_count + failed.modified_count
+
+    def claim(self):
+        self.requeue_expired()
+        now = now_utc()
+        return self.jobs.find_one_and_update(
+            {"status": "queued", "not_before": {"$lte": now}},
+            {
+                "$set": {
+                    "status": "leased",
+                    "node": self.node_id,
+                    "leased_at": now,
+                    "lease_until": now + self.lease,
+                },
+                "$inc": {"attempts": 1, "attempts_left": -1},
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def _renew(self, job_id, stop):
+        while not stop.wait(self.lease.total_seconds() / 3):
+            res = self.jobs.update_one(
+                {"_id": job_id, "node": self.node_id, "status": "leased"},
+                {"$set": {"lease_until": now_utc() + self.lease}},
+            )
+            self.heartbeat("rendering")
+            if not res.matched_count:
+                print(f"   ⚠️ [{self.node_id}] Lost the lease on {job_id}; its result will be dropped.")
+                return
+
+    def render(self, scenes, title, work, settings):
+        out_path = os.path.join(work, OUTPUT_NAME)
+        if self.simulate is None:
+            return out_path, self.assembler.render(scenes, title, work, out_path, settings)
+
+        time.sleep(self.simulate)
+        if random.random() < self.fail_rate:
+            raise RuntimeError("simulated render failure")
+        with open(out_path, "wb") as out:
+            for scene in scenes:
+                with open(scene["audio_path"], "rb") as f:
+                    shutil.copyfileobj(f, out)
+        return out_path, self.simulate
+
+    def process(self, job):
+        """Renders one leased job. Returns True if its video was delivered."""
+        job_id = job["_id"]
+        work = os.path.join(RENDER_WORK_DIR, self.node_id, str(job_id))
+        stop = threading.Event()
+        renewer = threading.Thread(target=self._renew, args=(job_id, stop), daemon=True)
+        renewer.start()
+        timings = {}
+        print(f"🎬 [{self.node_id}] Job {job_id} (attempt {job['attempts']})")
+        try:
+            started = time.monotonic()
+            scenes = []
+            for scene in job["spec"]["scenes"]:
+                local = [os.path.join(work, os.path.basename(k)) for k in [scene["audio"]] + scene["images"]]
+                for key, path in zip([scene["audio"]] + scene["images"], local):
+                    self.store.get(key, path)
+                scenes.append({"audio_path": local[0], "image_paths": local[1:]})
+            timings["fetch_s"] = round(time.monotonic() - started, 2)
+
+            started = time.monotonic()
+            out_path, video_seconds = self.render(
+                scenes, job["spec"]["title"], work, job["spec"]["settings"]
+            )
+            timings["render_s"] = round(time.monotonic() - started, 2)
+
+            started = time.monotonic()
+            key = f"{job_id}/{OUTPUT_NAME}"
+            output_bytes = self.store.put(out_path, key)
+            timings["push_s"] = round(time.monotonic() - started, 2)
+
+            # Only the lease holder may finish the job
+            done = self.jobs.find_one_and_update(
+                {"_id": job_id, "node": self.node_id, "status": "leased"},
+                {
+                    "$set": {
+                        "status": "done",
+                        "output_key": key,
+                        "output_bytes": output_bytes,
+                        "video_seconds": round(video_seconds or 0, 2),
+                        "timings": timings,
+                        "finished_at": now_utc(),
+                    }
+                },
+            )
+            if not done:
+                print(f"   ⚠️ [{self.node_id}] Job {job_id} was taken over; dropping this render.")
+                return False
+            self.nodes.update_one(
+                {"_id": self.node_id},
+                {"$inc": {"jobs_done": 1, "render_seconds": timings["render_s"], "output_bytes": output_bytes}},
+            )
+            print(f"   ✅ [{self.node_id}] Job {job_id}: {timings}")
+            return True
+        except Exception as e:
+            self.fail(job, e)
+            return False
+        finally:
+            stop.set()
+            renewer.join()
+            shutil.rmtree(work, ignore_errors=True)
+
+    def fail(self, job, error):
+        now = now_utc()
+        if job["attempts_left"] > 0:
+            update = {
+                "status": "queued",
+                "not_before": now + timedelta(seconds=RETRY_BACKOFF_SECONDS * job["attempts"]),
+            }
+        else:
+            update = {"status": "failed", "finished_at": now}
+        update["last_error"] = str(error)[:500]
+        self.jobs.update_one(
+            {"_id": job["_id"], "node": self.node_id, "status": "leased"},
+            {
+                "$set": update,
+                "$push": {"errors": {"node": self.node_id, "error": str(error)[:500], "at": now}},
+            },
+        )
+        self.nodes.update_one({"_id": self.node_id}, {"$inc": {"jobs_failed": 1}})
+        print(f"   ❌ [{self.node_id}] Job {job['_id']} failed ({update['status']}): {error}")
+
+    def run(self, max_jobs=None, idle_exit=None, poll=5):
+        """Works the queue until `max_jobs` are done, or it has been idle for `idle_exit` seconds."""
+        print(f"🖥️ Render node {self.node_id} | store: {self.store.root}")
+        self.heartbeat("idle")
+        done = 0
+        idle_since = time.monotonic()
+        try:
+            while max_jobs is None or done < max_jobs:
+                job = self.claim()
+                if not job:
+                    if idle_exit is not None and time.monotonic() - idle_since >= idle_exit:
+                        break
+                    self.heartbeat("idle")
+                    time.sleep(poll)
+                    continue
+                self.heartbeat("rendering")
+                self.process(job)
+                done += 1
+                idle_since = time.monotonic()
+                self.heartbeat("idle")
+        finally:
+            self.heartbeat("offline")
+        return done
+
+
+def print_report(report):
+    q = report["queue"]
+    oldest = f", oldest waiting {q['oldest_queued_s']}s" if q["oldest_queued_s"] is not None else ""
+    print(f"\n🏭 Render farm: {q['queued']} queued, {q['leased']} rendering, "
+          f"{q['done']} done, {q['failed']} failed{oldest}")
+    print(f"{'node':<28} {'status':<10} {'jobs':>5} {'fails':>6} {'avg s':>7} {'jobs/h':>7} {'speed':>6}")
+    for node_id, n in sorted(report["nodes"].items()):
+        cells = [n.get("avg_render_s"), n.get("jobs_per_hour"), n.get("speed")]
+        cells = ["-" if c is None else f"{c:g}" for c in cells]
+        print(f"{node_id:<28} {n.get('status') or '-':<10} {n['jobs']:>5} {n['failures']:>6} "
+              f"{cells[0]:>7} {cells[1]:>7} {cells[2]:>6}")
+    print(f"   (last {report['hours']}h; speed = seconds of video per second of rendering)")
+
+
+def spawn_local(count, node_args):
+    """Starts `count` node processes on this machine and waits for them."""
+    host = socket.gethostname()
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-m", "core.render_farm", "node", "--id", f"{host}-local{i}"] + node_args
+        )
+        for i in range(count)
+    ]
+    try:
+        return [p.wait() for p in procs]
+    except KeyboardInterrupt:
+        for p in procs:
+            p.terminate()
+        raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render farm: nodes, local test farm and stats")
+    parser.add_argument("action", choices=["node", "local", "collect", "status"])
+    parser.add_argument("--id", help="Node id (default: host-pid)")
+    parser.add_argument("--nodes", type=int, default=2, help="local: node processes to start")
+    parser.add_argument("--max-jobs", type=int, default=None)
+    parser.add_argument("--idle-exit", type=float, default=None, help="Stop after this many idle seconds")
+    parser.add_argument("--poll", type=float, default=5)
+    parser.add_argument("--simulate", type=float, default=None, help="Testing: sleep N s instead of rendering")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Testing: share of simulated renders that fail")
+    parser.add_argument("--hours", type=float, default=24, help="status: window for node stats")
+    args = parser.parse_args()
+
+    if args.action == "node":
+        RenderNode(args.id, simulate=args.simulate, fail_rate=args.fail_rate).run(
+            max_jobs=args.max_jobs, idle_exit=args.idle_exit, poll=args.poll
+        )
+    elif args.action == "local":
+        node_args = ["--poll", str(args.poll)]
+        for flag, value in (("--max-jobs", args.max_jobs), ("--idle-exit", args.idle_exit),
+                            ("--simulate", args.simulate)):
+            if value is not None:
+                node_args += [flag, str(value)]
+        node_args += ["--fail-rate", str(args.fail_rate)]
+        spawn_local(args.nodes, node_args)
+        print_report(RenderQueue().report(args.hours))
+    elif args.action == "collect":
+        RenderQueue().collect()
+    else:
+        print_report(RenderQueue().report(args.hours))
@@ -0,0 +1,258 @@
+import os
+import time
+import random
+import requests
+from google.auth.exceptions import RefreshError, TransportError
+from core.tracing import traced
+
+# Google's resumable protocol wants every chunk (except the last) to be a
+# multiple of 256 KiB.
+CHUNK_ALIGN = 256 * 1024
+MIN_CHUNK_SIZE = CHUNK_ALIGN
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Only these are worth retrying. Anything else (400 bad metadata, 401/403
+# auth/quota problems) will fail the same way every time.
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+RETRYABLE_EXCEPTIONS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    # AuthorizedSession refreshes the token mid-upload; a network error on
+    # that refresh surfaces as google-auth's TransportError
+    TransportError,
+)
+
+
+class UploadError(Exception):
+    pass
+
+
+class RetryableUploadError(UploadError):
+    pass
+
+
+class SessionExpiredError(UploadError):
+    pass
+
+
+class ResumableUpload:
+    """
+    Client for the YouTube/Google resumable upload protocol.
+
+    The session URI and the last offset confirmed by the server are handed to
+    `save_state` after every chunk, so a new process can pick up exactly where
+    the old one stopped instead of re-sending the whole file.
+    """
+
+    def __init__(
+        self,
+        session,
+        file_path,
+        metadata,
+        upload_url,
+        state=None,
+        save_state=None,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        target_chunk_seconds=8.0,
+        max_retries=8,
+        max_backoff=64.0,
+        content_type="video/*",
+    ):
+        self.session = session
+        self.file_path = file_path
+        self.metadata = metadata
+        self.upload_url = upload_url
+        self.save_state = save_state
+        self.target_chunk_seconds = target_chunk_seconds
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.content_type = content_type
+
+        self.total_size = os.path.getsize(file_path)
+        self.session_uri = None
+        self.offset = 0
+        self.chunk_size = self._align(chunk_size)
+        self.response = None
+
+        # Only trust a saved session if it belongs to the same file
+        if state and state.get("session_uri") and state.get("total") == self.total_size:
+            self.session_uri = state["session_uri"]
+            self.offset = int(state.get("offset", 0))
+            self.chunk_size = self._align(state.get("chunk_size", self.chunk_size))
+
+    def _align(self, size):
+        size = int(max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, size)))
+        return max(CHUNK_ALIGN, size - size % CHUNK_ALIGN)
+
+    def state(self):
+        return {
+            "session_uri": self.session_uri,
+            "offset": self.offset,
+            "total": self.total_size,
+            "chunk_size": self.chunk_size,
+            "file_path": self.file_path,
+        }
+
+    def _persist(self):
+        if self.save_state:
+            self.save_state(self.state())
+
+    def progress(self):
+        if not self.total_size:
+            return 1.0
+        return self.offset / self.total_size
+
+    def _check_status(self, res):
+        if res.status_code in RETRYABLE_STATUS:
+            raise RetryableUploadError(f"HTTP {res.status_code}: {res.text[:200]}")
+        if res.status_code in (404, 410):
+            raise SessionExpiredError(f"Upload session gone (HTTP {res.status_code})")
+        raise UploadError(f"HTTP {res.status_code}: {res.text[:200]}")
+
+    def _read_range(self, res):
+        # "Range: bytes=0-1048575" -> next byte to send is 1048576
+        header = res.headers.get("Range")
+        if not header:
+            return 0
+        return int(header.split("-")[-1]) + 1
+
+    def start(self):
+        """Opens a new upload session and remembers its URI."""
+        res = self.session.post(
+            self.upload_url,
+            json=self.metadata,
+            headers={
+                "X-Upload-Content-Length": str(self.total_size),
+                "X-Upload-Content-Type": self.content_type,
+            },
+            timeout=30,
+        )
+        if res.status_code != 200 or not res.headers.get("Location"):
+            self._check_status(res)
+
+        self.session_uri = res.headers["Location"]
+        self.offset = 0
+        self._persist()
+
+    def query_offset(self):
+        """Asks the server how many bytes it has actually committed."""
+        res = self.session.put(
+            self.session_uri,
+            headers={
+                "Content-Range": f"bytes */{self.total_size}",
+                "Content-Length": "0",
+            },
+            timeout=30,
+        )
+        if res.status_code in (200, 201):
+            self.offset = self.total_size
+            self.response = res.json()
+            return self.offset
+        if res.status_code != 308:
+            self._check_status(res)
+
+        self.offset = self._read_range(res)
+        self._persist()
+        return self.offset
+
+    def _adapt_chunk_size(self, sent, elapsed):
+        if elapsed <= 0:
+            return
+        rate = sent / elapsed
+        wanted = rate * self.target_chunk_seconds
+        # Never jump more than 2x per step so one lucky chunk can't blow up
+        # the next request on a flaky link
+        wanted = max(self.chunk_size / 2, min(self.chunk_size * 2, wanted))
+        self.chunk_size = self._align(wanted)
+
+    @traced("next_chunk")
+    def next_chunk(self):
+        """
+        Sends one chunk. Returns (progress, response) where response is the
+        video resource once the upload has finished, otherwise None.
+        """
+        if self.session_uri is None:
+            self.start()
+
+        end = min(self.offset + self.chunk_size, self.total_size) - 1
+        with open(self.file_path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(end - self.offset + 1)
+
+        started = time.monotonic()
+        res = self.session.put(
+            self.session_uri,
+            data=data,
+            headers={
+                "Content-Range": f"bytes {self.offset}-{end}/{self.total_size}",
+                "Content-Length": str(len(data)),
+            },
+            timeout=max(60, self.target_chunk_seconds * 4),
+        )
+        elapsed = time.monotonic() - started
+
+        if res.status_code in (200, 201):
+            self.offset = self.total_size
+            self.response = res.json()
+            return 1.0, self.response
+
+        if res.status_code != 308:
+            self._check_status(res)
+
+        confirmed = self._read_range(res)
+        self._adapt_chunk_size(max(0, confirmed - self.offset), elapsed)
+        self.offset = confirmed
+        self._persist()
+        return self.progress(), None
+
+    def _backoff(self, attempt):
+        delay = min(self.max_backoff, 2**attempt) + random.uniform(0, 1)
+        time.sleep(delay)
+
+    def upload(self, on_progress=None):
+        """Runs the upload to completion, resuming from any saved offset."""
+        retries = 0
+        resync = self.session_uri is not None
+
+        while self.response is None:
+            try:
+                if resync:
+                    self.query_offset()
+                    resync = False
+                    if self.response is not None:
+                        break
+
+                progress, _ = self.next_chunk()
+                retries = 0
+                if on_progress:
+                    on_progress(progress, self.offset, self.total_size)
+
+            except SessionExpiredError:
+                print("      ⚠️ Upload session expired. Starting a fresh one...")
+                self.session_uri = None
+                self.offset = 0
+                self._persist()
+                retries += 1
+
+            except RefreshError as e:
+                # Google refused to renew the token (revoked or expired grant).
+                # Retrying now won't help, but the session stays valid for a week
+                self._persist()
+                raise UploadError(f"OAuth token refresh failed: {e}")
+
+            except (RetryableUploadError,) + RETRYABLE_EXCEPTIONS as e:
+                retries += 1
+                if retries > self.max_retries:
+                    raise UploadError(f"Too many failures, last error: {e}")
+                print(f"      ⚠️ Upload interrupted ({e}). Backing off...")
+                self._backoff(retries)
+                # After any failure the server may have kept part of the
+                # chunk, so ask before sending again
+                resync = self.session_uri is not None
+
+            if retries > self.max_retries:
+                raise UploadError("Too many failures.")
+
+        return self.response
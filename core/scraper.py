@@ -4,8 +4,14 @@ import random
 import datetime
 import re
 import os
-from groq import Groq  # <--- CHANGED
-from core.db_manager import DBManager
+import calendar
+import time
+from core.llm_client import get_llm_client
+from core.ranker import HeadlineRanker
+from core.article import ArticleExtractor
+from core.tracing import traced
+from core.feed_health import FeedHealth
+from core.candidate_pool import CandidatePool, POOL_ENABLED, candidate_key
 from dotenv import load_dotenv
 from core.db_manager import DBManager
 
@@ -13,10 +19,21 @@ from core.db_manager import DBManager
 class NewsScraper:
     def __init__(self):
         self.db = DBManager()
-        # Initialize Groq Client
-        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))  # <--- CHANGED
+        # Shared Groq client (rate limits, retries, cache, token metrics)
+        self.llm = get_llm_client(self.db)
         self.model = "llama-3.3-70b-versatile"  # Fast and free on Groq
+        # Local pre-ranker: only the top-K headlines go to the LLM judge.
+        # VIRAL_JUDGE=local skips the LLM entirely (e.g. while rate-limited).
+        self.ranker = HeadlineRanker(self.db, top_k=int(os.getenv("RANKER_TOP_K", 8)))
+        self.judge_mode = os.getenv("VIRAL_JUDGE", "llm")
+        # Full-article text for the winner (RSS summaries are often one-liners)
+        self.articles = ArticleExtractor()
+        self.article_prefetch_k = int(os.getenv("ARTICLE_PREFETCH_TOP_K", 3))
         self.headers = {"User-Agent": "Mozilla/5.0"}
+        # Per-feed latency/failure/yield stats: skips dead feeds, best first
+        self.feeds = FeedHealth(self.db)
+        # Unpicked candidates from earlier scrapes (feeds only when stale/thin)
+        self.pool = CandidatePool(self.db) if POOL_ENABLED else None
 
         self.niche_map = {
             "morning": {
@@ -72,16 +89,69 @@ class NewsScraper:
         else:
             return "night"
 
-    def fetch_rss(self, url):
+    @traced("fetch_rss")
+    def fetch_feed(self, url, timeout=10):
+        """Returns (entries, error). error is None when the feed answered."""
         try:
-            r = requests.get(url, headers=self.headers, timeout=10)
-            if r.status_code == 200:
-                return feedparser.parse(r.content).entries[
-                    :10
-                ]  # increased to 10 for more variety
-        except:
-            pass
-        return []
+            r = requests.get(url, headers=self.headers, timeout=timeout)
+        except requests.RequestException as e:
+            return [], f"{type(e).__name__}: {e}"
+        if r.status_code != 200:
+            return [], f"HTTP {r.status_code}"
+        feed = feedparser.parse(r.content)
+        if feed.bozo and not feed.entries:
+            return [], f"Unparseable feed: {feed.get('bozo_exception')}"
+        return feed.entries[:10], None  # increased to 10 for more variety
+
+    def fetch_rss(self, url):
+        return self.fetch_feed(url)[0]
+
+    def fetch_sources(self, sources, niche, known=None):
+        """
+        Fetches the niche's feeds in FeedHealth order within its time budget
+        and records each fetch. Returns the new unique candidates.
+        `known` ({pool key: state}) skips the duplicate check for pooled items.
+        """
+        known = known or {}
+        ordered, skipped = self.feeds.plan(niche, sources)
+        for url, reason in skipped.items():
+            print(f"   ⏭️ Skipping feed ({reason}): {url}")
+            self.feeds.record_skip(url, niche, reason)
+
+        candidates = []
+        started = time.monotonic()
+        for fetched, url in enumerate(ordered):
+            elapsed = time.monotonic() - started
+            if self.feeds.over_budget(url, elapsed, fetched):
+                print(f"   ⌛ Feed budget spent after {fetched} feed(s) ({elapsed:.1f}s)")
+                break
+            fetch_start = time.monotonic()
+            entries, error = self.fetch_feed(url, timeout=self.feeds.remaining(elapsed, fetched))
+            latency = time.monotonic() - fetch_start
+            fresh = []
+            for e in entries:
+                if hasattr(e, "title"):
+                    candidate = {
+                        "title": e.title,
+                        "summary": getattr(e, "summary", e.title)[:3000],
+                        "link": getattr(e, "link", ""),
+                        "niche": niche,
+                        "published": self.published_ts(e),
+                        "feed": url,
+                    }
+                    state = known.get(candidate_key(candidate))
+                    if state is not None:
+                        # The pool keeps its own verdict up to date
+                        if state == "open":
+                            fresh.append(candidate)
+                    # The DB Manager now handles the 7-day fuzzy check
+                    elif not self.db.task_exists(e.title):
+                        fresh.append(candidate)
+            if error:
+                print(f"   ⚠️ Feed failed ({error}): {url}")
+            self.feeds.record_fetch(url, niche, latency, error, entries, len(fresh))
+            candidates.extend(fresh)
+        return candidates
 
     # 🟢 NEW: AI VIRAL JUDGE
     def pick_viral_topic(self, candidates, niche):
@@ -112,12 +182,13 @@ class NewsScraper:
             )
 
             # CALL GROQ API INSTEAD OF OLLAMA
-            chat_completion = self.client.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
-                model=self.model,
+            result = self.llm.chat(
+                [{"role": "user", "content": prompt}],
+                self.model,
+                tag="viral_judge",
             )
 
-            content = chat_completion.choices[0].message.content.strip()
+            content = result["content"].strip()
             match = re.search(r"\d+", content)
 
             if match:
@@ -128,50 +199,110 @@ class NewsScraper:
                     )
                     return candidates[index]
 
-            print("      ⚠️ AI failed to return a valid number. Picking random.")
-            return random.choice(candidates)
+            print("      ⚠️ AI failed to return a valid number. Using pre-ranker pick.")
+            return self.fallback_pick(candidates)
 
         except Exception as e:
-            print(f"      ❌ Groq Error: {e}. Fallback to random.")
-            return random.choice(candidates)
+            print(f"      ❌ Groq Error: {e}. Fallback to pre-ranker pick.")
+            return self.fallback_pick(candidates)
+
+    def fallback_pick(self, candidates):
+        # Candidates arrive sorted by the pre-ranker, so the first is its best
+        if candidates and "rank_score" in candidates[0]:
+            return candidates[0]
+        return random.choice(candidates)
+
+    def published_ts(self, entry):
+        parsed = getattr(entry, "published_parsed", None) or getattr(
+            entry, "updated_parsed", None
+        )
+        return calendar.timegm(parsed) if parsed else None
 
     def scrape_targeted_niche(self, forced_slot=None):
+        """Adds the slot's best fresh story as a pending task. Returns its id (None if nothing new)."""
         slot = forced_slot if forced_slot else self.get_time_slot()
         config = self.niche_map.get(slot, self.niche_map["noon"])
         niche = config["niche"]
 
         print(f"🕵️‍♂️ Strategy: {slot.upper()} ({niche})")
 
-        candidates = []
-        for url in config["sources"]:
-            entries = self.fetch_rss(url)
-            for e in entries:
-                if hasattr(e, "title"):
-                    # The DB Manager now handles the 7-day fuzzy check
-                    if not self.db.task_exists(e.title):
-                        candidates.append(
-                            {
-                                "title": e.title,
-                                "summary": getattr(e, "summary", e.title)[:3000],
-                                "link": getattr(e, "link", ""),
-                                "niche": niche,
-                            }
-                        )
+        candidates = self.gather_candidates(config["sources"], niche)
 
         if not candidates:
             print("❌ No new unique tasks found. Try a different slot.")
             return
 
-        # 🟢 SMART SELECTION (AI JUDGE)
+        # 🟢 SMART SELECTION (LOCAL PRE-RANK -> AI JUDGE)
         if len(candidates) > 0:
-            # print({"candidates": candidates})
-            winner = self.pick_viral_topic(candidates, niche)
+            shortlist = self.ranker.shortlist(candidates, niche)
+            # Fetch the likeliest winners' articles while the judge is thinking
+            article_jobs = self.articles.prefetch(
+                [c["link"] for c in shortlist[: self.article_prefetch_k]]
+            )
+            if self.judge_mode == "local" or len(shortlist) == 1:
+                winner = shortlist[0]
+                print(f"      🏆 Pre-Ranker Selected: '{winner['title'][:40]}...'")
+            else:
+                winner = self.pick_viral_topic(shortlist, niche)
 
             if winner:
-                self.db.add_task(
+                self.feeds.record_win(winner["feed"])
+                if self.pool:
+                    self.pool.mark_used(winner)
+                content, content_stats = self.enrich_content(winner, article_jobs)
+                return self.db.add_task(
                     winner["title"],
-                    winner["summary"],
+                    content,
                     f"{niche.upper()}",
                     "pending",
-                    {"niche": niche, "niche_slot": slot, "source_url": winner["link"]},
+                    {
+                        "niche": niche,
+                        "niche_slot": slot,
+                        "source_url": winner["link"],
+                        "content_stats": content_stats,
+                    },
                 )
+
+    def gather_candidates(self, sources, niche):
+        """The niche's candidates: from the pool, refreshed from the feeds when stale or thin."""
+        if not self.pool:
+            return self.fetch_sources(sources, niche)
+
+        started = datetime.datetime.now(datetime.timezone.utc)
+        pooled, state = self.pool.take(niche, started)
+        if not state["refresh"]:
+            print(f"   🗃️ Candidate Pool: {state['open']} fresh candidate(s), feeds not fetched")
+            return pooled
+
+        print(f"   🗃️ Candidate Pool: {state['open']} candidate(s) ({state['refresh']}), refreshing feeds")
+        fetched = self.fetch_sources(sources, niche, known=state["known"])
+        self.pool.ensure_indexes()
+        added = self.pool.add(fetched, niche, checked_at=started)
+        candidates, state = self.pool.take(niche)
+        print(f"   🗃️ Candidate Pool: +{added} new, {len(candidates)} to choose from")
+        return candidates
+
+    def enrich_content(self, winner, article_jobs):
+        """Swaps the RSS teaser for the full article text when we got one."""
+        summary = winner["summary"]
+        if winner["link"] not in article_jobs:
+            article_jobs.update(self.articles.prefetch([winner["link"]]))
+        article = self.articles.collect(article_jobs, [winner["link"]]).get(winner["link"])
+
+        stats = {
+            "summary_chars": len(summary),
+            "article_chars": article["chars"] if article else 0,
+            "extract_seconds": round(article["seconds"], 2) if article else None,
+            "article_cached": article["cached"] if article else False,
+            "source": "summary",
+        }
+        if article and article["chars"] > len(summary):
+            stats["source"] = "article"
+            print(
+                f"   📰 Full Article: {len(summary)} -> {article['chars']} chars "
+                f"in {article['seconds']:.2f}s{' (cached)' if article['cached'] else ''}"
+            )
+            return article["text"], stats
+
+        print("   📰 Full article unavailable. Using RSS summary.")
+        return summary, stats
@@ -0,0 +1,232 @@
+import re
+import json
+
+TITLE_MAX_CHARS = 50
+MIN_SCENES = 3
+KEYWORDS_PER_SCENE = 2
+FALLBACK_KEYWORDS = ["Abstract Background", "News Studio"]
+
+# Words too generic to be a useful stock-photo search on their own
+STOPWORDS = {
+    "the", "a", "an", "and", "or", "but", "of", "to", "in", "on", "for", "with",
+    "this", "that", "these", "those", "is", "are", "was", "were", "be", "been",
+    "it", "its", "you", "your", "we", "our", "they", "their", "he", "she", "his",
+    "her", "at", "by", "from", "as", "just", "now", "more", "most", "what", "how",
+    "why", "who", "will", "can", "has", "have", "had", "not", "need", "see", "into",
+    "stop", "scrolling", "follow", "us", "daily", "stories", "discoveries", "here",
+    "something", "thing", "things", "about", "there", "which", "very", "really",
+    "every", "like", "than", "then", "when", "where", "could", "would",
+}
+
+
+def _strip_wrapping(text):
+    text = re.sub(r"```(?:json)?", "", text or "")
+    start = text.find("{")
+    if start == -1:
+        return ""
+    return text[start:]
+
+
+def _close_truncated(text):
+    """Closes an unterminated string/array/object left by a cut-off response."""
+    stack = []
+    in_string = False
+    escaped = False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]" and stack:
+            stack.pop()
+
+    if in_string:
+        text += '"'
+    # A dangling `,` or `"key":` can't be closed meaningfully, drop it
+    text = re.sub(r'(,\s*"[^"]*"\s*:?\s*|,\s*|:\s*)$', "", text.rstrip())
+    return text + "".join(reversed(stack))
+
+
+def parse_json(text):
+    """
+    Parses an LLM answer into a dict, fixing cheap defects locally.
+    Returns (data or None, list of applied fixes).
+    """
+    fixes = []
+    raw = text or ""
+    try:
+        return json.loads(raw), fixes
+    except ValueError:
+        pass
+
+    body = _strip_wrapping(raw)
+    if body != raw.strip():
+        fixes.append("stripped_chatter")
+
+    # Trailing commas: {"a": 1,} / [1, 2,]
+    cleaned = re.sub(r",\s*([}\]])", r"\1", body)
+    if cleaned != body:
+        fixes.append("trailing_commas")
+
+    end = cleaned.rfind("}")
+    candidates = [cleaned[: end + 1]] if end != -1 else []
+    candidates.append(cleaned)
+
+    for candidate in candidates:
+        try:
+            return json.loads(candidate), fixes
+        except ValueError:
+            continue
+
+    # Truncated output: close what is open, then back off one element at a
+    # time (the last scene is usually the half-written one)
+    attempt = cleaned
+    for _ in range(8):
+        try:
+            data = json.loads(_close_truncated(attempt))
+            fixes.append("closed_truncated")
+            # The scene that was being written when the output was cut off
+            # is incomplete even if it parses
+            scenes = data.get("scenes") if isinstance(data, dict) else None
+            if isinstance(scenes, list) and scenes:
+                last = scenes[-1]
+                if not isinstance(last, dict) or not {"text", "keywords", "image_count"} <= set(last):
+                    scenes.pop()
+                    fixes.append("dropped_partial_scene")
+            return data, fixes
+        except ValueError:
+            cut = attempt.rfind(",")
+            if cut <= 0:
+                break
+            attempt = attempt[:cut]
+
+    return None, fixes
+
+
+def _keywords_from_text(text, count=KEYWORDS_PER_SCENE):
+    words = re.findall(r"[A-Za-z][A-Za-z\-']+", text or "")
+    # Prefer capitalised names (e.g. "Hubble", "Mars"), then long words
+    proper = [w for i, w in enumerate(words) if w[0].isupper() and i > 0]
+    ranked = proper + sorted(words, key=len, reverse=True)
+    picked = []
+    for w in ranked:
+        if w.lower() in STOPWORDS or len(w) < 4:
+            continue
+        if w.lower() not in [p.lower() for p in picked]:
+            picked.append(w)
+        if len(picked) == count:
+            break
+    return picked
+
+
+def _shorten_title(title, limit=TITLE_MAX_CHARS):
+    if len(title) <= limit:
+        return title
+    cut = title[:limit].rsplit(" ", 1)[0].rstrip(" ,:;-")
+    return cut or title[:limit]
+
+
+def repair_script(data, niche="general"):
+    """
+    Fixes what can be fixed without the model. Returns (fixes, problems) where
+    problems are the fields that still need the LLM, e.g. "scenes[3].text".
+    """
+    fixes = []
+    problems = []
+
+    if not isinstance(data, dict):
+        return fixes, ["scenes"]
+
+    title = str(data.get("title") or "").strip()
+    if not title:
+        problems.append("title")
+    elif len(title) > TITLE_MAX_CHARS:
+        data["title"] = _shorten_title(title)
+        fixes.append("title_shortened")
+
+    for field in ("description", "hashtags", "tags"):
+        value = data.get(field)
+        if isinstance(value, list):
+            sep = " " if field == "hashtags" else ", "
+            data[field] = sep.join(str(v) for v in value)
+            fixes.append(f"{field}_joined")
+        elif not value:
+            if field == "description":
+                problems.append("description")
+            elif field == "hashtags":
+                data[field] = f"#Viral #Shorts #{niche.capitalize()}"
+                fixes.append("hashtags_default")
+            else:
+                data[field] = f"shorts, {niche}"
+                fixes.append("tags_default")
+
+    scenes = data.get("scenes")
+    if not isinstance(scenes, list) or len(scenes) < MIN_SCENES:
+        problems.append("scenes")
+        return fixes, problems
+
+    # Drop junk entries (a truncated array often ends with a stub)
+    kept = [s for s in scenes if isinstance(s, dict) and (s.get("text") or s.get("keywords"))]
+    if len(kept) != len(scenes):
+        data["scenes"] = scenes = kept
+        fixes.append("dropped_empty_scenes")
+        if len(scenes) < MIN_SCENES:
+            problems.append("scenes")
+            return fixes, problems
+
+    for i, scene in enumerate(scenes):
+        text = str(scene.get("text") or "").strip()
+        if not text:
+            problems.append(f"scenes[{i}].text")
+
+        keywords = scene.get("keywords")
+        if isinstance(keywords, str):
+            keywords = [k.strip() for k in keywords.split(",")]
+            fixes.append("keywords_split")
+        keywords = [str(k).strip() for k in (keywords or []) if str(k).strip()]
+        if len(keywords) < KEYWORDS_PER_SCENE:
+            extra = _keywords_from_text(text) + FALLBACK_KEYWORDS
+            for kw in extra:
+                if len(keywords) >= KEYWORDS_PER_SCENE:
+                    break
+                if kw not in keywords:
+                    keywords.append(kw)
+            fixes.append("keywords_filled")
+        scene["keywords"] = keywords
+
+        try:
+            count = int(scene.get("image_count", 1))
+        except (TypeError, ValueError):
+            count = 1
+            fixes.append("image_count_coerced")
+        if count not in (1, 2):
+            count = min(2, max(1, count))
+            fixes.append("image_count_clamped")
+        scene["image_count"] = count
+
+    return fixes, problems
+
+
+def apply_patch(data, patch):
+    """Merges a follow-up answer ({"title": .., "scenes": {"3": {"text": ..}}}) into data."""
+    if not isinstance(patch, dict):
+        return
+    for field in ("title", "description"):
+        if patch.get(field):
+            data[field] = patch[field]
+    scene_patch = patch.get("scenes")
+    if isinstance(scene_patch, dict):
+        for key, fields in scene_patch.items():
+            try:
+                index = int(key)
+            except ValueError:
+                continue
+            if 0 <= index < len(data.get("scenes", [])) and isinstance(fields, dict):
+                data["scenes"][index].update({k: v for k, v in fields.items() if v})
@@ -0,0 +1,369 @@
+import os
+import re
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from pymongo import UpdateOne, DeleteOne
+from core.db_manager import DBManager
+
+KEEP_FINAL_DAYS = float(os.getenv("STORAGE_KEEP_FINAL_DAYS", 7))
+KEEP_FAILED_DAYS = float(os.getenv("STORAGE_KEEP_FAILED_DAYS", 3))
+
+# Days after the task reached `status` before a kind of file may go.
+# A kind that isn't listed is kept.
+RETENTION_DAYS = {
+    "ready_to_upload": {"temp": 0},
+    "buffered": {"temp": 0},
+    "completed_packaged": {"temp": 0},
+    "uploading": {"temp": 0},
+    "uploaded": {
+        "temp": 0,
+        "voice": 0,
+        "image": 0,
+        "final": KEEP_FINAL_DAYS,
+        "other": KEEP_FINAL_DAYS,
+    },
+    "failed_qc": dict.fromkeys(("temp", "voice", "image", "final", "other"), KEEP_FAILED_DAYS),
+    "expired_buffer": dict.fromkeys(
+        ("temp", "voice", "image", "final", "other"), KEEP_FAILED_DAYS
+    ),
+}
+
+# Only files that are never rewritten in place once made (see visuals/voice)
+DEDUP_KINDS = ("image", "voice")
+
+
+def file_kind(name):
+    if name.endswith(".part") or ".part." in name or name == "FULL_AUDIO_TEMP.mp3":
+        return "temp"
+    if name.startswith("FINAL_VIDEO") or name.endswith("_METADATA.txt"):
+        return "final"
+    if re.match(r"voice_\d+", name):
+        return "voice"
+    if re.match(r"scene_\d+_img_", name):
+        return "image"
+    return "other"
+
+
+def sha256_of(path, chunk=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(chunk)
+            if not block:
+                return digest.hexdigest()
+            digest.update(block)
+
+
+def status_time(task):
+    """When the task reached its current status, as far as the document tells."""
+    if task.get("status") == "uploaded" and task.get("uploaded_at"):
+        try:
+            # Written by uploader.py as local time
+            local = datetime.strptime(task["uploaded_at"], "%Y-%m-%d %H:%M:%S")
+            return local.astimezone(timezone.utc)
+        except (TypeError, ValueError):
+            pass
+    when = task.get("expired_at") or task.get("created_at")
+    if when is None:
+        return None
+    return when.replace(tzinfo=timezone.utc) if when.tzinfo is None else when
+
+
+class StorageManager:
+    """
+    Keeps data/generated_videos_folder in check from an index in Mongo
+    (`storage_folders`, `storage_files`) instead of walking the tree:
+
+    - scan(): re-lists only task folders whose directory mtime or task status
+      changed since the last scan, and only hashes files that are new or changed;
+    - apply_retention(): deletes files per RETENTION_DAYS;
+    - dedup(): hard-links identical images/voice files by content hash;
+    - report(): space per day/slot/kind, straight from the index.
+    """
+
+    def __init__(self, db=None, dry_run=False):
+        self.db = db or DBManager()
+        self.base_dir = self.db.base_dir
+        self.dry_run = dry_run
+        self.folders = self.db.db["storage_folders"]
+        self.files = self.db.db["storage_files"]
+
+    def ensure_indexes(self):
+        self.files.create_index([("folder", 1)])
+        self.files.create_index([("size", 1), ("sha256", 1)])
+        self.files.create_index([("day", 1), ("slot", 1)])
+
+    def layout(self, folder):
+        """(day, slot) from base_dir/<dd-mm-YYYY>/<slot>/<title>."""
+        parts = os.path.relpath(folder, self.base_dir).split(os.sep)
+        return (parts[0], parts[1]) if len(parts) >= 3 else ("unknown", "unknown")
+
+    # ---------- index ----------
+
+    def scan(self, full=False):
+        """Brings the index up to date. Returns the number of folders re-listed."""
+        query = {"folder_path": {"$exists": True}, "storage_purged": {"$ne": True}}
+        known = {f["_id"]: f for f in self.folders.find()}
+        rescanned = 0
+
+        for task in self.db.collection.find(query, {"folder_path": 1, "status": 1}):
+            folder = task["folder_path"]
+            seen = known.get(folder)
+            try:
+                mtime = os.stat(folder).st_mtime_ns
+            except FileNotFoundError:
+                if seen:
+                    self._forget_folder(folder)
+                continue
+            if (
+                not full
+                and seen
+                and seen.get("mtime") == mtime
+                and seen.get("status") == task.get("status")
+            ):
+                continue
+            self._index_folder(folder, task, mtime)
+            rescanned += 1
+        return rescanned
+
+    def _index_folder(self, folder, task, mtime):
+        day, slot = self.layout(folder)
+        old = {f["_id"]: f for f in self.files.find({"folder": folder})}
+        ops = []
+        present = set()
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                st = entry.stat(follow_symlinks=False)
+                present.add(entry.path)
+                prev = old.get(entry.path)
+                unchanged = (
+                    prev
+                    and prev["size"] == st.st_size
+                    and prev["mtime"] == st.st_mtime_ns
+                    and prev["inode"] == st.st_ino
+                )
+                if unchanged and prev.get("nlink") == st.st_nlink:
+                    continue
+                kind = file_kind(entry.name)
+                doc = {
+                    "folder": folder,
+                    "task_id": task["_id"],
+                    "day": day,
+                    "slot": slot,
+                    "kind": kind,
+                    "size": st.st_size,
+                    "mtime": st.st_mtime_ns,
+                    "inode": st.st_ino,
+                    "device": st.st_dev,
+                    "nlink": st.st_nlink,
+                }
+                if kind in DEDUP_KINDS:
+                    doc["sha256"] = prev.get("sha256") if unchanged else sha256_of(entry.path)
+                ops.append(UpdateOne({"_id": entry.path}, {"$set": doc}, upsert=True))
+        ops += [DeleteOne({"_id": path}) for path in old if path not in present]
+        if ops:
+            self.files.bulk_write(ops, ordered=False)
+        self.folders.update_one(
+            {"_id": folder},
+            {"$set": {"task_id": task["_id"], "status": task.get("status"), "mtime": mtime}},
+            upsert=True,
+        )
+
+    def _forget_folder(self, folder):
+        self.files.delete_many({"folder": folder})
+        self.folders.delete_one({"_id": folder})
+
+    # ---------- retention ----------
+
+    def _remove(self, path):
+        if self.dry_run:
+            return
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        self.files.delete_one({"_id": path})
+
+    def _prune_dirs(self, folder):
+        """Removes the task folder and its empty slot/day parents. False if the folder stays."""
+        base = os.path.abspath(self.base_dir)
+        current = os.path.abspath(folder)
+        while current.startswith(base + os.sep):
+            try:
+                os.rmdir(current)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                # Not empty: something the index hasn't seen yet lives here
+                return current != os.path.abspath(folder)
+            current = os.path.dirname(current)
+        return True
+
+    def apply_retention(self, now=None):
+        """Deletes what the policy allows. Returns (files, bytes) freed."""
+        now = now or datetime.now(timezone.utc)
+        freed_files = freed_bytes = 0
+        statuses = list(RETENTION_DAYS)
+        tasks = self.db.collection.find(
+            {"status": {"$in": statuses}, "storage_purged": {"$ne": True}},
+            {"status": 1, "folder_path": 1, "uploaded_at": 1, "expired_at": 1, "created_at": 1},
+        )
+        for task in tasks:
+            folder = task.get("folder_path")
+            since = status_time(task)
+            if not folder or since is None:
+                continue
+            age_days = (now - since).total_seconds() / 86400
+            policy = RETENTION_DAYS[task["status"]]
+            files = list(self.files.find({"folder": folder}, {"kind": 1, "size": 1, "nlink": 1}))
+            doomed = [f for f in files if f["kind"] in policy and age_days >= policy[f["kind"]]]
+            for f in doomed:
+                self._remove(f["_id"])
+                freed_files += 1
+                # A hard-linked file only frees space with its last link
+                freed_bytes += f["size"] if f.get("nlink", 1) <= 1 else 0
+
+            if files and len(doomed) == len(files) and not self.dry_run:
+                if not self._prune_dirs(folder):
+                    continue
+                self._forget_folder(folder)
+                self.db.collection.update_one(
+                    {"_id": task["_id"]},
+                    {"$set": {"storage_purged": True, "storage_purged_at": now}},
+                )
+
+        verb = "Would free" if self.dry_run else "Freed"
+        print(f"🧹 Retention: {verb} {freed_files} file(s), {freed_bytes / 1024 / 1024:.1f}MB")
+        return freed_files, freed_bytes
+
+    # ---------- dedup ----------
+
+    def dedup(self):
+        """Hard-links identical files to one copy. Returns bytes saved."""
+        pipeline = [
+            {"$match": {"kind": {"$in": list(DEDUP_KINDS)}, "sha256": {"$exists": True}}},
+            {
+                "$group": {
+                    "_id": {"sha256": "$sha256", "size": "$size", "device": "$device"},
+                    "paths": {"$push": "$_id"},
+                    "inodes": {"$addToSet": "$inode"},
+                }
+            },
+            {"$match": {"inodes.1": {"$exists": True}}},
+        ]
+        saved = linked = 0
+        for group in self.files.aggregate(pipeline):
+            paths = sorted(group["paths"])
+            canonical = paths[0]
+            if not os.path.exists(canonical):
+                continue
+            keep = os.stat(canonical)
+            nlink = keep.st_nlink
+            for path in paths[1:]:
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if st.st_ino == keep.st_ino:
+                    continue
+                # The index can be stale; never link files that differ now
+                if st.st_size != keep.st_size or sha256_of(path) != group["_id"]["sha256"]:
+                    continue
+                if not self.dry_run:
+                    tmp = path + ".link"
+                    # Left behind by a crash between link and replace
+                    if os.path.lexists(tmp):
+                        os.remove(tmp)
+                    os.link(canonical, tmp)
+                    os.replace(tmp, path)
+                    self.files.update_one(
+                        {"_id": path},
+                        {"$set": {"inode": keep.st_ino, "mtime": keep.st_mtime_ns}},
+                    )
+                    nlink += 1
+                linked += 1
+                saved += st.st_size if st.st_nlink <= 1 else 0
+
+            if nlink != keep.st_nlink:
+                self.files.update_many(
+                    {"inode": keep.st_ino, "device": keep.st_dev}, {"$set": {"nlink": nlink}}
+                )
+        verb = "Would link" if self.dry_run else "Linked"
+        print(f"🔗 Dedup: {verb} {linked} duplicate(s), saving {saved / 1024 / 1024:.1f}MB")
+        return saved
+
+    # ---------- reporting ----------
+
+    def report(self):
+        """Space per day/slot and per kind, counting each hard-linked inode once."""
+        rows = {}
+        kinds = {}
+        seen_inodes = set()
+        for f in self.files.find({}, {"day": 1, "slot": 1, "kind": 1, "size": 1, "inode": 1, "device": 1}):
+            key = (f["day"], f["slot"])
+            row = rows.setdefault(key, {"files": 0, "bytes": 0, "disk_bytes": 0})
+            row["files"] += 1
+            row["bytes"] += f["size"]
+            inode = (f.get("device"), f.get("inode"))
+            if inode not in seen_inodes:
+                seen_inodes.add(inode)
+                row["disk_bytes"] += f["size"]
+                kinds[f["kind"]] = kinds.get(f["kind"], 0) + f["size"]
+
+        def sort_key(key):
+            day, slot = key
+            try:
+                return (datetime.strptime(day, "%d-%m-%Y"), slot)
+            except ValueError:
+                return (datetime.min, slot)
+
+        return {
+            "days": [
+                {"day": day, "slot": slot, **rows[(day, slot)]}
+                for day, slot in sorted(rows, key=sort_key)
+            ],
+            "kinds": kinds,
+            "total_bytes": sum(r["disk_bytes"] for r in rows.values()),
+        }
+
+
+def print_report(report):
+    mb = 1024 * 1024
+    print(f"\n💾 Storage by day/slot")
+    print(f"{'day':<11} {'slot':<9} {'files':>6} {'MB':>9} {'on disk':>9}")
+    for r in report["days"]:
+        print(
+            f"{r['day']:<11} {r['slot']:<9} {r['files']:>6} "
+            f"{r['bytes'] / mb:>9.1f} {r['disk_bytes'] / mb:>9.1f}"
+        )
+    print(f"{'total':<21} {'':>6} {'':>9} {report['total_bytes'] / mb:>9.1f}")
+    if report["kinds"]:
+        parts = [f"{k} {v / mb:.1f}MB" for k, v in sorted(report["kinds"].items())]
+        print(f"   By kind: {', '.join(parts)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retention, dedup and space report")
+    parser.add_argument(
+        "action", nargs="?", default="run", choices=["run", "scan", "retention", "dedup", "report"]
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only say what would change")
+    parser.add_argument("--full", action="store_true", help="Re-list every folder, not just changed ones")
+    args = parser.parse_args()
+
+    storage = StorageManager(dry_run=args.dry_run)
+    storage.ensure_indexes()
+    if args.action in ("run", "scan", "retention", "dedup"):
+        count = storage.scan(full=args.full)
+        print(f"🗂️ Index: {count} folder(s) re-listed")
+    if args.action in ("run", "retention"):
+        storage.apply_retention()
+    if args.action in ("run", "dedup"):
+        storage.dedup()
+    if args.action in ("run", "report"):
+        if args.action == "run" and not args.dry_run:
+            storage.scan()  # pick up what retention/dedup just changed
+        print_report(storage.report())
@@ -0,0 +1,431 @@
+import sys
+import time
+import json
+import uuid
+import argparse
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Histogram buckets (seconds) for stage wall time
+STAGE_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800)
+
+
+def cpu_seconds():
+    """CPU used by this process and its finished children (ffmpeg runs as one)."""
+    total = time.process_time()
+    if resource:
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        total += children.ru_utime + children.ru_stime
+    return total
+
+
+def peak_rss_mb():
+    """High-water mark of this process' resident memory, in MB."""
+    if resource:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    if psutil:
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    return None
+
+
+class Span:
+    def __init__(self, name, kind, parent):
+        self.name = name
+        self.kind = kind
+        self.parent = parent
+        self.wall_started = time.perf_counter()
+        self.cpu_started = cpu_seconds()
+        self.rss_started = peak_rss_mb()
+        self.calls = {}  # service -> {"calls", "bytes_in", "bytes_out"}
+        self.tasks = []
+        self.error = None
+
+    def add(self, service, calls, bytes_in, bytes_out):
+        entry = self.calls.setdefault(service, {"calls": 0, "bytes_in": 0, "bytes_out": 0})
+        entry["calls"] += calls
+        entry["bytes_in"] += bytes_in
+        entry["bytes_out"] += bytes_out
+
+
+class Tracer:
+    """
+    Per-run timing for the pipeline: stage spans (wall, CPU, peak RSS,
+    external calls and bytes) plus hot-spot spans that are aggregated by name,
+    since things like `task_exists` run dozens of times per stage.
+
+    Spans nest through a context variable. Work on pool threads (uploads,
+    article prefetch) has no parent span and is charged to the active stage.
+    """
+
+    def __init__(self):
+        self._current = contextvars.ContextVar("trace_span", default=None)
+        self._lock = threading.Lock()
+        self.start_run()
+
+    def start_run(self, **attrs):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.attrs = attrs
+        self.started_at = datetime.now(timezone.utc)
+        self.wall_started = time.perf_counter()
+        self.cpu_started = cpu_seconds()
+        self.stages = []
+        self.ops = {}
+        self.active_stage = None
+
+    # ---------- spans ----------
+
+    def _owner(self):
+        return self._current.get() or self.active_stage
+
+    @contextmanager
+    def _span(self, name, kind):
+        span = Span(name, kind, self._current.get())
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"[:200]
+            raise
+        finally:
+            self._current.reset(token)
+            self._close(span)
+
+    def _close(self, span):
+        wall = time.perf_counter() - span.wall_started
+        cpu = cpu_seconds() - span.cpu_started
+        with self._lock:
+            if span.kind == "stage":
+                rss = peak_rss_mb()
+                self.stages.append(
+                    {
+                        "stage": span.name,
+                        "wall": round(wall, 3),
+                        "cpu": round(cpu, 3),
+                        "peak_rss_mb": round(rss, 1) if rss is not None else None,
+                        "rss_growth_mb": (
+                            round(rss - span.rss_started, 1) if rss is not None else None
+                        ),
+                        "calls": span.calls,
+                        "task_ids": span.tasks,
+                        "error": span.error,
+                    }
+                )
+                return
+
+            stage = self.active_stage.name if self.active_stage else "-"
+            op = self.ops.setdefault(
+                (stage, span.name),
+                {"stage": stage, "op": span.name, "count": 0, "wall": 0.0,
+                 "max_wall": 0.0, "cpu": 0.0, "errors": 0, "calls": 0},
+            )
+            op["count"] += 1
+            op["wall"] += wall
+            op["max_wall"] = max(op["max_wall"], wall)
+            op["cpu"] += cpu
+            op["errors"] += 1 if span.error else 0
+            op["calls"] += sum(c["calls"] for c in span.calls.values())
+
+            # External calls made inside the op still belong to the stage
+            parent = span.parent or self.active_stage
+            if parent is not None:
+                for service, c in span.calls.items():
+                    parent.add(service, c["calls"], c["bytes_in"], c["bytes_out"])
+
+    @contextmanager
+    def stage(self, name):
+        with self._span(name, "stage") as span:
+            previous, self.active_stage = self.active_stage, span
+            try:
+                yield span
+            finally:
+                self.active_stage = previous
+
+    def span(self, name):
+        return self._span(name, "op")
+
+    def traced(self, name=None):
+        """Decorator form of `span`."""
+
+        def decorate(func):
+            label = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self._span(label, "op"):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorate
+
+    # ---------- annotations ----------
+
+    def count(self, service, calls=1, bytes_in=0, bytes_out=0):
+        """Records an external call (HTTP, Groq, TTS) against the current span."""
+        owner = self._owner()
+        if owner is None:
+            return
+        with self._lock:
+            owner.add(service, calls, bytes_in, bytes_out)
+
+    def tag_task(self, task_id):
+        """Links the active stage to the task it worked on."""
+        stage = self.active_stage
+        if stage is not None and task_id not in stage.tasks:
+            stage.tasks.append(task_id)
+
+    # ---------- results ----------
+
+    def finish(self, status="succeeded"):
+        """The run as one document (see TraceStore.save)."""
+        task_ids = []
+        for stage in self.stages:
+            task_ids += [t for t in stage["task_ids"] if t not in task_ids]
+        rss = peak_rss_mb()
+        return {
+            "run_id": self.run_id,
+            **self.attrs,
+            "status": status,
+            "started_at": self.started_at,
+            "finished_at": datetime.now(timezone.utc),
+            "wall": round(time.perf_counter() - self.wall_started, 3),
+            "cpu": round(cpu_seconds() - self.cpu_started, 3),
+            "peak_rss_mb": round(rss, 1) if rss is not None else None,
+            "task_ids": task_ids,
+            "stages": self.stages,
+            "ops": [
+                {**op, "wall": round(op["wall"], 4), "max_wall": round(op["max_wall"], 4),
+                 "cpu": round(op["cpu"], 4)}
+                for op in self.ops.values()
+            ],
+        }
+
+
+tracer = Tracer()
+traced = tracer.traced
+
+_http_hooked = False
+
+
+def install_http_hooks():
+    """Counts every `requests` call (and its bytes) against the current span."""
+    global _http_hooked
+    if _http_hooked:
+        return
+    import requests
+
+    original_send = requests.Session.send
+
+    @functools.wraps(original_send)
+    def send(self, request, **kwargs):
+        body = request.body or b""
+        try:
+            response = original_send(self, request, **kwargs)
+        except Exception:
+            tracer.count(urlsplit(request.url).hostname or "?", bytes_out=len(body))
+            raise
+        if kwargs.get("stream"):
+            size = int(response.headers.get("Content-Length") or 0)
+        else:
+            size = len(response.content or b"")
+        tracer.count(urlsplit(request.url).hostname or "?", bytes_in=size, bytes_out=len(body))
+        return response
+
+    requests.Session.send = send
+    _http_hooked = True
+
+
+class TraceStore:
+    """
+    Run documents in `pipeline_traces` plus cumulative Prometheus-style series
+    in `pipeline_metrics` (one document per metric + label set).
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.traces = db.db["pipeline_traces"]
+        self.metrics = db.db["pipeline_metrics"]
+
+    def save(self, run):
+        from pymongo import UpdateOne
+
+        self.traces.insert_one(run)
+
+        series = {}
+
+        def inc(metric, labels, value):
+            key = metric + json.dumps(labels, sort_keys=True)
+            entry = series.setdefault(key, {"metric": metric, "labels": labels, "value": 0})
+            entry["value"] += value
+
+        inc("pipeline_runs_total", {"status": run["status"]}, 1)
+        for stage in run["stages"]:
+            labels = {"stage": stage["stage"]}
+            for le in STAGE_BUCKETS:
+                if stage["wall"] <= le:
+                    inc("pipeline_stage_seconds_bucket", {**labels, "le": str(le)}, 1)
+            inc("pipeline_stage_seconds_bucket", {**labels, "le": "+Inf"}, 1)
+            inc("pipeline_stage_seconds_sum", labels, stage["wall"])
+            inc("pipeline_stage_seconds_count", labels, 1)
+            inc("pipeline_stage_cpu_seconds_total", labels, stage["cpu"])
+            if stage["error"]:
+                inc("pipeline_stage_failures_total", labels, 1)
+            for service, c in stage["calls"].items():
+                svc = {"service": service}
+                inc("pipeline_external_calls_total", svc, c["calls"])
+                inc("pipeline_external_bytes_in_total", svc, c["bytes_in"])
+                inc("pipeline_external_bytes_out_total", svc, c["bytes_out"])
+        for op in run["ops"]:
+            labels = {"op": op["op"]}
+            inc("pipeline_op_seconds_total", labels, op["wall"])
+            inc("pipeline_op_calls_total", labels, op["count"])
+
+        self.metrics.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": key},
+                    {
+                        "$inc": {"value": s["value"]},
+                        "$setOnInsert": {"metric": s["metric"], "labels": s["labels"]},
+                    },
+                    upsert=True,
+                )
+                for key, s in series.items()
+            ]
+        )
+
+    def recent(self, runs=20, slot=None):
+        query = {"slot": slot} if slot else {}
+        return list(self.traces.find(query, {"_id": 0}).sort("started_at", -1).limit(runs))
+
+    def prometheus_text(self):
+        """The text exposition format served at /metrics."""
+        kinds = {
+            "pipeline_stage_seconds": "histogram",
+            "pipeline_last_run_seconds": "gauge",
+            "pipeline_last_run_peak_rss_bytes": "gauge",
+            "pipeline_last_run_timestamp_seconds": "gauge",
+        }
+        rows = {}
+        for s in self.metrics.find({}, {"_id": 0}):
+            family = s["metric"]
+            for suffix in ("_bucket", "_sum", "_count"):
+                if family.startswith("pipeline_stage_seconds") and family.endswith(suffix):
+                    family = family[: -len(suffix)]
+            rows.setdefault(family, []).append((s["metric"], s["labels"], s["value"]))
+
+        last = self.traces.find_one(sort=[("started_at", -1)])
+        if last:
+            rows["pipeline_last_run_seconds"] = [("pipeline_last_run_seconds", {}, last["wall"])]
+            rows["pipeline_last_run_timestamp_seconds"] = [
+                ("pipeline_last_run_timestamp_seconds", {},
+                 last["finished_at"].replace(tzinfo=timezone.utc).timestamp())
+            ]
+            if last.get("peak_rss_mb") is not None:
+                rows["pipeline_last_run_peak_rss_bytes"] = [
+                    ("pipeline_last_run_peak_rss_bytes", {}, last["peak_rss_mb"] * 1024 * 1024)
+                ]
+
+        lines = []
+        for family in sorted(rows):
+            kind = kinds.get(family, "counter")
+            lines.append(f"# TYPE {family} {kind}")
+            for metric, labels, value in sorted(rows[family], key=_series_order):
+                label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                name = f"{metric}{{{label_text}}}" if label_text else metric
+                lines.append(f"{name} {round(value, 6) if isinstance(value, float) else value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _series_order(row):
+    metric, labels, _ = row
+    le = labels.get("le")
+    bucket = float("inf") if le == "+Inf" else float(le) if le else 0
+    return (metric, sorted((k, v) for k, v in labels.items() if k != "le"), bucket)
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] if values else 0.0
+
+
+def print_report(runs, top_ops=10):
+    """Slowest stages (by median wall time) and hot spots over the given runs."""
+    if not runs:
+        print("📭 No traced runs yet.")
+        return
+
+    by_stage = {}
+    for run in runs:
+        for stage in run["stages"]:
+            by_stage.setdefault(stage["stage"], []).append(stage)
+
+    print(f"\n📊 Slowest stages over the last {len(runs)} run(s)")
+    print(f"{'stage':<10} {'runs':>4} {'p50 s':>8} {'max s':>8} {'cpu s':>8} "
+          f"{'rss+ MB':>8} {'calls':>6} {'MB in':>8}")
+    rows = []
+    for name, stages in by_stage.items():
+        walls = [s["wall"] for s in stages]
+        calls = sum(c["calls"] for s in stages for c in s["calls"].values())
+        mb_in = sum(c["bytes_in"] for s in stages for c in s["calls"].values()) / 1e6
+        growth = max((s.get("rss_growth_mb") or 0) for s in stages)
+        cpu = sum(s["cpu"] for s in stages) / len(stages)
+        rows.append((_percentile(walls, 0.5), name, len(stages), max(walls), cpu, growth,
+                     calls / len(stages), mb_in / len(stages)))
+    for p50, name, n, worst, cpu, growth, calls, mb_in in sorted(rows, reverse=True):
+        print(f"{name:<10} {n:>4} {p50:>8.1f} {worst:>8.1f} {cpu:>8.1f} "
+              f"{growth:>8.1f} {calls:>6.0f} {mb_in:>8.2f}")
+
+    ops = {}
+    for run in runs:
+        for op in run["ops"]:
+            agg = ops.setdefault(op["op"], {"count": 0, "wall": 0.0, "max_wall": 0.0})
+            agg["count"] += op["count"]
+            agg["wall"] += op["wall"]
+            agg["max_wall"] = max(agg["max_wall"], op["max_wall"])
+    if ops:
+        print(f"\n🔥 Hot spots (total time per run)")
+        print(f"{'op':<18} {'calls/run':>9} {'s/run':>8} {'max s':>8}")
+        ranked = sorted(ops.items(), key=lambda kv: kv[1]["wall"], reverse=True)[:top_ops]
+        for name, agg in ranked:
+            print(f"{name:<18} {agg['count'] / len(runs):>9.1f} "
+                  f"{agg['wall'] / len(runs):>8.2f} {agg['max_wall']:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline trace reports")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_report = sub.add_parser("report", help="Slowest stages over the last N runs")
+    p_report.add_argument("--runs", type=int, default=20)
+    p_report.add_argument("--slot", help="Only runs for this slot")
+    sub.add_parser("metrics", help="Print the Prometheus exposition text")
+    args = parser.parse_args()
+
+    from core.db_manager import DBManager
+
+    store = TraceStore(DBManager())
+    if args.command == "report":
+        print_report(store.recent(args.runs, args.slot))
+    else:
+        print(store.prometheus_text(), end="")
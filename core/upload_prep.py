@@ -1,6 +1,7 @@
 import os
 import datetime
 from core.db_manager import DBManager
+from core.tracing import tracer
 
 
 class UploadManager:
@@ -15,12 +16,13 @@ class UploadManager:
         with open(self.log_file, "a", encoding="utf-8") as f:
             f.write(entry)
 
-    def prepare_package(self):
-        task = self.db.collection.find_one({"status": "ready_to_upload"})
+    def prepare_package(self, task_id=None):
+        task = self.db.next_task("ready_to_upload", task_id)
         if not task:
             print("📭 No videos ready for upload prep.")
             return
 
+        tracer.tag_task(task["_id"])
         print(f"📦 Packaging Video: {task['title']}")
         video_path = task.get("final_video_path")
 
@@ -28,6 +30,7 @@ class UploadManager:
             self.log_status(task["title"], "ERROR", "Video file missing")
             return
 
+        self.db.load_payload(task, ("ai_description", "ai_hashtags", "ai_tags"))
         folder = os.path.dirname(video_path)
         filename = os.path.basename(video_path).replace(".mp4", "_METADATA.txt")
         meta_path = os.path.join(folder, filename)
@@ -0,0 +1,282 @@
+import os
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from google.auth.exceptions import GoogleAuthError
+from core.db_manager import DBManager
+
+try:
+    from zoneinfo import ZoneInfo
+
+    QUOTA_TZ = ZoneInfo("America/Los_Angeles")  # YouTube resets quota at PT midnight
+except Exception:
+    QUOTA_TZ = timezone.utc
+
+# YouTube Data API v3 cost of one videos.insert call
+UPLOAD_QUOTA_COST = 1600
+# Failed uploads of a task before it leaves the queue as `failed_upload`
+# (400 bad metadata or 403 would otherwise be retried on every drain)
+UPLOAD_MAX_ATTEMPTS = int(os.getenv("UPLOAD_MAX_ATTEMPTS", 3))
+
+
+class QuotaTracker:
+    """Counts YouTube Data API units spent per (Pacific) day in MongoDB."""
+
+    def __init__(self, db, daily_limit=10000):
+        self.db = db
+        self.daily_limit = daily_limit
+        self.collection = db.db["api_quota"]
+
+    def today(self):
+        return datetime.now(QUOTA_TZ).strftime("%Y-%m-%d")
+
+    def used_today(self):
+        doc = self.collection.find_one({"_id": self.today()})
+        return doc.get("units", 0) if doc else 0
+
+    def remaining(self):
+        return max(0, self.daily_limit - self.used_today())
+
+    def reserve(self, units):
+        """Atomically books `units` if they still fit in today's budget."""
+        day = self.today()
+        self.collection.update_one(
+            {"_id": day}, {"$setOnInsert": {"units": 0}}, upsert=True
+        )
+        booked = self.collection.find_one_and_update(
+            {"_id": day, "units": {"$lte": self.daily_limit - units}},
+            {"$inc": {"units": units}},
+        )
+        return booked is not None
+
+    def release(self, units):
+        self.collection.update_one({"_id": self.today()}, {"$inc": {"units": -units}})
+
+
+class UploadWorker:
+    """
+    Drains every `completed_packaged` task instead of one per slot.
+    Uploads run in parallel up to `concurrency`, each one books its quota
+    units first, and publish times can be spread `spacing_minutes` apart.
+    """
+
+    def __init__(self, concurrency=None, daily_quota=None, spacing_minutes=None, db=None):
+        self.db = db or DBManager()
+        self.concurrency = concurrency or int(os.getenv("UPLOAD_CONCURRENCY", 2))
+        self.quota = QuotaTracker(
+            self.db, daily_quota or int(os.getenv("YOUTUBE_DAILY_QUOTA", 10000))
+        )
+        if spacing_minutes is None:
+            spacing_minutes = int(os.getenv("UPLOAD_PUBLISH_SPACING_MIN", 0))
+        self.spacing = timedelta(minutes=spacing_minutes)
+        self.metrics_collection = self.db.db["upload_metrics"]
+        self.schedule_collection = self.db.db["upload_schedule"]
+        self.claim_timeout = timedelta(hours=2)
+        self._lock = threading.Lock()
+        self._uploader = None
+
+    @property
+    def uploader(self):
+        # Only pay for OAuth + API client setup once there is work to do
+        if self._uploader is None:
+            from core.uploader import YouTubeUploader
+
+            self._uploader = YouTubeUploader()
+        return self._uploader
+
+    def queue_depth(self):
+        return self.db.collection.count_documents({"status": "completed_packaged"})
+
+    def recover_stale_claims(self):
+        # A crashed worker leaves tasks in "uploading"; its resumable session is
+        # still on the task, so handing it back to the queue resumes the upload
+        cutoff = datetime.now(timezone.utc) - self.claim_timeout
+        res = self.db.collection.update_many(
+            {"status": "uploading", "upload_claimed_at": {"$lt": cutoff}},
+            {"$set": {"status": "completed_packaged"}},
+        )
+        if res.modified_count:
+            print(f"   ♻️ Re-queued {res.modified_count} stale upload(s).")
+
+    def claim_next(self, task_id=None):
+        query = {"status": "completed_packaged"}
+        if task_id is not None:
+            query["_id"] = task_id
+        return self.db.collection.find_one_and_update(
+            query,
+            {
+                "$set": {
+                    "status": "uploading",
+                    "upload_claimed_at": datetime.now(timezone.utc),
+                }
+            },
+            sort=[("created_at", 1)],
+        )
+
+    def next_publish_time(self):
+        """Reserves the next publish slot, at least `spacing` after the last one."""
+        if not self.spacing:
+            return None
+        with self._lock:
+            now = datetime.now(timezone.utc)
+            state = self.schedule_collection.find_one({"_id": "publish"}) or {}
+            last = state.get("last_publish_at")
+            if last and last.tzinfo is None:
+                last = last.replace(tzinfo=timezone.utc)
+            publish_at = max(now + timedelta(minutes=15), last + self.spacing if last else now)
+            self.schedule_collection.update_one(
+                {"_id": "publish"}, {"$set": {"last_publish_at": publish_at}}, upsert=True
+            )
+            return publish_at
+
+    def _upload_one(self, task, depth):
+        video_path = task.get("final_video_path") or ""
+        size = os.path.getsize(video_path) if os.path.exists(video_path) else 0
+        # Only the part that is still missing goes over the wire on a resume
+        session = task.get("upload_session") or {}
+        already = session.get("offset", 0)
+
+        started = time.monotonic()
+        video_id = self.uploader.upload_task(task, publish_at=self.next_publish_time())
+        elapsed = time.monotonic() - started
+
+        if not video_id:
+            attempts = task.get("upload_attempts", 0) + 1
+            give_up = attempts >= UPLOAD_MAX_ATTEMPTS
+            self.db.collection.update_one(
+                {"_id": task["_id"], "status": "uploading"},
+                {
+                    "$set": {
+                        "status": "failed_upload" if give_up else "completed_packaged",
+                        "upload_attempts": attempts,
+                    }
+                },
+            )
+            if give_up:
+                print(
+                    f"   🛑 {task['title']}: {attempts} failed upload(s), taken off the queue "
+                    f"(python -m core.upload_queue --retry-failed)."
+                )
+            # YouTube only charges the insert once a session is opened
+            fresh = self.db.collection.find_one({"_id": task["_id"]}, {"upload_session": 1})
+            if not session and not (fresh or {}).get("upload_session"):
+                self.quota.release(UPLOAD_QUOTA_COST)
+            return None
+
+        sent = max(0, size - already)
+        self.metrics_collection.insert_one(
+            {
+                "task_id": task["_id"],
+                "youtube_id": video_id,
+                "bytes": sent,
+                "seconds": round(elapsed, 2),
+                "bytes_per_sec": round(sent / elapsed, 1) if elapsed else None,
+                "quota_units": 0 if session else UPLOAD_QUOTA_COST,
+                "queue_depth": depth,
+                "finished_at": datetime.now(timezone.utc),
+            }
+        )
+        return {"bytes": sent, "seconds": elapsed}
+
+    def drain(self, max_uploads=None, task_id=None):
+        """Uploads packaged videos until the queue or the quota runs out (or just `task_id`)."""
+        self.recover_stale_claims()
+        depth = self.queue_depth()
+        print(
+            f"📤 Upload Queue: {depth} waiting | quota used today: "
+            f"{self.quota.used_today()}/{self.quota.daily_limit}"
+        )
+        if not depth:
+            print("📭 No packaged videos found to upload.")
+            return []
+
+        try:
+            self.uploader.creds
+        except GoogleAuthError as e:
+            # Nothing can upload without a token; don't burn the tasks' attempts on it
+            print(f"   ❌ OAuth credentials unavailable ({e}). Queue left as is.")
+            return []
+
+        results = []
+        started = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = []
+            while max_uploads is None or len(futures) < max_uploads:
+                task = self.claim_next(task_id)
+                if not task:
+                    break
+                # Resuming an already-opened session costs no new insert
+                if not task.get("upload_session") and not self.quota.reserve(
+                    UPLOAD_QUOTA_COST
+                ):
+                    self.db.collection.update_one(
+                        {"_id": task["_id"]}, {"$set": {"status": "completed_packaged"}}
+                    )
+                    print("   ⛽ Daily quota reached. Remaining tasks wait for reset.")
+                    break
+                futures.append(pool.submit(self._upload_one, task, depth))
+                depth -= 1
+
+            for future in futures:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"   ❌ Upload worker crashed: {e}")
+                    result = None
+                if result:
+                    results.append(result)
+
+        total_bytes = sum(r["bytes"] for r in results)
+        elapsed = time.monotonic() - started
+        rate = total_bytes / elapsed / (1024 * 1024) if elapsed else 0
+        print(
+            f"✅ Upload Queue Drained: {len(results)} uploaded, "
+            f"{total_bytes / (1024 * 1024):.1f}MB at {rate:.2f}MB/s, "
+            f"{self.queue_depth()} left"
+        )
+        return results
+
+    def retry_failed(self, task_id=None):
+        """Puts `failed_upload` tasks (or just `task_id`) back on the queue with a fresh attempt count."""
+        query = {"status": "failed_upload"}
+        if task_id is not None:
+            query["_id"] = task_id
+        res = self.db.collection.update_many(
+            query,
+            {"$set": {"status": "completed_packaged"}, "$unset": {"upload_attempts": ""}},
+        )
+        return res.modified_count
+
+    def metrics(self):
+        last = list(self.metrics_collection.find().sort("finished_at", -1).limit(20))
+        rates = [m["bytes_per_sec"] for m in last if m.get("bytes_per_sec")]
+        return {
+            "queue_depth": self.queue_depth(),
+            "uploading": self.db.collection.count_documents({"status": "uploading"}),
+            "failed": self.db.collection.count_documents({"status": "failed_upload"}),
+            "quota_used_today": self.quota.used_today(),
+            "quota_limit": self.quota.daily_limit,
+            "avg_bytes_per_sec": sum(rates) / len(rates) if rates else 0,
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drain the YouTube upload queue")
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--max", type=int, default=None, help="Max uploads this run")
+    parser.add_argument("--spacing", type=int, default=None, help="Minutes between publish times")
+    parser.add_argument("--metrics", action="store_true", help="Print queue metrics and exit")
+    parser.add_argument("--retry-failed", action="store_true", help="Re-queue failed_upload tasks and exit")
+    args = parser.parse_args()
+
+    worker = UploadWorker(concurrency=args.concurrency, spacing_minutes=args.spacing)
+    if args.retry_failed:
+        print(f"♻️ Re-queued {worker.retry_failed()} failed upload(s).")
+    elif args.metrics:
+        for key, value in worker.metrics().items():
+            print(f"{key}: {value}")
+    else:
+        worker.drain(max_uploads=args.max)
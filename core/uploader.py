@@ -1,22 +1,35 @@
 import os
 import pickle
 import time
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+import datetime
+import threading
+from google.auth.exceptions import GoogleAuthError
+from google.auth.transport.requests import Request, AuthorizedSession
 from core.db_manager import DBManager
+from core.resumable import ResumableUpload, UploadError
+from core.jobs import get_reporter
+from core.tracing import tracer
+
+UPLOAD_URL = os.getenv(
+    "YOUTUBE_UPLOAD_URL",
+    "https://www.googleapis.com/upload/youtube/v3/videos?uploadType=resumable&part=snippet,status",
+)
+
+# Refresh the access token this long before it expires
+REFRESH_MARGIN = datetime.timedelta(minutes=5)
 
 
 class YouTubeUploader:
     def __init__(self):
         self.db = DBManager()
         self.SCOPES = ["https://www.googleapis.com/auth/youtube.upload"]
-        self.api_service_name = "youtube"
-        self.api_version = "v3"
         self.client_secrets_file = "client_secrets.json"
         self.token_file = "token.pickle"
-        self.youtube = self.get_authenticated_service()
+
+        # 🟢 LAZY: OAuth is only set up once a task needs it
+        self._creds = None
+        self._creds_lock = threading.Lock()
+        self._refresher = None
 
         # 🟢 NEW: Map your 'niche' to YouTube Category IDs
         # Reference: https://gist.github.com/dgp/1b24bf2961521bd75d6c
@@ -29,7 +42,7 @@ class YouTubeUploader:
             "general": "24",  # Entertainment (Fallback)
         }
 
-    def get_authenticated_service(self):
+    def get_credentials(self):
         creds = None
         if os.path.exists(self.token_file):
             with open(self.token_file, "rb") as token:
@@ -39,15 +52,52 @@ class YouTubeUploader:
             if creds and creds.expired and creds.refresh_token:
                 creds.refresh(Request())
             else:
+                from google_auth_oauthlib.flow import InstalledAppFlow
+
                 flow = InstalledAppFlow.from_client_secrets_file(
                     self.client_secrets_file, self.SCOPES
                 )
                 creds = flow.run_local_server(port=0)
 
-            with open(self.token_file, "wb") as token:
-                pickle.dump(creds, token)
+            self.save_credentials(creds)
 
-        return build(self.api_service_name, self.api_version, credentials=creds)
+        return creds
+
+    def save_credentials(self, creds):
+        with open(self.token_file, "wb") as token:
+            pickle.dump(creds, token)
+
+    @property
+    def creds(self):
+        with self._creds_lock:
+            if self._creds is None:
+                self._creds = self.get_credentials()
+                self._start_refresher()
+            return self._creds
+
+    def _start_refresher(self):
+        if self._refresher or not getattr(self._creds, "refresh_token", None):
+            return
+        self._refresher = threading.Thread(target=self._refresh_loop, daemon=True)
+        self._refresher.start()
+
+    def _refresh_loop(self):
+        # Keeps the access token fresh in the background so a long upload
+        # never stalls on a synchronous refresh between chunks
+        while True:
+            expiry = self._creds.expiry
+            if expiry is None:
+                return
+            wait = (expiry - REFRESH_MARGIN - datetime.datetime.utcnow()).total_seconds()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                with self._creds_lock:
+                    self._creds.refresh(Request())
+                    self.save_credentials(self._creds)
+            except Exception as e:
+                print(f"      ⚠️ Background token refresh failed ({e}). Retrying in 60s...")
+                time.sleep(60)
 
     def upload_video(self):
         # Fetch the most recent packaged task
@@ -58,14 +108,20 @@ class YouTubeUploader:
             print("📭 No packaged videos found to upload.")
             return
 
+        return self.upload_task(task)
+
+    def upload_task(self, task, publish_at=None):
+        """Uploads one packaged task. Returns the YouTube video id or None."""
         print(f"🚀 Starting Upload for: {task['title']}")
+        tracer.tag_task(task["_id"])
 
         video_path = task.get("final_video_path")
-        if not os.path.exists(video_path):
+        if not video_path or not os.path.exists(video_path):
             print("❌ Error: Video file not found on disk.")
-            return
+            return None
 
         # 🟢 DYNAMIC CATEGORY LOGIC
+        self.db.load_payload(task, ("ai_description",))
         niche = task.get("niche", "general").lower()
         category_id = self.CATEGORY_MAP.get(niche, "22")
 
@@ -85,31 +141,58 @@ class YouTubeUploader:
             "status": {"privacyStatus": "private", "selfDeclaredMadeForKids": False},
         }
 
-        # 🟢 THE FIX: Use 4MB Chunks (Robust against connection drops)
-        CHUNK_SIZE = 4 * 1024 * 1024
-        media = MediaFileUpload(video_path, chunksize=CHUNK_SIZE, resumable=True)
+        # 🟢 SCHEDULED PUBLISH: YouTube flips the private video public at this time
+        if publish_at:
+            request_body["status"]["publishAt"] = publish_at.strftime(
+                "%Y-%m-%dT%H:%M:%S.000Z"
+            )
 
-        request = self.youtube.videos().insert(
-            part="snippet,status", body=request_body, media_body=media
+        # 🟢 RESUMABLE SESSION: URI + confirmed offset live on the task, so a
+        # restarted process continues from the last committed chunk
+        saved = task.get("upload_session")
+        if saved and saved.get("file_path") != video_path:
+            saved = None
+
+        def save_state(state):
+            self.db.collection.update_one(
+                {"_id": task["_id"]}, {"$set": {"upload_session": state}}
+            )
+
+        try:
+            creds = self.creds
+        except GoogleAuthError as e:
+            # Leave the task queued: the next run retries with whatever token is on disk
+            print(f"      ❌ Upload skipped: OAuth credentials unavailable ({e}).")
+            return None
+
+        upload = ResumableUpload(
+            AuthorizedSession(creds),
+            video_path,
+            request_body,
+            UPLOAD_URL,
+            state=saved,
+            save_state=save_state,
         )
 
-        print("   ⏳ Uploading...")
-        response = None
-        retries = 0
+        if upload.session_uri:
+            print(f"   ⏯️ Resuming upload at {int(upload.progress() * 100)}%...")
+        else:
+            print("   ⏳ Uploading...")
 
-        while response is None:
-            try:
-                status, response = request.next_chunk()
-                if status:
-                    print(f"      Uploaded {int(status.progress() * 100)}%")
-            except Exception as e:
-                # 🟢 RETRY LOGIC for Connection Resets
-                print(f"      ⚠️ Connection interrupted ({e}). Retrying in 5s...")
-                retries += 1
-                time.sleep(5)
-                if retries > 10:
-                    print("      ❌ Too many failures. Aborting.")
-                    return
+        reporter = get_reporter()
+
+        def on_progress(progress, sent, total):
+            reporter.update(progress * 100, stage="upload", key=task["_id"])
+            print(
+                f"      Uploaded {int(progress * 100)}% "
+                f"(chunk {upload.chunk_size // (1024 * 1024)}MB)"
+            )
+
+        try:
+            response = upload.upload(on_progress=on_progress)
+        except UploadError as e:
+            print(f"      ❌ Upload aborted: {e}. Session kept for the next run.")
+            return None
 
         if response and "id" in response:
             video_id = response["id"]
@@ -122,11 +205,15 @@ class YouTubeUploader:
                         "status": "uploaded",
                         "youtube_id": video_id,
                         "uploaded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
-                    }
+                        "publish_at": publish_at,
+                    },
+                    "$unset": {"upload_session": ""},
                 },
             )
-        else:
-            print(f"   ❌ Upload failed: {response}")
+            return video_id
+
+        print(f"   ❌ Upload failed: {response}")
+        return None
 
 
 if __name__ == "__main__":
@@ -70,16 +70,37 @@ class VideoVerifier:
             return
 
         print(f"🧐 Verifying Quality: {os.path.basename(video_path)}...")
+        is_clean, error_reason = self.check(video_path)
 
+        if is_clean:
+            print("   ✅ QC PASSED: Video is clean.")
+            self.db.collection.update_one(
+                {"_id": task["_id"]}, {"$set": {"status": "ready_to_upload"}}
+            )
+        else:
+            print("   ⛔ QC FAILED: Moving to 'review' pile.")
+            self.db.collection.update_one(
+                {"_id": task["_id"]},
+                {"$set": {"status": "failed_qc", "qc_reason": error_reason}},
+            )
+            # Optional: Rename file to mark it as bad
+            bad_path = video_path.replace(".mp4", "_FAILED.mp4")
+            os.rename(video_path, bad_path)
+
+    def check(self, video_path):
+        """Scans one frame per second. Returns (is_clean, reason)."""
         cap = cv2.VideoCapture(video_path)
         fps = cap.get(cv2.CAP_PROP_FPS)
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if not fps or not total_frames:
+            cap.release()
+            return False, "Unreadable video"
 
         is_clean = True
         error_reason = ""
 
         # Scan 1 frame every second (Checking every single frame is too slow)
-        step = int(fps)
+        step = max(1, int(fps))
 
         for i in range(0, total_frames, step):
             cap.set(cv2.CAP_PROP_POS_FRAMES, i)
@@ -95,21 +116,7 @@ class VideoVerifier:
                 break
 
         cap.release()
-
-        if is_clean:
-            print("   ✅ QC PASSED: Video is clean.")
-            self.db.collection.update_one(
-                {"_id": task["_id"]}, {"$set": {"status": "ready_to_upload"}}
-            )
-        else:
-            print("   ⛔ QC FAILED: Moving to 'review' pile.")
-            self.db.collection.update_one(
-                {"_id": task["_id"]},
-                {"$set": {"status": "failed_qc", "qc_reason": error_reason}},
-            )
-            # Optional: Rename file to mark it as bad
-            bad_path = video_path.replace(".mp4", "_FAILED.mp4")
-            os.rename(video_path, bad_path)
+        return is_clean, error_reason
 
 
 if __name__ == "__main__":
@@ -1,12 +1,12 @@
 import os
 import time
-import requests
-import random
-import re
+import hashlib
+import threading
 # import ollama <--- REMOVED (Not used here)
 from core.db_manager import DBManager
+from core.image_providers import HedgedImageFetch, ProviderBreakers, PROVIDER_RESIZE, fit_image
+from core.tracing import tracer, traced
 from dotenv import load_dotenv
-from PIL import Image
 import io
 
 load_dotenv()
@@ -15,10 +15,14 @@ load_dotenv()
 class VisualScout:
     def __init__(self):
         self.db = DBManager()
-        self.unsplash_key = os.getenv("UNSPLASH_ACCESS_KEY")
-        self.pexels_key = os.getenv("PEXELS_API_KEY")
+        # Google/Unsplash/Pexels raced per image; failing providers are skipped (circuit breakers)
+        self.breakers = ProviderBreakers(self.db)
+        self.fetcher = HedgedImageFetch(breakers=self.breakers, validate=self.is_valid_image)
+        self.fit_on_arrival = PROVIDER_RESIZE
 
     def is_valid_image(self, content):
+        from PIL import Image
+
         try:
             img = Image.open(io.BytesIO(content))
             img.verify()
@@ -26,138 +30,170 @@ class VisualScout:
         except:
             return False
 
+    def is_valid_file(self, path):
+        if not os.path.exists(path):
+            return False
+        with open(path, "rb") as f:
+            return self.is_valid_image(f.read())
+
+    def save_image(self, path, content):
+        # Replace, never rewrite in place: identical images may be hard links (core/storage.py)
+        with open(path + ".part", "wb") as f:
+            f.write(content)
+        os.replace(path + ".part", path)
+
+    @traced("find_image")
+    def find_image(self, attempts, path):
+        """Races (provider, query) attempts and saves the first valid image to `path`."""
+        content, provider, query = self.fetcher.fetch(attempts)
+        if not content:
+            return False
+        if self.fit_on_arrival:
+            # Google originals (and any provider that ignored the size) are cut down before they hit disk
+            content = fit_image(content)
+        self.save_image(path, content)
+        print(f"      ✅ {provider} image for '{query}'.")
+        return True
+
+    @traced("use_stock_search")
     def use_stock_search(self, query, path):
-        # 1. Unsplash
-        if self.unsplash_key:
-            try:
-                url = f"https://api.unsplash.com/search/photos?query={query}&per_page=3&client_id={self.unsplash_key}"
-                res = requests.get(url, timeout=5)
-                if res.status_code == 200 and res.json()["results"]:
-                    img_url = random.choice(res.json()["results"])["urls"]["regular"]
-                    content = requests.get(img_url).content
-                    if self.is_valid_image(content):
-                        with open(path, "wb") as f:
-                            f.write(content)
-                        return True
-            except:
-                pass
-
-        # 2. Pexels
-        if self.pexels_key:
-            try:
-                url = f"https://api.pexels.com/v1/search?query={query}&per_page=3"
-                res = requests.get(
-                    url, headers={"Authorization": self.pexels_key}, timeout=5
-                )
-                if res.status_code == 200 and res.json()["photos"]:
-                    img_url = random.choice(res.json()["photos"])["src"]["large2x"]
-                    content = requests.get(img_url).content
-                    if self.is_valid_image(content):
-                        with open(path, "wb") as f:
-                            f.write(content)
-                        return True
-            except:
-                pass
-        return False
+        return self.find_image([("unsplash", query), ("pexels", query)], path)
 
     # 🟢 NEW: Google Image Scraper for specific Main Topics
     def search_google_images(self, query, path):
         print(f"      🌍 Web Search: hunting for '{query}'...")
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/103.0.0.0 Safari/537.36"
-        }
+        return self.find_image([("google", query)], path)
+
+    def image_attempts(self, keywords, kw, hero=False):
+        """Everything worth trying for one image, most wanted first."""
+        # 🟢 The HERO IMAGE (Scene 0, Image 0) starts with a web search for the main topic
+        attempts = [("google", kw)] if hero else []
+        attempts += [("unsplash", kw), ("pexels", kw)]
+        # 🟢 FALLBACK: the scene's other keywords
+        for fallback_kw in keywords:
+            if fallback_kw != kw:
+                attempts += [("unsplash", fallback_kw), ("pexels", fallback_kw)]
+        return attempts
+
+    def image_path(self, folder, i, j, keywords):
+        # Same keywords -> same file names, so a resumed run reuses what it already has
+        digest = hashlib.sha1("|".join(keywords).encode("utf-8")).hexdigest()[:8]
+        return os.path.join(folder, f"scene_{i}_img_{j}_{digest}.jpg")
+
+    def scene_images(self, i, scene, folder, count, label=""):
+        """
+        Finds `count` images for scene `i`, reusing valid files already on
+        disk. Returns (paths, fetched): `fetched` is how many were downloaded.
+        """
+        keywords = scene.get("keywords", ["nature"])
+        image_paths, fetched = [], 0
+
+        for j in range(count):
+            kw = keywords[j % len(keywords)]
+            path = self.image_path(folder, i, j, keywords)
+            filename = os.path.basename(path)
+
+            if self.is_valid_file(path):
+                print(f"   ⏭️{label} Scene {i+1} (Img {j+1}/{count}): reusing {filename}")
+                image_paths.append(path)
+                continue
+
+            print(f"   🖼️{label} Scene {i+1} (Img {j+1}/{count}): Search '{kw}'")
+            fetched += 1
+
+            attempts = self.image_attempts(keywords, kw, hero=(i == 0 and j == 0))
+            success = self.find_image(attempts, path)
+
+            # Final Fallback: Placeholder
+            if not success:
+                print(f"      ❌ All searches failed. Using placeholder.")
+                from PIL import Image
+
+                Image.new("RGB", (1080, 1920), (10, 10, 10)).save(path + ".part", "JPEG")
+                os.replace(path + ".part", path)
+
+            image_paths.append(path)
+
+        return image_paths, fetched
+
+    def drop_extra_images(self, i, scene, folder, count):
+        """Deletes images of scene `i` past `count` (prefetched for a longer estimate). Returns how many."""
+        keywords = scene.get("keywords", ["nature"])
+        dropped = 0
+        j = count
+        while os.path.exists(self.image_path(folder, i, j, keywords)):
+            os.remove(self.image_path(folder, i, j, keywords))
+            dropped += 1
+            j += 1
+        return dropped
+
+    # ---------- overlap with the voice stage ----------
+
+    def prefetch(self, task_id=None):
+        """
+        Starts fetching the next scripted task's images in the background
+        while the voice stage speaks it. Image counts come from estimated
+        scene durations (voice.estimate_duration); download_visuals reuses
+        the files and reconciles with the real durations. Returns
+        (task id, thread), or (None, None) when there is no scripted task.
+        """
+        task = self.db.next_task("scripted", task_id)
+        if not task:
+            return None, None
+        self.db.load_payload(task, ("script_data",))
+        thread = threading.Thread(target=self._prefetch, args=(task,), name="visuals-prefetch", daemon=True)
+        thread.start()
+        return task["_id"], thread
 
+    def _prefetch(self, task):
+        from core.voice import estimate_duration, images_for
+
+        scenes = task.get("script_data", [])
+        print(f"🎬 Visual Scout: prefetching {len(scenes)} scenes from estimated durations...")
         try:
-            # 1. Search Google Images
-            url = f"https://www.google.com/search?q={query}&tbm=isch&udm=2"  # udm=2 forces new image layout
-            res = requests.get(url, headers=headers, timeout=10)
-
-            # 2. Extract first valid image URL using Regex (looks for http...jpg/png inside script tags)
-            # This pattern finds the large original images in Google's data blobs
-            matches = re.findall(r'"(https?://[^"]+?\.(?:jpg|jpeg|png))"', res.text)
-
-            if matches:
-                # Try the first 3 matches (sometimes the first is a logo or icon)
-                for img_url in matches[:3]:
-                    try:
-                        # Decrypt unicode (e.g. \u003d -> =)
-                        img_url = img_url.encode().decode("unicode_escape")
-
-                        # Download
-                        img_data = requests.get(
-                            img_url, headers=headers, timeout=5
-                        ).content
-                        if self.is_valid_image(img_data):
-                            with open(path, "wb") as f:
-                                f.write(img_data)
-                            print("      ✅ Web Image Secured.")
-                            return True
-                    except:
-                        continue
+            for i, scene in enumerate(scenes):
+                count = images_for(estimate_duration(scene["text"]))
+                _, fetched = self.scene_images(i, scene, task["folder_path"], count, label=" (prefetch)")
+                if fetched:
+                    time.sleep(1)
         except Exception as e:
-            print(f"      ❌ Web Search Failed: {e}")
+            # download_visuals fetches whatever is missing
+            print(f"   ⚠️ Prefetch stopped: {e}")
 
-        return False
-
-    def download_visuals(self):
-        task = self.db.collection.find_one({"status": "voiced"})
+    def download_visuals(self, task_id=None):
+        task = self.db.next_task("voiced", task_id)
         if not task:
             return
 
+        tracer.tag_task(task["_id"])
+        # Breaker state may have changed in another process since we started
+        self.breakers.load()
+        self.db.load_payload(task, ("script_data",))
         scenes = task.get("script_data", [])
         folder = task["folder_path"]
         print(f"🎬 Visual Scout: Processing {len(scenes)} scenes...")
 
         updated_scenes = []
+        fetched_total = dropped_total = 0
 
         for i, scene in enumerate(scenes):
-            keywords = scene.get("keywords", ["nature"])
+            # The script position, which prefetch used: scenes whose TTS failed are gone
+            i = scene.get("index", i)
             count = scene.get("image_count", 1)
-
-            image_paths = []
-
-            for j in range(count):
-                kw = keywords[j % len(keywords)]
-                filename = f"scene_{i}_img_{j}.jpg"
-                path = os.path.join(folder, filename)
-
-                print(f"   🖼️ Scene {i+1} (Img {j+1}/{count}): Search '{kw}'")
-
-                success = False
-
-                # 🟢 LOGIC UPDATE: Force Web Search for the HERO IMAGE (Scene 0, Image 0)
-                # This ensures the "Main Topic" (e.g. Moflin) is shown first.
-                if i == 0 and j == 0:
-                    success = self.search_google_images(kw, path)
-
-                # If Web search wasn't used or failed, try Stock sites
-                if not success:
-                    success = self.use_stock_search(kw, path)
-
-                # 🟢 FALLBACK: If specific keyword fails, try others in the list
-                if not success:
-                    for fallback_kw in keywords:
-                        if fallback_kw != kw:
-                            print(
-                                f"      ⚠️ '{kw}' failed. Retrying with '{fallback_kw}'..."
-                            )
-                            if self.use_stock_search(fallback_kw, path):
-                                success = True
-                                break
-
-                # Final Fallback: Placeholder
-                if not success:
-                    print(f"      ❌ All searches failed. Using placeholder.")
-                    Image.new("RGB", (1080, 1920), (10, 10, 10)).save(path)
-
-                image_paths.append(path)
+            image_paths, fetched = self.scene_images(i, scene, folder, count)
+            dropped = self.drop_extra_images(i, scene, folder, count)
+            fetched_total += fetched
+            dropped_total += dropped
 
             scene["image_paths"] = image_paths
             updated_scenes.append(scene)
-            time.sleep(1)
+            # Only pace the providers when this scene actually asked them for something
+            if fetched:
+                time.sleep(1)
 
-        self.db.collection.update_one(
-            {"_id": task["_id"]},
-            {"$set": {"script_data": updated_scenes, "status": "ready_to_assemble"}},
+        self.db.update_task(
+            task["_id"], {"script_data": updated_scenes, "status": "ready_to_assemble"}
         )
-        print("✅ Visuals Secured.")
+        if dropped_total:
+            print(f"   🗑️ Dropped {dropped_total} image(s) fetched for longer estimated scenes")
+        print(f"✅ Visuals Secured ({fetched_total} downloaded now).")
@@ -1,19 +1,53 @@
-import edge_tts
 import os
+import re
 import math
+import hashlib
 from mutagen.mp3 import MP3
 from core.db_manager import DBManager
+from core.tracing import tracer
+
+VOICE = "en-US-GuyNeural"
+RATE = "+10%"
+# Max seconds one image stays on screen
+SECONDS_PER_IMAGE = 4.0
+# Speaking rate of VOICE at RATE (~160 wpm), for estimating a scene before it is spoken
+WORDS_PER_SECOND = float(os.getenv("VOICE_WORDS_PER_SECOND", 2.7))
+# Pause after , ; : and after . ! ?
+COMMA_PAUSE, SENTENCE_PAUSE = 0.15, 0.35
+
+
+def estimate_duration(text):
+    """Seconds the voice should take to read `text` (words at WORDS_PER_SECOND plus pauses)."""
+    words = len(text.split())
+    commas = sum(text.count(c) for c in ",;:")
+    sentences = len(re.findall(r"[.!?]+(?:\s|$)", text))
+    return words / WORDS_PER_SECOND + commas * COMMA_PAUSE + sentences * SENTENCE_PAUSE
+
+
+def images_for(duration):
+    """Images a scene of `duration` seconds needs: never more than SECONDS_PER_IMAGE each."""
+    return max(1, int(math.ceil(duration / SECONDS_PER_IMAGE)))
+
+
+def voice_filename(i, text):
+    # Named after what was spoken, so a resumed run can reuse it but a new script can't
+    digest = hashlib.sha1(f"{VOICE}|{RATE}|{text}".encode("utf-8")).hexdigest()[:10]
+    return f"voice_{i}_{digest}.mp3"
 
 
 class VoiceEngine:
     def __init__(self):
         self.db = DBManager()
 
-    async def generate_audio(self):
-        task = self.db.collection.find_one({"status": "scripted"})
+    async def generate_audio(self, task_id=None):
+        task = self.db.next_task("scripted", task_id)
         if not task:
             return
 
+        import edge_tts  # aiohttp & co., only needed when there is text to speak
+
+        tracer.tag_task(task["_id"])
+        self.db.load_payload(task, ("script_data",))
         folder = task.get("folder_path")
         scenes = task.get("script_data", [])
 
@@ -21,18 +55,27 @@ class VoiceEngine:
 
         updated_scenes = []
         for i, scene in enumerate(scenes):
-            filename = f"voice_{i}.mp3"
-            path = os.path.join(folder, filename)
             text = scene["text"]
+            path = os.path.join(folder, voice_filename(i, text))
 
             try:
-                # 🟢 SPEED BOOST: +10% (Kept your speed preference)
-                communicate = edge_tts.Communicate(text, "en-US-GuyNeural", rate="+10%")
-                await communicate.save(path)
+                if os.path.exists(path):
+                    print(f"   ⏭️ Seg {i+1}: reusing {os.path.basename(path)}")
+                else:
+                    # 🟢 SPEED BOOST: +10% (Kept your speed preference)
+                    communicate = edge_tts.Communicate(text, VOICE, rate=RATE)
+                    # Written under a temp name so a crash never leaves a file that looks done
+                    await communicate.save(path + ".part")
+                    os.replace(path + ".part", path)
+                    tracer.count(
+                        "edge-tts", bytes_in=os.path.getsize(path), bytes_out=len(text)
+                    )
 
                 duration = MP3(path).info.length
 
-                # Update scene data
+                # Update scene data. A failed scene is dropped below, so keep the
+                # script position: image files (prefetched too) are named after it
+                scene["index"] = i
                 scene["audio_path"] = path
                 scene["duration"] = duration
 
@@ -40,8 +83,7 @@ class VoiceEngine:
                 # Rule: Max 4.0 seconds per image.
                 # logic: ceil(duration / 4.0) ensures we never exceed 4s per image
                 # but splits the time equally.
-                required_images = math.ceil(duration / 4.0)
-                scene["image_count"] = max(1, int(required_images))
+                scene["image_count"] = images_for(duration)
 
                 img_duration = duration / scene["image_count"]
 
@@ -53,8 +95,5 @@ class VoiceEngine:
             except Exception as e:
                 print(f"   ❌ Failed scene {i}: {e}")
 
-        self.db.collection.update_one(
-            {"_id": task["_id"]},
-            {"$set": {"script_data": updated_scenes, "status": "voiced"}},
-        )
+        self.db.update_task(task["_id"], {"script_data": updated_scenes, "status": "voiced"})
         print("✅ Audio Generation Complete.")
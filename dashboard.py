@@ -1,20 +1,71 @@
+import json
 import streamlit as st
 import requests
 import pandas as pd
 
+API_URL = "http://127.0.0.1:8000"
+SLOTS = ["morning", "noon", "evening", "night"]
+STATUS_ICONS = {"pending": "⏳", "running": "🔄", "done": "✅", "failed": "❌"}
+
 st.set_page_config(page_title="AI Video Factory", layout="wide")
 
 st.title("🎬 AI Video Automation Dashboard")
 
+
+@st.cache_data(ttl=300)
+def load_tasks():
+    # Only the columns we show, one page of the newest tasks. Cached: a
+    # finished job clears it instead of every rerun hitting the API.
+    return requests.get(
+        f"{API_URL}/tasks",
+        params={"fields": "title,status,source", "limit": 200},
+    ).json()
+
+
+def job_events(job_id, after=0):
+    """Reads the job's server-sent event stream; yields (event, data) pairs."""
+    with requests.get(
+        f"{API_URL}/jobs/{job_id}/events",
+        params={"after": after},
+        stream=True,
+        timeout=(5, 60),
+    ) as res:
+        res.raise_for_status()
+        kind, data = "message", []
+        for line in res.iter_lines(decode_unicode=True):
+            if line is None:
+                continue
+            if not line:
+                if data:
+                    yield kind, json.loads("\n".join(data))
+                kind, data = "message", []
+            elif line.startswith("event:"):
+                kind = line[6:].strip()
+            elif line.startswith("data:"):
+                data.append(line[5:].strip())
+
+
+def stage_label(name, info):
+    icon = STATUS_ICONS.get(info.get("status"), "⏳")
+    return f"{icon} {name} — {info.get('percent', 0)}%"
+
+
+slot = st.selectbox("Time slot", SLOTS, index=SLOTS.index("noon"))
 if st.button("🚀 Start New Video Generation"):
-    res = requests.post("http://127.0.0.1:8000/run-pipeline")
-    st.success("Pipeline triggered! Refresh in a minute to see progress.")
+    res = requests.post(f"{API_URL}/run-pipeline", params={"slot": slot})
+    if res.ok:
+        st.session_state["job_id"] = res.json()["job_id"]
+    else:
+        st.error(f"Could not start the pipeline: {res.text}")
+
+# Filled in below, after the task table is drawn
+progress_area = st.container()
 
 st.divider()
 
 # Display Task Status
 st.subheader("Current Tasks in Pipeline")
-tasks = requests.get("http://127.0.0.1:8000/tasks").json()
+tasks = load_tasks()
 
 if tasks:
     df = pd.DataFrame(tasks)
@@ -22,3 +73,60 @@ if tasks:
     st.table(df[["title", "status", "source"]])
 else:
     st.write("No tasks found.")
+
+# Uploads that ran out of attempts wait here instead of retrying every drain
+failed_uploads = requests.get(f"{API_URL}/uploads").json().get("failed", 0)
+if failed_uploads:
+    st.warning(f"❌ {failed_uploads} video(s) failed to upload after every attempt (status `failed_upload`).")
+    if st.button("♻️ Retry failed uploads"):
+        res = requests.post(f"{API_URL}/uploads/retry-failed")
+        if res.ok:
+            st.success(f"Re-queued {res.json()['requeued']} upload(s).")
+            load_tasks.clear()
+        else:
+            st.error(f"Could not re-queue: {res.text}")
+
+# 🟢 LIVE PROGRESS: subscribe to the job's event stream instead of polling
+job_id = st.session_state.get("job_id")
+if job_id:
+    job = requests.get(f"{API_URL}/jobs/{job_id}").json()
+    with progress_area:
+        st.subheader(f"Pipeline Job ({job['slot']})")
+        headline = st.empty()
+        bars = {
+            name: st.progress(info.get("percent", 0), text=stage_label(name, info))
+            for name, info in job["stages"].items()
+        }
+    stages = job["stages"]
+    headline.info(f"Status: {job['status']}")
+
+    if job["status"] not in ("succeeded", "failed"):
+        try:
+            for kind, event in job_events(job_id, after=job.get("seq", 0)):
+                stage = event.get("stage")
+                if kind == "stage":
+                    stages[stage]["status"] = event["status"]
+                    if event["status"] == "done":
+                        stages[stage]["percent"] = 100
+                    headline.info(f"Status: running ({stage})")
+                elif kind == "progress":
+                    stages[stage]["percent"] = event["percent"]
+                elif kind == "job":
+                    job["status"] = event["status"]
+                    break
+                if stage in bars:
+                    bars[stage].progress(
+                        stages[stage]["percent"], text=stage_label(stage, stages[stage])
+                    )
+        except requests.RequestException as e:
+            headline.warning(f"Lost the progress stream ({e}). Rerun to reconnect.")
+        else:
+            if job["status"] in ("succeeded", "failed"):
+                # Redraw with the new/updated tasks and the job's final state
+                load_tasks.clear()
+                st.rerun()
+
+    if job["status"] == "succeeded":
+        headline.success("Pipeline finished.")
+    elif job["status"] == "failed":
+        headline.error(f"Pipeline failed: {job.get('error') or 'see the API logs'}")
@@ -1,92 +1,247 @@
 import sys
 import asyncio
 import argparse
-import json
 import os
 import glob  # <--- WAS MISSING
 import datetime
-from core.scraper import NewsScraper
-from core.brain import ScriptGenerator
-from core.voice import VoiceEngine
-from core.visuals import VisualScout
-from core.assembler import VideoAssembler
-from core.upload_prep import UploadManager
-from core.uploader import YouTubeUploader
+from contextlib import contextmanager
+from bson import ObjectId
+from bson.errors import InvalidId
 from core.db_manager import DBManager
+from core.production_log import ProductionLog
+from core.jobs import STAGES, get_reporter
+from core.tracing import tracer, install_http_hooks, TraceStore
 
+# Where a task picks up again, by its current status
+RESUME_STAGE = {
+    "pending": "script",
+    "scripting": "script",  # claimed by a batch run: picked up once the claim goes stale
+    "scripted": "voice",
+    "voiced": "visuals",
+    "ready_to_assemble": "assemble",
+    "rendering": "assemble",  # a farm job: the stage collects it when it is done
+    "ready_to_upload": "package",
+    "buffered": "package",  # released from the buffer first, like at slot time
+    "completed_packaged": "upload",
+    "uploading": "upload",
+    "uploaded": "log",
+}
+# Statuses no stage picks up again, and why
+DEAD_END = {
+    "failed_qc": "it failed QC (see its qc_reason) and is not uploaded",
+    "expired_buffer": "it expired in the buffer (stale news) and is not published",
+}
+# OVERLAP_VISUALS=0: fetch images only after the voice stage, from the real durations
+OVERLAP_VISUALS = os.getenv("OVERLAP_VISUALS", "1") != "0"
 
-def run_creation_pipeline(slot_name):
+
+@contextmanager
+def pipeline_stage(name):
+    # Stage events for the dashboard (when started by the API) + timing trace
+    get_reporter().begin(name)
+    with tracer.stage(name):
+        yield
+
+
+def select_stages(first="scrape", last="log"):
+    """The stages from `first` to `last`, inclusive, in pipeline order."""
+    start, end = STAGES.index(first), STAGES.index(last)
+    if start > end:
+        raise ValueError(f"--from {first} comes after --to {last}")
+    return STAGES[start : end + 1]
+
+
+def run_creation_pipeline(slot_name, first="scrape", last="log", task_id=None):
+    """Runs the stages `first`..`last` for a slot (or one task). Returns the run's trace document."""
+    stages = select_stages(first, last)
+    if task_id is not None and "scrape" in stages:
+        stages.remove("scrape")  # scraping makes new tasks; it has nothing to redo for one
+
+    install_http_hooks()
+    tracer.start_run(
+        slot=slot_name,
+        job_id=get_reporter().job_id,
+        stages=stages,
+        task_id=str(task_id) if task_id else None,
+    )
+    status = "failed"
+    try:
+        _run_stages(slot_name, stages, task_id)
+        status = "succeeded"
+    finally:
+        run = tracer.finish(status)
+        try:
+            TraceStore(DBManager()).save(run)
+            print(f"⏱️ Trace {run['run_id']}: {run['wall']:.1f}s wall, {run['cpu']:.1f}s CPU")
+        except Exception as e:
+            print(f"⚠️ Trace not saved: {e}")
+    return run
+
+
+def fill_buffer(slots):
+    """Makes finished, QC'd videos ahead of time until each slot's buffer is full."""
+    from core.buffer import ProductionBuffer
+    from core.scraper import NewsScraper
+
+    buffer = ProductionBuffer()
+    buffer.expire_stale()
+    for slot in slots:
+        # A failed QC or a broken render gets one more try, not an endless loop
+        attempts = 0
+        while buffer.depth_of(slot) < buffer.depth and attempts <= buffer.depth:
+            attempts += 1
+            print(f"\n🧊 BUFFER {slot.upper()}: {buffer.depth_of(slot)}/{buffer.depth} ready")
+            # The 7-day duplicate check sees buffered tasks, so slots never double up
+            task_id = NewsScraper().scrape_targeted_niche(forced_slot=slot)
+            if not task_id:
+                break
+            run_creation_pipeline(slot, "script", "assemble", task_id)
+            buffer.hold(task_id, slot)
+
+
+def publish_from_buffer(slot_name):
+    """Slot time: upload a buffered video, or fall back to a full run if there is none."""
+    from core.buffer import ProductionBuffer, last_slot_time
+
+    buffer = ProductionBuffer()
+    slot_time = last_slot_time(slot_name)
+    task_id = buffer.release(slot_name)
+    mode = "buffer" if task_id else "live"
+    run = None
+    if not task_id:
+        print(f"📭 No buffered video for {slot_name}. Producing it now.")
+    try:
+        if task_id:
+            run = run_creation_pipeline(slot_name, "package", "log", task_id)
+        else:
+            run = run_creation_pipeline(slot_name)
+    finally:
+        task_ids = [task_id] if task_id else []
+        if run and not task_id:
+            task_ids = next((s["task_ids"] for s in run["stages"] if s["stage"] == "upload"), [])
+        buffer.record_publish(slot_name, slot_time, mode, task_ids)
+    return run
+
+
+def _run_stages(slot_name, stages=STAGES, task_id=None):
     print(f"\n🎬 STARTING PRODUCTION PIPELINE: {slot_name.upper()}")
+    if stages != STAGES:
+        print(f"   Stages: {' → '.join(stages)}" + (f" | task {task_id}" if task_id else ""))
+
+    # Each stage imports its module on entry: whisper/torch, moviepy, groq,
+    # edge-tts and googleapiclient only load for the stages that use them.
+    # With a task id every stage works on that task only.
 
     # 1. SCRAPER
-    print("---------------------------------------")
-    scraper = NewsScraper()
-    scraper.scrape_targeted_niche(forced_slot=slot_name)
+    if "scrape" in stages:
+        print("---------------------------------------")
+        with pipeline_stage("scrape"):
+            from core.scraper import NewsScraper
+
+            scraper = NewsScraper()
+            scraper.scrape_targeted_niche(forced_slot=slot_name)
 
     # 2. BRAIN (Scripting with Groq)
-    print("---------------------------------------")
-    brain = ScriptGenerator()
-    brain.generate_script()
+    if "script" in stages:
+        print("---------------------------------------")
+        with pipeline_stage("script"):
+            from core.brain import ScriptGenerator
 
-    # 3. VOICE (Async)
-    print("---------------------------------------")
-    voice = VoiceEngine()
-    asyncio.run(voice.generate_audio())
+            brain = ScriptGenerator()
+            brain.generate_script(task_id)
 
-    # 4. VISUALS
-    print("---------------------------------------")
-    visuals = VisualScout()
-    visuals.download_visuals()
+    # 3. VOICE (Async), with the images fetched alongside when visuals run next
+    prefetch = None
+    if "voice" in stages:
+        print("---------------------------------------")
+        with pipeline_stage("voice"):
+            from core.voice import VoiceEngine
+
+            voice_task = task_id
+            if OVERLAP_VISUALS and "visuals" in stages:
+                from core.visuals import VisualScout
+
+                visuals = VisualScout()
+                # Both are network-bound: image counts come from estimated durations
+                voice_task, prefetch = visuals.prefetch(task_id)
+
+            voice = VoiceEngine()
+            asyncio.run(voice.generate_audio(voice_task or task_id))
+
+    # 4. VISUALS (reconciles the prefetched images with the real durations)
+    if "visuals" in stages:
+        print("---------------------------------------")
+        with pipeline_stage("visuals"):
+            if prefetch is not None:
+                prefetch.join()
+            else:
+                from core.visuals import VisualScout
+
+                visuals = VisualScout()
+            visuals.download_visuals(task_id)
 
     # 5. ASSEMBLER
-    print("---------------------------------------")
-    assembler = VideoAssembler()
-    assembler.assemble()
+    if "assemble" in stages:
+        print("---------------------------------------")
+        with pipeline_stage("assemble"):
+            from core.render_farm import farm_enabled
+
+            if farm_enabled():
+                # RENDER_FARM=1: queue the render for the farm's nodes and wait for it
+                from core.render_farm import RenderQueue
+
+                RenderQueue().assemble(task_id)
+            else:
+                from core.assembler import VideoAssembler
+
+                assembler = VideoAssembler()
+                assembler.assemble(task_id)
 
     # 6. UPLOAD PREP & UPLOAD
-    print("---------------------------------------")
-    prep = UploadManager()
-    prep.prepare_package()
+    if "package" in stages:
+        print("---------------------------------------")
+        with pipeline_stage("package"):
+            from core.upload_prep import UploadManager
 
-    # 7. UPLOAD TO YOUTUBE
-    print("---------------------------------------")
-    uploader = YouTubeUploader()
-    uploader.upload_video()
+            prep = UploadManager()
+            prep.prepare_package(task_id)
+
+    # 7. UPLOAD TO YOUTUBE (drains any backlog too, within the daily quota)
+    if "upload" in stages:
+        print("---------------------------------------")
+        with pipeline_stage("upload"):
+            from core.upload_queue import UploadWorker
+
+            uploader = UploadWorker()
+            uploader.drain(task_id=task_id)
 
     # 8. JSON LOGGING
-    print("---------------------------------------")
-    print("📝 Logging details to JSON...")
+    if "log" in stages:
+        print("---------------------------------------")
+        with pipeline_stage("log"):
+            print("📝 Logging details to production log...")
 
-    db = DBManager()
-    latest_task = db.collection.find_one(
-        {"status": "uploaded"}, sort=[("uploaded_at", -1)]
-    )
+            db = DBManager()
+            query = {"status": "uploaded"}
+            if task_id is not None:
+                query["_id"] = task_id
+            latest_task = db.collection.find_one(query, sort=[("uploaded_at", -1)])
 
-    if latest_task:
-        log_entry = {
-            "video_name": latest_task.get("title"),
-            "youtube_id": latest_task.get("youtube_id"),
-            "time_slot": slot_name,
-            "generated_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        }
-
-        log_file = "production_log.json"
-        if os.path.exists(log_file):
-            try:
-                with open(log_file, "r", encoding="utf-8") as f:
-                    logs = json.load(f)
-            except:
-                logs = []
-        else:
-            logs = []
+            if latest_task:
+                log_entry = {
+                    "video_name": latest_task.get("title"),
+                    "youtube_id": latest_task.get("youtube_id"),
+                    "time_slot": slot_name,
+                    "generated_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                }
 
-        logs.append(log_entry)
-        with open(log_file, "w", encoding="utf-8") as f:
-            json.dump(logs, f, indent=4)
+                # Append-only JSON Lines: one atomic line per run, no rewrite
+                production_log = ProductionLog()
+                production_log.append(log_entry)
 
-        print(f"✅ Log saved to: {log_file}")
-    else:
-        print("⚠️ Log skipped (No upload confirmed).")
+                print(f"✅ Log saved to: {production_log.path}")
+            else:
+                print("⚠️ Log skipped (No upload confirmed).")
 
     # 🟢 MOVED OUTSIDE 'if' STATEMENT so it always runs
     print("---------------------------------------")
@@ -100,12 +255,87 @@ def run_creation_pipeline(slot_name):
         except:
             pass
 
+    get_reporter().finish()
     print(f"\n✅ PIPELINE COMPLETE for {slot_name}.")
 
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
-    parser.add_argument("slot", help="The time slot", default="noon")
+    parser = argparse.ArgumentParser(
+        description="Run the pipeline for a slot, or part of it / one task",
+        epilog="Examples: main.py noon | main.py --from voice --to assemble | "
+        "main.py --task 65f0c0ffee... (resumes from its status)",
+    )
+    parser.add_argument("slot", nargs="?", help="The time slot (default: noon, or the task's)")
+    parser.add_argument("--from", dest="first", choices=STAGES, help="First stage to run")
+    parser.add_argument("--to", dest="last", choices=STAGES, default="log", help="Last stage to run")
+    parser.add_argument("--task", help="Only work on this task id")
+    parser.add_argument(
+        "--fill-buffer", action="store_true", help="Pre-produce videos for the slot (or all slots)"
+    )
+    parser.add_argument(
+        "--from-buffer", action="store_true", help="Slot time: upload the slot's buffered video"
+    )
     args = parser.parse_args()
 
-    run_creation_pipeline(args.slot)
+    if args.fill_buffer or args.from_buffer:
+        from core.buffer import SLOT_TIMES
+
+        if args.slot and args.slot not in SLOT_TIMES:
+            parser.error(f"unknown slot: {args.slot}")
+        try:
+            if args.fill_buffer:
+                fill_buffer([args.slot] if args.slot else list(SLOT_TIMES))
+            else:
+                publish_from_buffer(args.slot or "noon")
+        except Exception as e:
+            get_reporter().fail(e)
+            raise
+        sys.exit(0)
+
+    task_id, first = None, args.first or "scrape"
+    if args.task:
+        try:
+            task_id = ObjectId(args.task)
+        except InvalidId:
+            parser.error(f"not a task id: {args.task}")
+        task = DBManager().collection.find_one({"_id": task_id}, {"status": 1, "slot": 1})
+        if not task:
+            parser.error(f"no task {args.task}")
+        if task["status"] == "failed_upload":
+            from core.upload_queue import UploadWorker
+
+            # Same as `python -m core.upload_queue --retry-failed`, for this task only
+            UploadWorker().retry_failed(task_id)
+            print("♻️ Task had run out of upload attempts. Back on the upload queue.")
+            task["status"] = "completed_packaged"
+        if task["status"] in DEAD_END:
+            parser.error(f"task {args.task} is '{task['status']}': {DEAD_END[task['status']]}")
+        resume_at = RESUME_STAGE.get(task["status"])
+        if resume_at is None:
+            parser.error(f"task {args.task} has unknown status '{task['status']}'")
+        if task["status"] == "uploading":
+            print("⚠️ Task is marked 'uploading'; it is retried once its claim goes stale.")
+        if task["status"] == "scripting":
+            print("⚠️ Task is claimed by a batch run; it is scripted here once its claim goes stale.")
+        if task["status"] == "buffered":
+            DBManager().collection.update_one(
+                {"_id": task_id, "status": "buffered"},
+                {"$set": {"status": "ready_to_upload", "released_at": datetime.datetime.now(datetime.timezone.utc)}},
+            )
+            print("🧊 Released from the buffer.")
+        if args.first and STAGES.index(args.first) < STAGES.index(resume_at):
+            # Earlier stages look for earlier statuses and would find nothing
+            print(f"⚠️ Task is '{task['status']}'. Starting at {resume_at} instead of {args.first}.")
+        first = max(first, resume_at, key=STAGES.index)
+        args.slot = args.slot or task.get("slot")
+
+    try:
+        select_stages(first, args.last)
+    except ValueError as e:
+        parser.error(str(e))
+
+    try:
+        run_creation_pipeline(args.slot or "noon", first, args.last, task_id)
+    except Exception as e:
+        get_reporter().fail(e)
+        raise
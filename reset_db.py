@@ -6,7 +6,11 @@ def fix_database():
 
     # Delete ALL tasks to ensure a fresh start
     # This deletes 'pending', 'scripted', 'voiced', AND stuck 'ready_to_assemble' tasks
-    result = db.collection.delete_many({"status": {"$ne": "completed_packaged"}})
+    query = {"status": {"$ne": "completed_packaged"}}
+    task_ids = [t["_id"] for t in db.collection.find(query, {"_id": 1})]
+    result = db.collection.delete_many({"_id": {"$in": task_ids}})
+    # Their articles and scripts live in task_payloads
+    db.payloads.delete_many({"_id": {"$in": task_ids}})
 
     print(f"✅ Database Wiped. Deleted {result.deleted_count} old/stuck tasks.")
     print("🚀 You can now run 'main.py' for a fresh start.")
@@ -7,6 +7,10 @@ import sys
 # Define the python executable (uses the current venv)
 PYTHON_EXEC = sys.executable
 
+# --buffer: videos are made in the quiet hours; slot time only uploads
+BUFFER_MODE = "--buffer" in sys.argv
+FILL_TIMES = ["03:00", "09:30", "13:30", "18:30", "22:30"]
+
 
 def job(slot):
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -15,7 +19,10 @@ def job(slot):
     try:
         # Run the Creation Pipeline (main.py)
         # We run it as a subprocess to keep memory clean
-        subprocess.run([PYTHON_EXEC, "-m", "core.main", slot], check=True)
+        command = [PYTHON_EXEC, "main.py", slot]
+        if BUFFER_MODE:
+            command.append("--from-buffer")
+        subprocess.run(command, check=True)
 
         print(f"✅ [{slot.upper()}] JOB FINISHED.")
 
@@ -23,6 +30,28 @@ def job(slot):
         print(f"❌ ERROR in {slot} job: {e}")
 
 
+def fill_buffer():
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"\n🧊 [{timestamp}] FILLING PRODUCTION BUFFER")
+    try:
+        subprocess.run([PYTHON_EXEC, "main.py", "--fill-buffer"], check=True)
+    except subprocess.CalledProcessError as e:
+        print(f"❌ ERROR while filling the buffer: {e}")
+
+
+def housekeeping():
+    # Retention + hard-link dedup for data/generated_videos_folder (core/storage.py)
+    try:
+        subprocess.run([PYTHON_EXEC, "-m", "core.storage", "run"], check=True)
+    except subprocess.CalledProcessError as e:
+        print(f"❌ ERROR in storage housekeeping: {e}")
+    # Then move finished tasks (files now purged) to the archive (core/archive.py)
+    try:
+        subprocess.run([PYTHON_EXEC, "-m", "core.archive", "run"], check=True)
+    except subprocess.CalledProcessError as e:
+        print(f"❌ ERROR in task archiving: {e}")
+
+
 # --- 📅 THE SCHEDULE ---
 # Adjust times as needed
 schedule.every().day.at("09:00").do(job, slot="morning")  # Motivation
@@ -30,9 +59,17 @@ schedule.every().day.at("13:00").do(job, slot="noon")  # Space
 schedule.every().day.at("18:00").do(job, slot="evening")  # Nature
 schedule.every().day.at("22:00").do(job, slot="night")  # History
 
+schedule.every().day.at("04:30").do(housekeeping)
+
+if BUFFER_MODE:
+    for at in FILL_TIMES:
+        schedule.every().day.at(at).do(fill_buffer)
+
 print("===================================================")
 print("🤖 THE KNOWLEDGE SPECTRUM: GROQ AUTOPILOT ENGAGED")
-print("   - Schedule: 4 Times Daily")
+print("   - Schedule: 4 Times Daily (+ storage cleanup and task archive at 04:30)")
+if BUFFER_MODE:
+    print(f"   - Buffer: filled at {', '.join(FILL_TIMES)}; slots only upload")
 print("   - Press Ctrl+C to stop")
 print("===================================================")
 